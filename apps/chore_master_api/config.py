@@ -14,6 +14,20 @@ def get_chore_master_api_web_server_config() -> ChoreMasterAPIWebServerConfigSch
     UVICORN_AUTO_RELOAD = False
     DATABASE_ORIGIN = get_env("DATABASE_ORIGIN")
     DATABASE_SCHEMA_NAME = get_env("DATABASE_SCHEMA_NAME")
+    BACKGROUND_JOB_MAX_CONCURRENCY = int(get_env("BACKGROUND_JOB_MAX_CONCURRENCY", "4"))
+    PRICE_SNAPSHOT_INTERVAL_SECONDS = int(
+        get_env("PRICE_SNAPSHOT_INTERVAL_SECONDS", "3600")
+    )
+    RISK_SNAPSHOT_INTERVAL_SECONDS = int(
+        get_env("RISK_SNAPSHOT_INTERVAL_SECONDS", "300")
+    )
+    MONGODB_URI = get_env("MONGODB_URI")
+    MONGODB_MIN_POOL_SIZE = int(get_env("MONGODB_MIN_POOL_SIZE", "1"))
+    MONGODB_MAX_POOL_SIZE = int(get_env("MONGODB_MAX_POOL_SIZE", "8"))
+    MONGODB_MAX_IDLE_TIME_MS = get_env("MONGODB_MAX_IDLE_TIME_MS")
+    OKX_RISK_STREAM_ENABLED = (
+        get_env("OKX_RISK_STREAM_ENABLED", "false").lower() == "true"
+    )
     API_ORIGIN = get_env("API_ORIGIN")
     FRONTEND_ORIGIN = get_env("FRONTEND_ORIGIN")
     ALLOW_ORIGINS = ["*"]
@@ -61,6 +75,14 @@ def get_chore_master_api_web_server_config() -> ChoreMasterAPIWebServerConfigSch
         ALLOW_ORIGINS=ALLOW_ORIGINS,
         DATABASE_ORIGIN=DATABASE_ORIGIN,
         DATABASE_SCHEMA_NAME=DATABASE_SCHEMA_NAME,
+        BACKGROUND_JOB_MAX_CONCURRENCY=BACKGROUND_JOB_MAX_CONCURRENCY,
+        PRICE_SNAPSHOT_INTERVAL_SECONDS=PRICE_SNAPSHOT_INTERVAL_SECONDS,
+        RISK_SNAPSHOT_INTERVAL_SECONDS=RISK_SNAPSHOT_INTERVAL_SECONDS,
+        MONGODB_URI=MONGODB_URI,
+        MONGODB_MIN_POOL_SIZE=MONGODB_MIN_POOL_SIZE,
+        MONGODB_MAX_POOL_SIZE=MONGODB_MAX_POOL_SIZE,
+        MONGODB_MAX_IDLE_TIME_MS=MONGODB_MAX_IDLE_TIME_MS,
+        OKX_RISK_STREAM_ENABLED=OKX_RISK_STREAM_ENABLED,
         API_ORIGIN=API_ORIGIN,
         FRONTEND_ORIGIN=FRONTEND_ORIGIN,
         SESSION_COOKIE_KEY=SESSION_COOKIE_KEY,
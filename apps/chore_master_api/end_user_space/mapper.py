@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Table
+from sqlalchemy import Column, Index, Table
 from sqlalchemy.orm import configure_mappers, registry, relationship
 
 from apps.chore_master_api.end_user_space.models import (
     finance,
     identity,
     integration,
+    risk,
     some_module,
     trace,
 )
@@ -134,6 +135,51 @@ class Mapper:
         if getattr(trace.Quota, "_sa_class_manager", None) is None:
             self._mapper_registry.map_imperatively(trace.Quota, trace_quota_table)
 
+        trace_job_table = Table(
+            "trace_job",
+            self._metadata,
+            *get_base_columns(),
+            Column("user_reference", types.String, nullable=False),
+            Column("name", types.String, nullable=False),
+            Column("status", types.String, nullable=False),
+            Column("progress", types.Float, nullable=False),
+            Column("message", types.String, nullable=True),
+            Column("result", types.JSON, nullable=True),
+            Column("is_cancel_requested", types.Boolean, nullable=False),
+            Column("started_time", types.DateTime, nullable=True),
+            Column("finished_time", types.DateTime, nullable=True),
+        )
+        if getattr(trace.Job, "_sa_class_manager", None) is None:
+            self._mapper_registry.map_imperatively(trace.Job, trace_job_table)
+
+        risk_snapshot_table = Table(
+            "risk_snapshot",
+            self._metadata,
+            *get_base_columns(),
+            Column("user_reference", types.String, nullable=False),
+            Column("snapshotted_time", types.DateTime, nullable=False),
+            Column("numeraire_currency", types.String, nullable=False),
+            Column("aggregated_delta", types.Float, nullable=False),
+            Column("aggregated_gamma", types.Float, nullable=False),
+            Column("aggregated_vega", types.Float, nullable=False),
+            Column("aggregated_theta", types.Float, nullable=False),
+            Column("aggregated_dv01", types.Float, nullable=False),
+            Column("aggregated_rho", types.Float, nullable=False),
+            Column("position_keys_snapshotted_time", types.DateTime, nullable=False),
+            Column("position_keys", types.JSON, nullable=True),
+            Column("position_risks", types.JSON, nullable=False),
+            # the time series of a user is read with a single range scan
+            Index(
+                "ix_risk_snapshot_user_reference_snapshotted_time",
+                "user_reference",
+                "snapshotted_time",
+            ),
+        )
+        if getattr(risk.RiskSnapshot, "_sa_class_manager", None) is None:
+            self._mapper_registry.map_imperatively(
+                risk.RiskSnapshot, risk_snapshot_table
+            )
+
         integration_operator_table = Table(
             "integration_operator",
             self._metadata,
@@ -281,4 +327,28 @@ class Mapper:
                 },
             )
 
+        finance_portfolio_holding_snapshot_table = Table(
+            "finance_portfolio_holding_snapshot",
+            self._metadata,
+            *get_base_columns(),
+            Column("portfolio_reference", types.String, nullable=False),
+            Column("asset_reference", types.String, nullable=False),
+            Column("quantity", types.String, nullable=False),
+            Column("cost_basis", types.String, nullable=False),
+            Column("realized_pnl", types.String, nullable=False),
+            Column("applied_transacted_time", types.DateTime, nullable=False),
+            Column("applied_transaction_reference", types.String, nullable=False),
+            Index(
+                "ix_finance_portfolio_holding_snapshot_portfolio_asset",
+                "portfolio_reference",
+                "asset_reference",
+                unique=True,
+            ),
+        )
+        if getattr(finance.PortfolioHoldingSnapshot, "_sa_class_manager", None) is None:
+            self._mapper_registry.map_imperatively(
+                finance.PortfolioHoldingSnapshot,
+                finance_portfolio_holding_snapshot_table,
+            )
+
         configure_mappers()
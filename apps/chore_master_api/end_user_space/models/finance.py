@@ -72,3 +72,13 @@ class Transfer(Entity):
     asset_reference: str
     settlement_asset_amount_change: Optional[str]
     remark: Optional[str]
+
+
+class PortfolioHoldingSnapshot(Entity):
+    portfolio_reference: str
+    asset_reference: str
+    quantity: str
+    cost_basis: str
+    realized_pnl: str
+    applied_transacted_time: datetime
+    applied_transaction_reference: str
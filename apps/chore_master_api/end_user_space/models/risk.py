@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Optional
+
+from apps.chore_master_api.end_user_space.models.base import Entity
+
+
+class RiskSnapshot(Entity):
+    user_reference: str
+    snapshotted_time: datetime
+    numeraire_currency: str
+    aggregated_delta: float
+    aggregated_gamma: float
+    aggregated_vega: float
+    aggregated_theta: float
+    aggregated_dv01: float
+    aggregated_rho: float
+    # positions as aligned columns. Their keys rarely change, so they are only
+    # stored when they do and every snapshot points to the one holding them
+    position_keys_snapshotted_time: datetime
+    position_keys: Optional[dict]
+    position_risks: dict
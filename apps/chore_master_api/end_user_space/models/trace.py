@@ -1,3 +1,9 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import ConfigDict
+
 from apps.chore_master_api.end_user_space.models.base import Entity
 
 
@@ -5,3 +11,24 @@ class Quota(Entity):
     user_reference: str
     limit: int
     used: int
+
+
+class Job(Entity):
+    model_config = ConfigDict(use_enum_values=True)
+
+    class StatusEnum(Enum):
+        PENDING = "PENDING"
+        RUNNING = "RUNNING"
+        SUCCEEDED = "SUCCEEDED"
+        FAILED = "FAILED"
+        CANCELLED = "CANCELLED"
+
+    user_reference: str
+    name: str
+    status: StatusEnum
+    progress: float
+    message: Optional[str]
+    result: Optional[dict]
+    is_cancel_requested: bool
+    started_time: Optional[datetime]
+    finished_time: Optional[datetime]
@@ -6,6 +6,7 @@ from apps.chore_master_api.end_user_space.models.finance import (
     BalanceEntry,
     BalanceSheet,
     Portfolio,
+    PortfolioHoldingSnapshot,
     Price,
     Transaction,
     Transfer,
@@ -59,3 +60,11 @@ class TransferRepository(BaseSQLAlchemyRepository[Transfer]):
     @property
     def entity_class(self) -> Type[Transfer]:
         return Transfer
+
+
+class PortfolioHoldingSnapshotRepository(
+    BaseSQLAlchemyRepository[PortfolioHoldingSnapshot]
+):
+    @property
+    def entity_class(self) -> Type[PortfolioHoldingSnapshot]:
+        return PortfolioHoldingSnapshot
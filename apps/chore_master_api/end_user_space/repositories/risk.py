@@ -0,0 +1,10 @@
+from typing import Type
+
+from apps.chore_master_api.end_user_space.models.risk import RiskSnapshot
+from modules.repositories.base_sqlalchemy_repository import BaseSQLAlchemyRepository
+
+
+class RiskSnapshotRepository(BaseSQLAlchemyRepository[RiskSnapshot]):
+    @property
+    def entity_class(self) -> Type[RiskSnapshot]:
+        return RiskSnapshot
@@ -1,6 +1,6 @@
 from typing import Type
 
-from apps.chore_master_api.end_user_space.models.trace import Quota
+from apps.chore_master_api.end_user_space.models.trace import Job, Quota
 from modules.repositories.base_sqlalchemy_repository import BaseSQLAlchemyRepository
 
 
@@ -8,3 +8,9 @@ class QuotaRepository(BaseSQLAlchemyRepository[Quota]):
     @property
     def entity_class(self) -> Type[Quota]:
         return Quota
+
+
+class JobRepository(BaseSQLAlchemyRepository[Job]):
+    @property
+    def entity_class(self) -> Type[Job]:
+        return Job
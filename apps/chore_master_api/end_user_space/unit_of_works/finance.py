@@ -5,6 +5,7 @@ from apps.chore_master_api.end_user_space.repositories.finance import (
     AssetRepository,
     BalanceEntryRepository,
     BalanceSheetRepository,
+    PortfolioHoldingSnapshotRepository,
     PortfolioRepository,
     PriceRepository,
     TransactionRepository,
@@ -24,9 +25,13 @@ class FinanceSQLAlchemyUnitOfWork(BaseSQLAlchemyUnitOfWork):
         self.portfolio_repository = PortfolioRepository(self.session)
         self.transaction_repository = TransactionRepository(self.session)
         self.transfer_repository = TransferRepository(self.session)
+        self.portfolio_holding_snapshot_repository = PortfolioHoldingSnapshotRepository(
+            self.session
+        )
         return self
 
     async def __aexit__(self, *args):
+        self.portfolio_holding_snapshot_repository = None
         self.transfer_repository = None
         self.transaction_repository = None
         self.portfolio_repository = None
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from apps.chore_master_api.end_user_space.repositories.risk import (
+    RiskSnapshotRepository,
+)
+from modules.unit_of_works.base_sqlalchemy_unit_of_work import BaseSQLAlchemyUnitOfWork
+
+
+class RiskSQLAlchemyUnitOfWork(BaseSQLAlchemyUnitOfWork):
+    async def __aenter__(self) -> RiskSQLAlchemyUnitOfWork:
+        await super().__aenter__()
+        self.risk_snapshot_repository = RiskSnapshotRepository(self.session)
+        return self
+
+    async def __aexit__(self, *args):
+        self.risk_snapshot_repository = None
+        await super().__aexit__(*args)
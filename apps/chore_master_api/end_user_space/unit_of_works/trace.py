@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from apps.chore_master_api.end_user_space.repositories.trace import QuotaRepository
+from apps.chore_master_api.end_user_space.repositories.trace import (
+    JobRepository,
+    QuotaRepository,
+)
 from modules.unit_of_works.base_sqlalchemy_unit_of_work import BaseSQLAlchemyUnitOfWork
 
 
@@ -8,8 +11,10 @@ class TraceSQLAlchemyUnitOfWork(BaseSQLAlchemyUnitOfWork):
     async def __aenter__(self) -> TraceSQLAlchemyUnitOfWork:
         await super().__aenter__()
         self.quota_repository = QuotaRepository(self.session)
+        self.job_repository = JobRepository(self.session)
         return self
 
     async def __aexit__(self, *args):
         self.quota_repository = None
+        self.job_repository = None
         await super().__aexit__(*args)
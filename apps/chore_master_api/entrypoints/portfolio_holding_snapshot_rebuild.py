@@ -0,0 +1,15 @@
+import asyncio
+import sys
+
+from apps.chore_master_api.service_layers.portfolio import (
+    rebuild_all_portfolio_holding_snapshots,
+)
+
+
+async def main():
+    # rebuilds the given portfolio references, or every portfolio without any
+    await rebuild_all_portfolio_holding_snapshots(sys.argv[1:] or None)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,11 @@
+import asyncio
+
+from apps.chore_master_api.service_layers.price import run_price_snapshot_scheduler
+
+
+async def main():
+    await run_price_snapshot_scheduler()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,14 @@
+import asyncio
+
+from apps.chore_master_api.service_layers.risk import (
+    run_risk_snapshot_scheduler,
+    snapshot_okx_risks,
+)
+
+
+async def main():
+    await run_risk_snapshot_scheduler(snapshot_okx_risks)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,12 +7,30 @@ from modules.base.config import get_base_config
 if __name__ == "__main__":
     base_config = get_base_config()
     chore_master_api_web_server_config = get_chore_master_api_web_server_config()
-    uvicorn.run(
-        f"apps.{base_config.SERVICE_NAME}.entrypoints.{base_config.COMPONENT_NAME}:app",
-        host="0.0.0.0",
-        port=chore_master_api_web_server_config.PORT,
-        reload=chore_master_api_web_server_config.UVICORN_AUTO_RELOAD,
-        reload_dirs=["modules", f"apps/{base_config.SERVICE_NAME}"],
+    app_import_path = (
+        f"apps.{base_config.SERVICE_NAME}.entrypoints.{base_config.COMPONENT_NAME}:app"
     )
+    if (
+        chore_master_api_web_server_config.WORKER_COUNT > 1
+        and not chore_master_api_web_server_config.UVICORN_AUTO_RELOAD
+    ):
+        from modules.web_server.gunicorn_server import GunicornServer
+
+        GunicornServer(
+            app_import_path,
+            port=chore_master_api_web_server_config.PORT,
+            worker_count=chore_master_api_web_server_config.WORKER_COUNT,
+            graceful_timeout=chore_master_api_web_server_config.GRACEFUL_SHUTDOWN_TIMEOUT_SECONDS,
+            max_requests=chore_master_api_web_server_config.WORKER_MAX_REQUESTS,
+        ).run()
+    else:
+        uvicorn.run(
+            app_import_path,
+            host="0.0.0.0",
+            port=chore_master_api_web_server_config.PORT,
+            reload=chore_master_api_web_server_config.UVICORN_AUTO_RELOAD,
+            reload_dirs=["modules", f"apps/{base_config.SERVICE_NAME}"],
+            timeout_graceful_shutdown=chore_master_api_web_server_config.GRACEFUL_SHUTDOWN_TIMEOUT_SECONDS,
+        )
 else:
     app = get_app()
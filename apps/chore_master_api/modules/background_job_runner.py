@@ -0,0 +1,152 @@
+import asyncio
+import traceback
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+from apps.chore_master_api.end_user_space.models.trace import Job
+from apps.chore_master_api.end_user_space.unit_of_works.trace import (
+    TraceSQLAlchemyUnitOfWork,
+)
+from modules.base.exceptions import BaseError
+from modules.database.relational_database import RelationalDatabase
+
+
+class JobCancelledError(BaseError):
+    pass
+
+
+class JobContext:
+    def __init__(self, runner: "BackgroundJobRunner", job_reference: str):
+        self._runner = runner
+        self.job_reference = job_reference
+
+    async def report_progress(self, progress: float, message: Optional[str] = None):
+        """
+        Persist the progress in [0, 1]. Raises `JobCancelledError` once the job is
+        requested to be cancelled, which may come from any worker.
+        """
+        values = {"progress": min(max(progress, 0.0), 1.0)}
+        if message is not None:
+            values["message"] = message
+        async with self._runner.create_trace_uow() as uow:
+            await uow.job_repository.update_many(
+                filter={"reference": self.job_reference}, values=values
+            )
+            await uow.commit()
+            job = await uow.job_repository.find_one(
+                filter={"reference": self.job_reference}
+            )
+            is_cancel_requested = job.is_cancel_requested
+        if is_cancel_requested:
+            raise JobCancelledError(f"Job `{self.job_reference}` is cancelled")
+
+
+JobFunc = Callable[[JobContext], Awaitable[Optional[dict]]]
+ProgressReporter = Callable[[float, Optional[str]], Awaitable[None]]
+
+
+class BackgroundJobRunner:
+    """
+    Runs long jobs on the event loop of the current worker, at most
+    `max_concurrency` at a time. The status of every job is kept in `trace_job`,
+    so it can be polled and cancelled from any worker.
+    """
+
+    def __init__(self, chore_master_db: RelationalDatabase, max_concurrency: int = 4):
+        self._chore_master_db = chore_master_db
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._job_reference_to_task_map: dict[str, asyncio.Task] = {}
+
+    def create_trace_uow(self) -> TraceSQLAlchemyUnitOfWork:
+        return TraceSQLAlchemyUnitOfWork(relational_database=self._chore_master_db)
+
+    async def submit(self, user_reference: str, name: str, func: JobFunc) -> dict:
+        job = Job(
+            user_reference=user_reference,
+            name=name,
+            status=Job.StatusEnum.PENDING,
+            progress=0.0,
+            message=None,
+            result=None,
+            is_cancel_requested=False,
+            started_time=None,
+            finished_time=None,
+        )
+        job_reference = job.reference
+        async with self.create_trace_uow() as uow:
+            await uow.job_repository.insert_one(job)
+            await uow.commit()
+            job = await uow.job_repository.find_one(filter={"reference": job_reference})
+            job_dict = job.model_dump()
+
+        task = asyncio.create_task(self._run(job_reference, func))
+        self._job_reference_to_task_map[job_reference] = task
+        task.add_done_callback(
+            lambda _task: self._job_reference_to_task_map.pop(job_reference, None)
+        )
+        return job_dict
+
+    async def cancel(self, job_reference: str):
+        async with self.create_trace_uow() as uow:
+            await uow.job_repository.update_many(
+                filter={"reference": job_reference},
+                values={"is_cancel_requested": True},
+            )
+            await uow.commit()
+        # jobs owned by other workers stop at their next progress report
+        task = self._job_reference_to_task_map.get(job_reference)
+        if task is not None:
+            task.cancel()
+
+    async def shutdown(self):
+        tasks = list(self._job_reference_to_task_map.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job_reference: str, func: JobFunc):
+        try:
+            async with self._semaphore:
+                await self._update_job(
+                    job_reference,
+                    status=Job.StatusEnum.RUNNING.value,
+                    started_time=self._utc_now(),
+                )
+                job_context = JobContext(self, job_reference)
+                # skip jobs cancelled while waiting for a slot
+                await job_context.report_progress(0.0)
+                result = await func(job_context)
+            await self._update_job(
+                job_reference,
+                status=Job.StatusEnum.SUCCEEDED.value,
+                progress=1.0,
+                result=result,
+                finished_time=self._utc_now(),
+            )
+        except (asyncio.CancelledError, JobCancelledError):
+            await asyncio.shield(
+                self._update_job(
+                    job_reference,
+                    status=Job.StatusEnum.CANCELLED.value,
+                    finished_time=self._utc_now(),
+                )
+            )
+        except Exception as e:
+            traceback.print_exc()
+            await self._update_job(
+                job_reference,
+                status=Job.StatusEnum.FAILED.value,
+                message=str(e),
+                finished_time=self._utc_now(),
+            )
+
+    async def _update_job(self, job_reference: str, **values):
+        async with self.create_trace_uow() as uow:
+            await uow.job_repository.update_many(
+                filter={"reference": job_reference}, values=values
+            )
+            await uow.commit()
+
+    @staticmethod
+    def _utc_now() -> datetime:
+        return datetime.now(tz=timezone.utc).replace(tzinfo=None)
@@ -1,43 +1,108 @@
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Callable, Optional, Union
+from typing import Optional, TypedDict
 
 import httpx
 
 from apps.chore_master_api.modules.base_discriminated_operator import (
     BaseDiscriminatedOperator,
 )
+from modules.utils.cache_utils import SingleFlightCache
+from modules.utils.import_utils import ImportUtils
 from modules.utils.symbol_utils import SymbolUtils
 
+np = ImportUtils.lazy_import("numpy")
+
+FEED_RESPONSE_TTL_SECONDS = 60
+
+feed_response_cache: SingleFlightCache[dict] = SingleFlightCache(
+    ttl_seconds=FEED_RESPONSE_TTL_SECONDS, max_size=256
+)
+
 
 class IntervalEnum(Enum):
     PER_1_DAY = "1d"
 
 
-def binary_search_lte_from_ascendingly_ordered_items(
-    items: list, target: Any, key: Optional[Callable[[Any], Union[int, float]]] = None
-) -> Optional[int]:
-    if key is None:
-        get_key = lambda x: x
-    else:
-        get_key = key
-
-    left, right = 0, len(items) - 1
-    matched_idx = -1
-    while left <= right:
-        mid = (left + right) // 2
-        current_item = items[mid]
-        current_key = get_key(current_item)
-        if current_key <= target:
-            matched_idx = mid
-            left = mid + 1
-        else:
-            right = mid - 1
-
-    if matched_idx != -1:
-        return matched_idx
-    else:
-        return None
+class FeedPrices(TypedDict):
+    """
+    Columns aligned with `target_datetimes`, unmatched targets hold `None`.
+    """
+
+    instrument_symbol: str
+    target_interval: str
+    target_datetimes: list[datetime]
+    matched_datetimes: list[Optional[datetime]]
+    matched_prices: list[Optional[float]]
+
+
+def match_prices_as_of(
+    instrument_symbol: str,
+    target_interval: IntervalEnum,
+    target_datetimes: list[datetime],
+    timestamps: "np.ndarray",
+    prices: "np.ndarray",
+) -> FeedPrices:
+    """
+    Match every target with the latest price at or before it. `timestamps` are
+    ascending epoch seconds, missing prices are dropped before matching.
+    """
+    is_valid = ~np.isnan(prices)
+    timestamps = timestamps[is_valid]
+    prices = prices[is_valid]
+    target_timestamps = np.fromiter(
+        (target_datetime.timestamp() for target_datetime in target_datetimes),
+        dtype=np.float64,
+        count=len(target_datetimes),
+    )
+    matched_idxs = np.searchsorted(timestamps, target_timestamps, side="right") - 1
+    is_matched = matched_idxs >= 0
+    matched_idxs = np.where(is_matched, matched_idxs, 0)
+
+    # many targets share a candle, so each candle is converted once
+    unique_matched_idxs = np.unique(matched_idxs[is_matched])
+    matched_idx_to_datetime_map = {
+        matched_idx: datetime.fromtimestamp(timestamp)
+        for matched_idx, timestamp in zip(
+            unique_matched_idxs.tolist(), timestamps[unique_matched_idxs].tolist()
+        )
+    }
+    matched_prices = (
+        prices[matched_idxs].tolist() if len(prices) > 0 else [None] * len(matched_idxs)
+    )
+    return {
+        "instrument_symbol": instrument_symbol,
+        "target_interval": target_interval.value,
+        "target_datetimes": target_datetimes,
+        "matched_datetimes": [
+            matched_idx_to_datetime_map[matched_idx] if is_matched_ else None
+            for matched_idx, is_matched_ in zip(
+                matched_idxs.tolist(), is_matched.tolist()
+            )
+        ],
+        "matched_prices": [
+            matched_price if is_matched_ else None
+            for matched_price, is_matched_ in zip(matched_prices, is_matched.tolist())
+        ],
+    }
+
+
+async def fetch_feed_json(
+    url: str, params: Optional[dict] = None, headers: Optional[dict] = None
+) -> dict:
+    """
+    Identical downloads, from any user, share one request and its response for a
+    short while. The response must not be mutated.
+    """
+
+    async def _fetch() -> dict:
+        async with httpx.AsyncClient(timeout=120) as client:
+            response = await client.get(url, params=params, headers=headers)
+            response.raise_for_status()
+            return response.json()
+
+    key = (url, tuple(sorted((params or {}).items())))
+    return await feed_response_cache.get_or_fetch(key, _fetch)
 
 
 class FeedDiscriminatedOperator(BaseDiscriminatedOperator):
@@ -46,7 +111,7 @@ class FeedDiscriminatedOperator(BaseDiscriminatedOperator):
         instrument_symbol: str,
         target_interval: IntervalEnum,
         target_datetimes: list[datetime],
-    ) -> list[dict]:
+    ) -> FeedPrices:
         raise NotImplementedError
 
 
@@ -56,7 +121,7 @@ class OandaFeedDiscriminatedOperator(FeedDiscriminatedOperator):
         instrument_symbol: str,
         target_interval: IntervalEnum,
         target_datetimes: list[datetime],
-    ) -> list[dict]:
+    ) -> FeedPrices:
         # https://fxds-public-exchange-rates-api.oanda.com/cc-api/currencies?base=USD&quote=TWD&data_type=general_currency_pair&start_date=2024-11-30&end_date=2024-12-01
         raise NotImplementedError
 
@@ -67,73 +132,38 @@ class YahooFinanceFeedDiscriminatedOperator(FeedDiscriminatedOperator):
         instrument_symbol: str,
         target_interval: IntervalEnum,
         target_datetimes: list[datetime],
-    ) -> list[dict]:
+    ) -> FeedPrices:
         parsed_instrument = SymbolUtils.parse_instrument(instrument_symbol)
         base_asset = parsed_instrument["base_asset"]
         quote_asset = parsed_instrument["quote_asset"]
 
         if target_interval == IntervalEnum.PER_1_DAY:
-            price_dicts = []
-            async with httpx.AsyncClient(timeout=120) as client:
-                response = await client.get(
-                    f"https://query1.finance.yahoo.com/v8/finance/chart/{base_asset.upper()}{quote_asset.upper()}=X",
-                    params={
-                        "period1": f"{int((min(target_datetimes) - timedelta(days=7)).timestamp())}",
-                        "period2": f"{int(max(target_datetimes).timestamp())}",
-                        "interval": "1d",
-                    },
-                    headers={
-                        # "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36"
-                        "User-Agent": "PostmanRuntime/7.43.4",
-                    },
-                )
-                response.raise_for_status()
-                response_dict = response.json()
-
-                # remove null prices
-                timestamps, close_prices = zip(
-                    *[
-                        (timestamp, close_price)
-                        for timestamp, close_price in zip(
-                            response_dict["chart"]["result"][0]["timestamp"],
-                            response_dict["chart"]["result"][0]["indicators"][
-                                "adjclose"
-                            ][0]["adjclose"],
-                        )
-                        if close_price is not None
-                    ]
-                )
-
-                for target_datetime in target_datetimes:
-                    matched_idx = binary_search_lte_from_ascendingly_ordered_items(
-                        items=timestamps, target=target_datetime.timestamp()
-                    )
-                    if matched_idx is not None:
-                        matched_datetime = datetime.fromtimestamp(
-                            timestamps[matched_idx]
-                        )
-                        matched_price = close_prices[matched_idx]
-                        # print(str(target_datetime - matched_datetime))
-                        price_dicts.append(
-                            {
-                                "instrument_symbol": instrument_symbol,
-                                "target_interval": target_interval.value,
-                                "target_datetime": target_datetime,
-                                "matched_datetime": matched_datetime,
-                                "matched_price": matched_price,
-                            }
-                        )
-                    else:
-                        price_dicts.append(
-                            {
-                                "instrument_symbol": instrument_symbol,
-                                "target_interval": target_interval.value,
-                                "target_datetime": target_datetime,
-                                "matched_datetime": None,
-                                "matched_price": None,
-                            }
-                        )
-            return price_dicts
+            response_dict = await fetch_feed_json(
+                f"https://query1.finance.yahoo.com/v8/finance/chart/{base_asset.upper()}{quote_asset.upper()}=X",
+                params={
+                    "period1": f"{int((min(target_datetimes) - timedelta(days=7)).timestamp())}",
+                    "period2": f"{int(max(target_datetimes).timestamp())}",
+                    "interval": "1d",
+                },
+                headers={
+                    # "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36"
+                    "User-Agent": "PostmanRuntime/7.43.4",
+                },
+            )
+            chart_result = response_dict["chart"]["result"][0]
+            return match_prices_as_of(
+                instrument_symbol=instrument_symbol,
+                target_interval=target_interval,
+                target_datetimes=target_datetimes,
+                timestamps=np.asarray(
+                    chart_result.get("timestamp", []), dtype=np.float64
+                ),
+                # null prices become nan
+                prices=np.asarray(
+                    chart_result["indicators"]["adjclose"][0].get("adjclose", []),
+                    dtype=np.float64,
+                ),
+            )
         else:
             raise ValueError(f"Unsupported interval: {target_interval}")
 
@@ -144,7 +174,7 @@ class CoingeckoFeedDiscriminatedOperator(FeedDiscriminatedOperator):
         instrument_symbol: str,
         target_interval: IntervalEnum,
         target_datetimes: list[datetime],
-    ) -> list[dict]:
+    ) -> FeedPrices:
         # https://www.coingecko.com/en/coins/usd/twd
         # https://www.coingecko.com/en/coins/overnight-fi-usd/twd
         # https://www.coingecko.com/price_charts/usd/twd/24_hours.json
@@ -153,49 +183,20 @@ class CoingeckoFeedDiscriminatedOperator(FeedDiscriminatedOperator):
         base_asset = parsed_instrument["base_asset"]
         quote_asset = parsed_instrument["quote_asset"]
         if target_interval == IntervalEnum.PER_1_DAY:
-            price_dicts = []
-            async with httpx.AsyncClient(timeout=120) as client:
-                response = await client.get(
-                    f"https://www.coingecko.com/price_charts/{base_asset.lower()}/{quote_asset.lower()}/max.json",
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36"
-                    },
-                )
-                response.raise_for_status()
-                response_dict = response.json()
-                stats = response_dict["stats"]
-
-                for target_datetime in target_datetimes:
-                    matched_idx = binary_search_lte_from_ascendingly_ordered_items(
-                        items=stats,
-                        target=target_datetime.timestamp() * 1000,
-                        key=lambda item: item[0],
-                    )
-                    if matched_idx is not None:
-                        matched_stat = stats[matched_idx]
-                        matched_datetime = datetime.fromtimestamp(
-                            matched_stat[0] / 1000
-                        )
-                        # print(str(target_datetime - matched_datetime))
-                        price_dicts.append(
-                            {
-                                "instrument_symbol": instrument_symbol,
-                                "target_interval": target_interval.value,
-                                "target_datetime": target_datetime,
-                                "matched_datetime": matched_datetime,
-                                "matched_price": matched_stat[1],
-                            }
-                        )
-                    else:
-                        price_dicts.append(
-                            {
-                                "instrument_symbol": instrument_symbol,
-                                "target_interval": target_interval.value,
-                                "target_datetime": target_datetime,
-                                "matched_datetime": None,
-                                "matched_price": None,
-                            }
-                        )
-            return price_dicts
+            response_dict = await fetch_feed_json(
+                f"https://www.coingecko.com/price_charts/{base_asset.lower()}/{quote_asset.lower()}/max.json",
+                headers={
+                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36"
+                },
+            )
+            # [[milliseconds, price], ...]
+            stats = np.asarray(response_dict["stats"], dtype=np.float64).reshape(-1, 2)
+            return match_prices_as_of(
+                instrument_symbol=instrument_symbol,
+                target_interval=target_interval,
+                target_datetimes=target_datetimes,
+                timestamps=stats[:, 0] / 1000,
+                prices=stats[:, 1],
+            )
         else:
             raise ValueError(f"Unsupported interval: {target_interval}")
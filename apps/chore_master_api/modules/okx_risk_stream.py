@@ -0,0 +1,400 @@
+import asyncio
+import time
+import traceback
+from typing import Awaitable, Callable, Optional
+
+from modules.utils.import_utils import ImportUtils
+
+ccxt_pro = ImportUtils.lazy_import("ccxt.pro")
+
+NUMERAIRE_CURRENCY = "USDT"
+
+
+class ChangeNotifier:
+    def __init__(self):
+        self.version = 0
+        self._event = asyncio.Event()
+
+    def notify(self):
+        self.version += 1
+        # wake the current waiters, later waiters wait for the next change
+        self._event.set()
+        self._event = asyncio.Event()
+
+    async def wait(self, after_version: int):
+        """
+        Return once the version moves past `after_version`, right away if it
+        already has.
+        """
+        event = self._event
+        if self.version == after_version:
+            await event.wait()
+
+
+class OkxRiskBook:
+    """
+    Latest account state of a single OKX account, in the same shapes as the REST
+    responses so both can be turned into positions the same way.
+    """
+
+    def __init__(self):
+        # keyed by position id, closed positions are removed
+        self.position_map: dict[str, dict] = {}
+        # keyed by currency, `info.data[0].details` of the trading balance
+        self.trading_balance_detail_map: dict[str, dict] = {}
+        # `info.data` of the funding balance
+        self.funding_balance_details: list[dict] = []
+        # `data` of the savings balance
+        self.savings_balances: list[dict] = []
+        self.updated_time: Optional[float] = None
+
+    @staticmethod
+    def get_position_key(position: dict) -> str:
+        return position["id"] or f"{position['symbol']}:{position['side']}"
+
+    def upsert_positions(self, positions: list[dict]):
+        for position in positions:
+            position_key = self.get_position_key(position)
+            if not position["contracts"]:
+                self.position_map.pop(position_key, None)
+            else:
+                self.position_map[position_key] = position
+        self.updated_time = time.time()
+
+    def upsert_trading_balance_details(self, trading_balance_details: list[dict]):
+        for trading_balance_detail in trading_balance_details:
+            self.trading_balance_detail_map[
+                trading_balance_detail["ccy"]
+            ] = trading_balance_detail
+        self.updated_time = time.time()
+
+
+class OkxAccountRiskStream:
+    """
+    Keeps the book of an OKX account up to date. Positions and the trading
+    balance are pushed through `watch_positions` and `watch_balance`, while the
+    funding and savings balances, which have no private channel, are polled.
+    """
+
+    def __init__(
+        self,
+        account_name: str,
+        okx_account: dict,
+        manager: "OkxRiskStreamManager",
+        poll_interval_seconds: float = 60.0,
+    ):
+        self.account_name = account_name
+        self.okx_account = okx_account
+        self.book = OkxRiskBook()
+        self.change_notifier = ChangeNotifier()
+        self.ready_event = asyncio.Event()
+        self.last_accessed_time = time.monotonic()
+        self._manager = manager
+        self._poll_interval_seconds = poll_interval_seconds
+        self._run_task: Optional[asyncio.Task] = None
+        self.exchange = ccxt_pro.okx(
+            {
+                "apiKey": okx_account["api_key"],
+                "secret": okx_account["passphrase"],
+                "password": okx_account["password"],
+                "enableRateLimit": True,
+            }
+        )
+
+    @property
+    def is_failed(self) -> bool:
+        return self._run_task is not None and self._run_task.done()
+
+    def start(self):
+        self._run_task = asyncio.create_task(self._run())
+
+    async def wait_until_ready(self, timeout_seconds: float) -> bool:
+        ready_task = asyncio.ensure_future(self.ready_event.wait())
+        try:
+            # the run task only finishes early when loading the book fails
+            await asyncio.wait(
+                [ready_task, self._run_task],
+                timeout=timeout_seconds,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            ready_task.cancel()
+        return self.ready_event.is_set() and not self.is_failed
+
+    async def stop(self):
+        if self._run_task is not None:
+            self._run_task.cancel()
+            await asyncio.gather(self._run_task, return_exceptions=True)
+        await self.exchange.close()
+
+    def get_ticker_symbols(self) -> set[str]:
+        """
+        Spot symbols needed to value the book in the numeraire currency.
+        """
+        markets = self.exchange.markets or {}
+        currencies = set(self.book.trading_balance_detail_map.keys())
+        currencies.update(
+            balance["ccy"] for balance in self.book.funding_balance_details
+        )
+        currencies.update(balance["ccy"] for balance in self.book.savings_balances)
+        symbols = {f"{currency}/{NUMERAIRE_CURRENCY}" for currency in currencies}
+        for position in self.book.position_map.values():
+            market = markets.get(position["symbol"])
+            if market is None:
+                continue
+            quote_currency = "USDT" if market["quote"] == "USD" else market["quote"]
+            symbols.add(f"{market['base']}/{quote_currency}")
+            symbols.add(f"{quote_currency}/{NUMERAIRE_CURRENCY}")
+            if market["type"] == "option":
+                symbols.add(position["symbol"])
+        return {symbol for symbol in symbols if symbol in markets}
+
+    async def _run(self):
+        await self.exchange.load_markets()
+        raw_positions, raw_balances = await asyncio.gather(
+            self.exchange.fetch_positions(),
+            self.exchange.fetch_balance({"type": "trading"}),
+        )
+        self.book.upsert_positions(raw_positions)
+        self.book.upsert_trading_balance_details(
+            raw_balances["info"]["data"][0]["details"]
+        )
+        await self._poll_balances()
+        self.ready_event.set()
+        self._on_change()
+        await asyncio.gather(
+            self._keep_watching(self._watch_positions),
+            self._keep_watching(self._watch_balance),
+            self._keep_watching(self._wait_and_poll_balances),
+        )
+
+    async def _watch_positions(self):
+        positions = await self.exchange.watch_positions()
+        self.book.upsert_positions(positions)
+        self._on_change()
+
+    async def _watch_balance(self):
+        balance = await self.exchange.watch_balance()
+        for data in balance["info"].get("data", []):
+            self.book.upsert_trading_balance_details(data.get("details", []))
+        self._on_change()
+
+    async def _wait_and_poll_balances(self):
+        await asyncio.sleep(self._poll_interval_seconds)
+        await self._poll_balances()
+        self._on_change()
+
+    async def _poll_balances(self):
+        raw_balances_funding_account, finance_account = await asyncio.gather(
+            self.exchange.fetch_balance({"type": "funding"}),
+            self.exchange.privateGetFinanceSavingsBalance(),
+        )
+        self.book.funding_balance_details = raw_balances_funding_account["info"]["data"]
+        self.book.savings_balances = finance_account["data"]
+        self.book.updated_time = time.time()
+
+    async def _keep_watching(self, watch: Callable[[], Awaitable[None]]):
+        # ccxt reconnects on the next call, so failures only need a backoff
+        backoff_seconds = 1.0
+        while True:
+            try:
+                await watch()
+                backoff_seconds = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                await asyncio.sleep(backoff_seconds)
+                backoff_seconds = min(backoff_seconds * 2, 30.0)
+
+    def _on_change(self):
+        self.change_notifier.notify()
+        self._manager.subscribe_tickers(self.get_ticker_symbols())
+
+
+class OkxRiskStreamManager:
+    """
+    Streams of the accounts in use by this worker, started on first use and
+    stopped once left idle. Tickers are public, so a single `watch_tickers`
+    subscription serves every account.
+    """
+
+    def __init__(
+        self,
+        idle_timeout_seconds: float = 600.0,
+        ready_timeout_seconds: float = 10.0,
+        max_ticker_age_seconds: float = 10.0,
+    ):
+        self.is_enabled = False
+        self.ticker_change_notifier = ChangeNotifier()
+        self._idle_timeout_seconds = idle_timeout_seconds
+        self._ready_timeout_seconds = ready_timeout_seconds
+        self._max_ticker_age_seconds = max_ticker_age_seconds
+        self._key_to_stream_map: dict[tuple[str, str], OkxAccountRiskStream] = {}
+        # tickers with the monotonic time they were received
+        self._symbol_to_ticker_map: dict[str, tuple[float, dict]] = {}
+        self._ticker_symbols: set[str] = set()
+        self._public_exchange = None
+        self._ticker_task: Optional[asyncio.Task] = None
+        self._reap_task: Optional[asyncio.Task] = None
+
+    async def get_ready_stream(
+        self, user_reference: str, account_name: str, okx_account: dict
+    ) -> Optional[OkxAccountRiskStream]:
+        """
+        Return the stream of the account once its book is loaded, or `None` when
+        streaming is disabled or not ready in time, so callers can fall back to
+        REST.
+        """
+        if not self.is_enabled:
+            return None
+        if self._reap_task is None:
+            self._reap_task = asyncio.create_task(self._keep_reaping())
+        key = (user_reference, account_name)
+        stream = self._key_to_stream_map.get(key)
+        if stream is None or stream.okx_account != okx_account or stream.is_failed:
+            stale_stream = stream
+            stream = OkxAccountRiskStream(account_name, okx_account, self)
+            stream.start()
+            # register the replacement before awaiting the stale one to stop, so
+            # that concurrent requests reuse it instead of registering their own
+            self._key_to_stream_map[key] = stream
+            if stale_stream is not None:
+                await stale_stream.stop()
+        stream.last_accessed_time = time.monotonic()
+        if not await stream.wait_until_ready(self._ready_timeout_seconds):
+            return None
+        return stream
+
+    def get_ticker(self, symbol: str) -> Optional[dict]:
+        """
+        Return the streamed ticker, or `None` when it is not subscribed or older
+        than `max_ticker_age_seconds`, e.g. while the subscription reconnects,
+        so callers fall back to REST instead of a frozen price.
+        """
+        received_ticker = self._symbol_to_ticker_map.get(symbol)
+        if received_ticker is None:
+            return None
+        received_time, ticker = received_ticker
+        if time.monotonic() - received_time > self._max_ticker_age_seconds:
+            return None
+        return ticker
+
+    def subscribe_tickers(self, symbols: set[str]):
+        if symbols <= self._ticker_symbols:
+            return
+        self._resubscribe_tickers(self._ticker_symbols | symbols)
+
+    def _resubscribe_tickers(self, symbols: set[str]):
+        # `watch_tickers` subscribes a fixed set, so resubscribe with the new one
+        self._ticker_symbols = symbols
+        for symbol in self._symbol_to_ticker_map.keys() - symbols:
+            del self._symbol_to_ticker_map[symbol]
+        if self._ticker_task is not None:
+            self._ticker_task.cancel()
+            self._ticker_task = None
+        if len(symbols) > 0:
+            self._ticker_task = asyncio.create_task(self._keep_watching_tickers())
+
+    def get_change_versions(self, streams: list[OkxAccountRiskStream]) -> list[int]:
+        return [stream.change_notifier.version for stream in streams] + [
+            self.ticker_change_notifier.version
+        ]
+
+    async def wait_for_change(
+        self,
+        streams: list[OkxAccountRiskStream],
+        change_versions: list[int],
+        timeout_seconds: float,
+    ):
+        """
+        Wait until any of the streams or the tickers changed since
+        `change_versions` of `get_change_versions`.
+        """
+        change_notifiers = [stream.change_notifier for stream in streams] + [
+            self.ticker_change_notifier
+        ]
+        waits = [
+            change_notifier.wait(change_version)
+            for change_notifier, change_version in zip(
+                change_notifiers, change_versions
+            )
+        ]
+        for stream in streams:
+            stream.last_accessed_time = time.monotonic()
+        tasks = [asyncio.ensure_future(wait) for wait in waits]
+        try:
+            await asyncio.wait(
+                tasks, timeout=timeout_seconds, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def shutdown(self):
+        tasks = [
+            task for task in [self._ticker_task, self._reap_task] if task is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(
+            *[stream.stop() for stream in self._key_to_stream_map.values()],
+            return_exceptions=True,
+        )
+        self._key_to_stream_map = {}
+        self._symbol_to_ticker_map = {}
+        if self._public_exchange is not None:
+            await self._public_exchange.close()
+            self._public_exchange = None
+
+    async def _keep_watching_tickers(self):
+        if self._public_exchange is None:
+            self._public_exchange = ccxt_pro.okx({"enableRateLimit": True})
+        symbols = sorted(self._ticker_symbols)
+        backoff_seconds = 1.0
+        while True:
+            try:
+                tickers = await self._public_exchange.watch_tickers(symbols)
+                received_time = time.monotonic()
+                self._symbol_to_ticker_map.update(
+                    (symbol, (received_time, ticker))
+                    for symbol, ticker in tickers.items()
+                )
+                self.ticker_change_notifier.notify()
+                backoff_seconds = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                await asyncio.sleep(backoff_seconds)
+                backoff_seconds = min(backoff_seconds * 2, 30.0)
+
+    async def _keep_reaping(self):
+        while True:
+            await asyncio.sleep(self._idle_timeout_seconds / 10)
+            now = time.monotonic()
+            idle_keys = [
+                key
+                for key, stream in self._key_to_stream_map.items()
+                if now - stream.last_accessed_time > self._idle_timeout_seconds
+            ]
+            if len(idle_keys) == 0:
+                continue
+            await asyncio.gather(
+                *[self._key_to_stream_map.pop(key).stop() for key in idle_keys],
+                return_exceptions=True,
+            )
+            # the resubscription below repopulates the tickers still in use
+            self._symbol_to_ticker_map.clear()
+            self._resubscribe_tickers(
+                {
+                    symbol
+                    for stream in self._key_to_stream_map.values()
+                    for symbol in stream.get_ticker_symbols()
+                }
+            )
+
+
+# streams live as long as the worker, the app lifespan enables and shuts it down
+okx_risk_stream_manager = OkxRiskStreamManager()
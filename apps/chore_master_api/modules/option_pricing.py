@@ -0,0 +1,106 @@
+from modules.utils.import_utils import ImportUtils
+
+np = ImportUtils.lazy_import("numpy")
+
+# Abramowitz and Stegun 7.1.26, absolute error below 1.5e-7
+_ERF_P = 0.3275911
+_ERF_COEFFICIENTS = (0.254829592, -0.284496736, 1.421413741, -1.453152027, 1.061405429)
+
+
+def erf(x: "np.ndarray") -> "np.ndarray":
+    """
+    Element-wise error function, numpy has none and scipy is not a dependency.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    sign = np.sign(x)
+    x = np.abs(x)
+    t = 1.0 / (1.0 + _ERF_P * x)
+    polynomial = np.zeros_like(t)
+    for coefficient in reversed(_ERF_COEFFICIENTS):
+        polynomial = (polynomial + coefficient) * t
+    return sign * (1.0 - polynomial * np.exp(-x * x))
+
+
+def norm_cdf(x: "np.ndarray") -> "np.ndarray":
+    return 0.5 * (1.0 + erf(np.asarray(x) / np.sqrt(2.0)))
+
+
+def norm_pdf(x: "np.ndarray") -> "np.ndarray":
+    return np.exp(-0.5 * np.square(x)) / np.sqrt(2.0 * np.pi)
+
+
+def black_scholes_price(
+    is_call: "np.ndarray",
+    spot: "np.ndarray",
+    strike: "np.ndarray",
+    time_to_maturity: "np.ndarray",
+    rate: "np.ndarray",
+    volatility: "np.ndarray",
+) -> "np.ndarray":
+    """
+    European option prices over broadcast arrays. Expired options, or ones
+    without volatility, are worth their intrinsic value.
+    """
+    is_call, spot, strike, time_to_maturity, rate, volatility = np.broadcast_arrays(
+        is_call, spot, strike, time_to_maturity, rate, volatility
+    )
+    time_to_maturity = np.maximum(time_to_maturity, 0.0)
+    volatility = np.maximum(volatility, 0.0)
+    is_priced = (time_to_maturity > 0) & (volatility > 0)
+    # placeholders keep the formula finite where the intrinsic value is used
+    safe_time_to_maturity = np.where(is_priced, time_to_maturity, 1.0)
+    safe_volatility = np.where(is_priced, volatility, 1.0)
+    volatility_sqrt_time = safe_volatility * np.sqrt(safe_time_to_maturity)
+    d1 = (
+        np.log(spot / strike)
+        + (rate + 0.5 * np.square(safe_volatility)) * safe_time_to_maturity
+    ) / volatility_sqrt_time
+    d2 = d1 - volatility_sqrt_time
+    discounted_strike = strike * np.exp(-rate * time_to_maturity)
+    call_price = spot * norm_cdf(d1) - discounted_strike * norm_cdf(d2)
+    put_price = discounted_strike * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    intrinsic_value = np.where(
+        is_call,
+        np.maximum(spot - discounted_strike, 0.0),
+        np.maximum(discounted_strike - spot, 0.0),
+    )
+    return np.where(
+        is_priced, np.where(is_call, call_price, put_price), intrinsic_value
+    )
+
+
+def implied_volatility(
+    is_call: "np.ndarray",
+    option_price: "np.ndarray",
+    spot: "np.ndarray",
+    strike: "np.ndarray",
+    time_to_maturity: "np.ndarray",
+    rate: "np.ndarray",
+    min_volatility: float = 1e-4,
+    max_volatility: float = 5.0,
+    iteration_count: int = 60,
+) -> "np.ndarray":
+    """
+    Bisection on all options at once. Unlike Newton's method it cannot diverge
+    for deep in or out of the money options, prices outside the attainable
+    range end up at the bounds.
+    """
+    shape = np.broadcast_shapes(
+        np.shape(is_call),
+        np.shape(option_price),
+        np.shape(spot),
+        np.shape(strike),
+        np.shape(time_to_maturity),
+        np.shape(rate),
+    )
+    lower = np.full(shape, min_volatility)
+    upper = np.full(shape, max_volatility)
+    for _ in range(iteration_count):
+        middle = 0.5 * (lower + upper)
+        is_too_cheap = (
+            black_scholes_price(is_call, spot, strike, time_to_maturity, rate, middle)
+            < option_price
+        )
+        lower = np.where(is_too_cheap, middle, lower)
+        upper = np.where(is_too_cheap, upper, middle)
+    return 0.5 * (lower + upper)
@@ -0,0 +1,127 @@
+import math
+
+from modules.utils.import_utils import ImportUtils
+
+np = ImportUtils.lazy_import("numpy")
+
+DAYS_PER_YEAR = 365.0
+# bounds of the continuously compounded rate, yearly returns of -99.99% to 999900%
+_MIN_LOG_RATE = math.log(1e-4)
+_MAX_LOG_RATE = math.log(1e4)
+
+
+def linked_modified_dietz_returns(
+    valuation_days: "np.ndarray",
+    valuations: "np.ndarray",
+    cash_flow_days: "np.ndarray",
+    cash_flows: "np.ndarray",
+) -> "np.ndarray":
+    """
+    Return of every period between consecutive valuations, with the cash flows
+    within it weighted by the time they were invested. Linking them
+    approximates a time-weighted return without a valuation at every flow.
+    Cash flows are contributions, negative for withdrawals, at or before the
+    end of their period. Periods without capital return 0.
+    """
+    valuation_days = np.asarray(valuation_days, dtype=np.float64)
+    valuations = np.asarray(valuations, dtype=np.float64)
+    cash_flow_days = np.asarray(cash_flow_days, dtype=np.float64)
+    cash_flows = np.asarray(cash_flows, dtype=np.float64)
+    period_count = len(valuations) - 1
+    if period_count < 1:
+        return np.zeros(0)
+    periods = np.searchsorted(valuation_days, cash_flow_days, side="left") - 1
+    is_within = (periods >= 0) & (periods < period_count)
+    periods = periods[is_within]
+    cash_flow_days = cash_flow_days[is_within]
+    cash_flows = cash_flows[is_within]
+    period_days = np.diff(valuation_days)
+    weights = (valuation_days[periods + 1] - cash_flow_days) / np.where(
+        period_days[periods] > 0, period_days[periods], 1.0
+    )
+    net_cash_flows = np.bincount(periods, weights=cash_flows, minlength=period_count)
+    weighted_cash_flows = np.bincount(
+        periods, weights=weights * cash_flows, minlength=period_count
+    )
+    invested_capitals = valuations[:-1] + weighted_cash_flows
+    gains = valuations[1:] - valuations[:-1] - net_cash_flows
+    return np.where(
+        invested_capitals > 0,
+        gains / np.where(invested_capitals > 0, invested_capitals, 1.0),
+        0.0,
+    )
+
+
+def max_drawdowns(cumulative_returns: "np.ndarray") -> "np.ndarray":
+    """
+    Drawdown of a cumulative return series from its running peak, which is 0
+    or negative at every point.
+    """
+    wealth = 1.0 + np.asarray(cumulative_returns, dtype=np.float64)
+    peaks = np.maximum.accumulate(wealth)
+    return wealth / np.where(peaks > 0, peaks, 1.0) - 1.0
+
+
+def internal_rates_of_return(
+    cash_flow_years: "np.ndarray",
+    cash_flows: "np.ndarray",
+    iteration_count: int = 50,
+    tolerance: float = 1e-10,
+) -> "np.ndarray":
+    """
+    Yearly rates that make the net present value of every row of cash flows
+    zero, solved for all rows at once. Rows are padded with zero cash flows.
+    Newton's method on the continuously compounded rate converges in a few
+    steps from a flat guess, rows it leaves unsolved fall back to bisection
+    within a sign change. Rows without one, i.e. without both inflows and
+    outflows, are NaN.
+    """
+    cash_flow_years = np.atleast_2d(np.asarray(cash_flow_years, dtype=np.float64))
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=np.float64))
+
+    def get_npvs(log_rates: "np.ndarray") -> "np.ndarray":
+        return (cash_flows * np.exp(-log_rates[:, np.newaxis] * cash_flow_years)).sum(
+            axis=1
+        )
+
+    log_rates = np.zeros(len(cash_flows))
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for _ in range(iteration_count):
+            discounted_cash_flows = cash_flows * np.exp(
+                -log_rates[:, np.newaxis] * cash_flow_years
+            )
+            npvs = discounted_cash_flows.sum(axis=1)
+            derivatives = -(discounted_cash_flows * cash_flow_years).sum(axis=1)
+            steps = npvs / derivatives
+            log_rates = np.clip(
+                log_rates - np.where(np.isfinite(steps), steps, 0.0),
+                _MIN_LOG_RATE,
+                _MAX_LOG_RATE,
+            )
+            if np.all(np.abs(steps) < tolerance):
+                break
+        scales = np.abs(cash_flows).sum(axis=1)
+        is_solved = np.abs(get_npvs(log_rates)) <= tolerance * np.where(
+            scales > 0, scales, 1.0
+        )
+        if is_solved.all():
+            return np.expm1(log_rates)
+
+        lower = np.full(len(cash_flows), _MIN_LOG_RATE)
+        upper = np.full(len(cash_flows), _MAX_LOG_RATE)
+        lower_npvs = get_npvs(lower)
+        is_bracketed = np.sign(lower_npvs) * np.sign(get_npvs(upper)) < 0
+        for _ in range(100):
+            middle = 0.5 * (lower + upper)
+            middle_npvs = get_npvs(middle)
+            is_lower = np.sign(middle_npvs) == np.sign(lower_npvs)
+            lower = np.where(is_lower, middle, lower)
+            lower_npvs = np.where(is_lower, middle_npvs, lower_npvs)
+            upper = np.where(is_lower, upper, middle)
+    return np.expm1(
+        np.where(
+            is_solved,
+            log_rates,
+            np.where(is_bracketed, 0.5 * (lower + upper), np.nan),
+        )
+    )
@@ -0,0 +1,127 @@
+from enum import Enum
+from typing import NamedTuple
+
+from apps.chore_master_api.modules.option_pricing import black_scholes_price
+from modules.utils.import_utils import ImportUtils
+
+np = ImportUtils.lazy_import("numpy")
+
+
+class ScenarioPositionKindEnum(Enum):
+    LINEAR = 0
+    FUTURE = 1
+    OPTION = 2
+
+
+class ScenarioPositionBook(NamedTuple):
+    """
+    Positions as aligned columns, quantities are signed underlying units and
+    prices are in the numeraire.
+    """
+
+    kinds: "np.ndarray"
+    quantities: "np.ndarray"
+    underlying_prices: "np.ndarray"
+    # futures: the annualized simple rate implied by the basis
+    # options: the discount rate
+    rates: "np.ndarray"
+    time_to_maturities: "np.ndarray"
+    strikes: "np.ndarray"
+    volatilities: "np.ndarray"
+    is_calls: "np.ndarray"
+
+
+def create_scenario_position_book(position_dicts: list[dict]) -> ScenarioPositionBook:
+    """
+    Every dict has `kind`, `quantity` and `underlying_price`. Futures and options
+    also need `rate` and `time_to_maturity`, and options `strike`, `volatility`
+    and `is_call`.
+    """
+
+    def _column(key: str, default: float = 0.0) -> "np.ndarray":
+        return np.array(
+            [position_dict.get(key, default) for position_dict in position_dicts],
+            dtype=np.float64,
+        )
+
+    return ScenarioPositionBook(
+        kinds=np.array(
+            [position_dict["kind"].value for position_dict in position_dicts],
+            dtype=np.int64,
+        ),
+        quantities=_column("quantity"),
+        underlying_prices=_column("underlying_price"),
+        rates=_column("rate"),
+        time_to_maturities=_column("time_to_maturity"),
+        strikes=_column("strike", 1.0),
+        volatilities=_column("volatility"),
+        is_calls=np.array(
+            [position_dict.get("is_call", True) for position_dict in position_dicts],
+            dtype=bool,
+        ),
+    )
+
+
+def revalue(
+    book: ScenarioPositionBook,
+    spot_shocks: "np.ndarray",
+    volatility_shocks: "np.ndarray",
+    rate_shocks: "np.ndarray",
+) -> "np.ndarray":
+    """
+    Value of every position under every scenario, shocks broadcast against the
+    position axis which comes first. Spot shocks are relative, volatility and
+    rate shocks are absolute.
+    """
+
+    def expand(column: "np.ndarray") -> "np.ndarray":
+        return column.reshape((-1,) + (1,) * np.ndim(spot_shocks))
+
+    quantities = expand(book.quantities)
+    kinds = expand(book.kinds)
+    rates = expand(book.rates) + rate_shocks
+    time_to_maturities = expand(book.time_to_maturities)
+    underlying_prices = expand(book.underlying_prices) * (1.0 + spot_shocks)
+    linear_values = underlying_prices
+    future_values = underlying_prices * (1.0 + rates * time_to_maturities)
+    option_values = black_scholes_price(
+        expand(book.is_calls),
+        underlying_prices,
+        expand(book.strikes),
+        time_to_maturities,
+        rates,
+        expand(book.volatilities) + volatility_shocks,
+    )
+    unit_values = np.where(
+        kinds == ScenarioPositionKindEnum.OPTION.value,
+        option_values,
+        np.where(
+            kinds == ScenarioPositionKindEnum.FUTURE.value,
+            future_values,
+            linear_values,
+        ),
+    )
+    return quantities * unit_values
+
+
+def evaluate_scenario_grid(
+    book: ScenarioPositionBook,
+    spot_shocks: list[float],
+    volatility_shocks: list[float],
+    rate_shocks: list[float],
+) -> "np.ndarray":
+    """
+    Portfolio P&L of the full revaluation on the spot x volatility x rate grid,
+    as an array of shape (spot, volatility, rate).
+    """
+    spot_grid, volatility_grid, rate_grid = np.meshgrid(
+        np.asarray(spot_shocks, dtype=np.float64),
+        np.asarray(volatility_shocks, dtype=np.float64),
+        np.asarray(rate_shocks, dtype=np.float64),
+        indexing="ij",
+    )
+    base_value = revalue(
+        book, np.zeros((1, 1, 1)), np.zeros((1, 1, 1)), np.zeros((1, 1, 1))
+    ).sum()
+    scenario_values = revalue(book, spot_grid, volatility_grid, rate_grid).sum(axis=0)
+    return scenario_values - base_value
@@ -0,0 +1,112 @@
+import time
+from typing import NamedTuple
+
+from modules.utils.cache_utils import SingleFlightCache
+from modules.utils.import_utils import ImportUtils
+
+ccxt = ImportUtils.lazy_import("ccxt.async_support")
+np = ImportUtils.lazy_import("numpy")
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+# futures this close to expiry imply meaningless rates from a tiny basis
+MIN_TIME_TO_MATURITY = 1 / 365
+
+
+class TermStructureCurve(NamedTuple):
+    """
+    Annualized simple rates implied by the futures of an underlying, which is
+    `(future_price / spot_price - 1) / time_to_maturity`, sorted by maturity.
+    """
+
+    spot_price: float
+    time_to_maturities: "np.ndarray"
+    rates: "np.ndarray"
+
+
+# mark prices move all the time but the curve barely does, so every risk request
+# of the minute shares one batch of curves
+term_structure_curves_cache: SingleFlightCache[
+    dict[tuple[str, str], TermStructureCurve]
+] = SingleFlightCache(ttl_seconds=60, max_size=8)
+
+
+async def load_term_structure_curves() -> dict[tuple[str, str], TermStructureCurve]:
+    """
+    Curves of every OKX underlying with listed futures, keyed by `(base, quote)`
+    of the futures, from one batch of future mark prices and one of spot
+    tickers. Both the USD and USDT futures are priced against the `{base}/USDT`
+    spot.
+    """
+
+    async def _load() -> dict[tuple[str, str], TermStructureCurve]:
+        # the load is shared by every waiter, so it owns its exchange rather than
+        # using one a request closes when it finishes
+        exchange = ccxt.okx({"enableRateLimit": True})
+        try:
+            markets = await exchange.load_markets()
+            future_mark_prices = await exchange.fetch_mark_prices(
+                params={"type": "future"}
+            )
+            spot_tickers = await exchange.fetch_tickers(params={"type": "spot"})
+        finally:
+            await exchange.close()
+        now_milliseconds = time.time() * 1000
+        underlying_to_points_map: dict[tuple[str, str], list[tuple[float, float]]] = {}
+        for symbol, mark_price in future_mark_prices.items():
+            market = markets.get(symbol)
+            spot_ticker = spot_tickers.get(f"{market['base']}/USDT") if market else None
+            if (
+                market is None
+                or market.get("expiry") is None
+                or spot_ticker is None
+                or not spot_ticker["last"]
+                or not mark_price["markPrice"]
+            ):
+                continue
+            time_to_maturity = (
+                (market["expiry"] - now_milliseconds) / 1000 / SECONDS_PER_YEAR
+            )
+            if time_to_maturity < MIN_TIME_TO_MATURITY:
+                continue
+            underlying_to_points_map.setdefault(
+                (market["base"], market["quote"]), []
+            ).append((time_to_maturity, mark_price["markPrice"]))
+
+        curve_map = {}
+        for (base_currency, quote_currency), points in underlying_to_points_map.items():
+            spot_price = spot_tickers[f"{base_currency}/USDT"]["last"]
+            time_to_maturities, future_prices = np.array(sorted(points)).T
+            curve_map[(base_currency, quote_currency)] = TermStructureCurve(
+                spot_price=spot_price,
+                time_to_maturities=time_to_maturities,
+                rates=(future_prices / spot_price - 1.0) / time_to_maturities,
+            )
+        return curve_map
+
+    return await term_structure_curves_cache.get_or_fetch("okx", _load)
+
+
+def interpolate_rates(
+    curve: TermStructureCurve, time_to_maturities: "np.ndarray"
+) -> "np.ndarray":
+    """
+    Simple rates at the given maturities, linear between the listed futures and
+    flat beyond them.
+    """
+    return np.interp(time_to_maturities, curve.time_to_maturities, curve.rates)
+
+
+def to_continuous_rates(
+    rates: "np.ndarray", time_to_maturities: "np.ndarray"
+) -> "np.ndarray":
+    """
+    Continuously compounded equivalents of simple rates, as Black-Scholes
+    expects.
+    """
+    time_to_maturities = np.asarray(time_to_maturities, dtype=np.float64)
+    return np.where(
+        time_to_maturities > 0,
+        np.log1p(rates * time_to_maturities)
+        / np.where(time_to_maturities > 0, time_to_maturities, 1.0),
+        rates,
+    )
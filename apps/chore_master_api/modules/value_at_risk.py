@@ -0,0 +1,163 @@
+import asyncio
+from datetime import datetime, timezone
+from enum import Enum
+from typing import NamedTuple, Optional
+
+from modules.utils.cache_utils import SingleFlightCache
+from modules.utils.import_utils import ImportUtils
+
+ccxt = ImportUtils.lazy_import("ccxt.async_support")
+np = ImportUtils.lazy_import("numpy")
+
+# currencies valued at par against the numeraire, they carry no market risk
+STABLE_CURRENCIES = {"USDT", "USDC", "USD"}
+
+
+class ValueAtRiskMethodEnum(Enum):
+    HISTORICAL = "historical"
+    MONTE_CARLO = "monte_carlo"
+
+
+class ReturnMatrix(NamedTuple):
+    """
+    Daily log returns, one row per day and one column per currency.
+    """
+
+    currencies: list[str]
+    timestamps: "np.ndarray"
+    log_returns: "np.ndarray"
+
+
+class ValueAtRiskResult(NamedTuple):
+    value_at_risk: float
+    expected_shortfall: float
+    scenario_count: int
+    # average P&L of each currency over the tail scenarios, they sum up to
+    # `-expected_shortfall`
+    expected_shortfall_contributions: "np.ndarray"
+
+
+# returns only change once a day, so the matrix of a currency universe is shared
+# by every request of the day
+return_matrix_cache: SingleFlightCache[ReturnMatrix] = SingleFlightCache(
+    ttl_seconds=24 * 60 * 60, max_size=64
+)
+
+
+async def load_return_matrix(
+    currencies: list[str], lookback_days: int, max_concurrency: int = 8
+) -> ReturnMatrix:
+    """
+    Build the return matrix from daily OKX `{currency}/USDT` candles over the
+    days every currency has a close. Currencies without a market are left out.
+    """
+    currencies = sorted(set(currencies))
+    today = datetime.now(tz=timezone.utc).date().isoformat()
+
+    async def _load() -> ReturnMatrix:
+        # the load is shared by every waiter, so it owns its exchange rather than
+        # using one a request closes when it finishes
+        exchange = ccxt.okx({"enableRateLimit": True})
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _fetch_closes(currency: str) -> dict[int, float]:
+            async with semaphore:
+                candles = await exchange.fetch_ohlcv(
+                    f"{currency}/USDT", "1d", limit=lookback_days + 1
+                )
+            return {candle[0]: candle[4] for candle in candles}
+
+        try:
+            markets = await exchange.load_markets()
+            priced_currencies = [
+                currency for currency in currencies if f"{currency}/USDT" in markets
+            ]
+            timestamp_to_close_maps = await asyncio.gather(
+                *[_fetch_closes(currency) for currency in priced_currencies]
+            )
+        finally:
+            await exchange.close()
+        shared_timestamps = sorted(
+            set.intersection(
+                *[set(close_map.keys()) for close_map in timestamp_to_close_maps]
+            )
+            if len(timestamp_to_close_maps) > 0
+            else set()
+        )
+        close_matrix = np.array(
+            [
+                [close_map[timestamp] for close_map in timestamp_to_close_maps]
+                for timestamp in shared_timestamps
+            ],
+            dtype=np.float64,
+        ).reshape(len(shared_timestamps), len(priced_currencies))
+        return ReturnMatrix(
+            currencies=priced_currencies,
+            timestamps=np.asarray(shared_timestamps[1:], dtype=np.int64),
+            log_returns=np.diff(np.log(close_matrix), axis=0),
+        )
+
+    return await return_matrix_cache.get_or_fetch(
+        (tuple(currencies), lookback_days, today), _load
+    )
+
+
+def get_horizon_log_returns(
+    log_returns: "np.ndarray", horizon_days: int
+) -> "np.ndarray":
+    """
+    Overlapping `horizon_days` log returns, summed through a cumulative sum.
+    """
+    if horizon_days <= 1:
+        return log_returns
+    cumulative_log_returns = np.vstack(
+        [np.zeros((1, log_returns.shape[1])), np.cumsum(log_returns, axis=0)]
+    )
+    return (
+        cumulative_log_returns[horizon_days:] - cumulative_log_returns[:-horizon_days]
+    )
+
+
+def simulate_log_returns(
+    log_returns: "np.ndarray",
+    scenario_count: int,
+    horizon_days: int,
+    seed: Optional[int] = None,
+) -> "np.ndarray":
+    """
+    Draw multivariate normal `horizon_days` log returns with the mean and
+    covariance of the history.
+    """
+    mean = log_returns.mean(axis=0)
+    covariance = np.atleast_2d(np.cov(log_returns, rowvar=False))
+    # short histories give a singular covariance, which cholesky rejects
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    factor = eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+    generator = np.random.default_rng(seed)
+    standard_normals = generator.standard_normal((scenario_count, len(mean)))
+    return mean * horizon_days + (standard_normals @ factor.T) * np.sqrt(horizon_days)
+
+
+def compute_value_at_risk(
+    scenario_log_returns: "np.ndarray",
+    exposures: "np.ndarray",
+    confidence_level: float,
+) -> ValueAtRiskResult:
+    """
+    Revalue the exposures, in the numeraire, under every scenario with a single
+    matrix product and read VaR and ES off the loss tail. Both are reported as
+    positive losses.
+    """
+    scenario_returns = np.expm1(scenario_log_returns)
+    scenario_pnls = scenario_returns @ exposures
+    value_at_risk = -float(np.quantile(scenario_pnls, 1.0 - confidence_level))
+    is_tail = scenario_pnls <= -value_at_risk
+    expected_shortfall_contributions = (scenario_returns[is_tail] * exposures).mean(
+        axis=0
+    )
+    return ValueAtRiskResult(
+        value_at_risk=value_at_risk,
+        expected_shortfall=-float(expected_shortfall_contributions.sum()),
+        scenario_count=len(scenario_pnls),
+        expected_shortfall_contributions=expected_shortfall_contributions,
+    )
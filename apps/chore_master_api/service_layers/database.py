@@ -1,11 +1,13 @@
 from apps.chore_master_api.config import get_chore_master_api_web_server_config
 from apps.chore_master_api.end_user_space.mapper import Mapper
-from apps.chore_master_api.web_server.dependencies.database import get_schema_migration
+from apps.chore_master_api.web_server.dependencies.database import (
+    create_schema_migration,
+)
 from modules.database.relational_database import DataMigration, RelationalDatabase
 from modules.utils.file_system_utils import FileSystemUtils
 
 
-async def _get_db_and_db_registry():
+async def create_db_and_db_registry():
     chore_master_api_web_server_config = get_chore_master_api_web_server_config()
     chore_master_db = RelationalDatabase(
         chore_master_api_web_server_config.DATABASE_ORIGIN
@@ -25,8 +27,8 @@ async def generate_revision():
     (
         chore_master_db,
         chore_master_db_registry,
-    ) = await _get_db_and_db_registry()
-    schema_migration = await get_schema_migration(chore_master_db)
+    ) = await create_db_and_db_registry()
+    schema_migration = create_schema_migration(chore_master_db)
     schema_migration.generate_revision(metadata=chore_master_db_registry.metadata)
 
 
@@ -34,8 +36,8 @@ async def upgrade():
     (
         chore_master_db,
         chore_master_db_registry,
-    ) = await _get_db_and_db_registry()
-    schema_migration = await get_schema_migration(chore_master_db)
+    ) = await create_db_and_db_registry()
+    schema_migration = create_schema_migration(chore_master_db)
     schema_migration.upgrade(metadata=chore_master_db_registry.metadata)
 
 
@@ -43,7 +45,7 @@ async def import_data():
     (
         chore_master_db,
         chore_master_db_registry,
-    ) = await _get_db_and_db_registry()
+    ) = await create_db_and_db_registry()
 
     data_migration = DataMigration(chore_master_db, chore_master_db_registry)
     for directory in ["global", "admin"]:
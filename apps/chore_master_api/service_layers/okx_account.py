@@ -0,0 +1,34 @@
+from typing import Optional
+
+from modules.database.async_mongo_client import AsyncMongoDB
+from modules.utils.cache_utils import SingleFlightCache
+
+OKX_ACCOUNT_MAP_TTL_SECONDS = 30
+
+# keyed by end user reference. No live endpoint writes `okx_trade.account_map`
+# (the account center handler is commented out), so the 30s TTL is the only
+# invalidation and bounds how long edited credentials are served outdated
+okx_account_map_cache: SingleFlightCache[Optional[dict]] = SingleFlightCache(
+    ttl_seconds=OKX_ACCOUNT_MAP_TTL_SECONDS, max_size=1024
+)
+
+
+async def get_okx_account_map(
+    chore_master_api_db: AsyncMongoDB, end_user_reference: str
+) -> Optional[dict]:
+    """
+    Return `okx_trade.account_map` of the end user, or `None` when it is not set.
+    The map is shared by concurrent callers and must not be mutated.
+    """
+
+    async def _fetch() -> Optional[dict]:
+        end_user_collection = chore_master_api_db.get_collection("end_user")
+        end_user_dict = await end_user_collection.find_one(
+            filter={"reference": end_user_reference},
+            projection={"_id": 0, "okx_trade.account_map": 1},
+        )
+        if end_user_dict is None:
+            return None
+        return end_user_dict.get("okx_trade", {}).get("account_map")
+
+    return await okx_account_map_cache.get_or_fetch(end_user_reference, _fetch)
@@ -0,0 +1,653 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+from math import erf
+from typing import NamedTuple, Optional
+
+from apps.chore_master_api.modules.okx_risk_stream import okx_risk_stream_manager
+from apps.chore_master_api.modules.option_pricing import implied_volatility
+from apps.chore_master_api.modules.term_structure import (
+    TermStructureCurve,
+    interpolate_rates,
+    load_term_structure_curves,
+    to_continuous_rates,
+)
+from apps.chore_master_api.service_layers.okx_account import get_okx_account_map
+from modules.database.async_mongo_client import AsyncMongoDB
+from modules.utils.cache_utils import SingleFlightCache
+from modules.utils.import_utils import ImportUtils
+
+ccxt = ImportUtils.lazy_import("ccxt.async_support")
+np = ImportUtils.lazy_import("numpy")
+
+# risk metrics of every position are converted into this currency when aggregated
+NUMERAIRE_CURRENCY = "USDT"
+
+# public market data is the same for every account, so concurrent requests share it
+okx_ticker_cache: SingleFlightCache[dict] = SingleFlightCache(ttl_seconds=2)
+okx_markets_cache: SingleFlightCache[list] = SingleFlightCache(ttl_seconds=300)
+
+
+class OkxPosition(NamedTuple):
+    symbol: str
+    instrument: str
+    account_name: str
+    max_leverage: Optional[float]
+    side: str
+    token_amount: float
+    contract_amount: Optional[float]
+    liquidation_price: Optional[float]
+    entry_price: Optional[float]
+    mark_price: Optional[float]
+    profit_and_loss: Optional[float]
+    realized_pnl: Optional[float]
+    unrealized_pnl: Optional[float]
+    percentage_to_liquidation: Optional[float]
+    current_margin: Optional[float]
+    initial_margin: Optional[float]
+    maintenance_margin: Optional[float]
+    margin_ratio: Optional[float]
+
+
+class OkxPositionFxRisk(NamedTuple):
+    symbol: str
+    instrument: str
+    base_currency: str
+    quote_currency: str
+    account_name: str
+    side: str
+    token_amount: float
+    delta: float
+    gamma: float
+    vega: float
+    theta: float
+
+
+class OkxPositionIrRisk(NamedTuple):
+    symbol: str
+    instrument: str
+    base_currency: str
+    quote_currency: str
+    account_name: str
+    side: str
+    token_amount: float
+    dv01: float
+    rho: float
+
+
+class OkxRiskSummary(NamedTuple):
+    aggregated_dv01: float
+    aggregated_gamma: float
+    aggregated_theta: float
+    aggregated_vega: float
+    aggregated_rho: float
+    aggregated_delta: float
+    numeraire_currency: str
+
+
+async def fetch_okx_markets() -> list[dict]:
+    async def _fetch() -> list[dict]:
+        # the fetch is shared by every waiter, so it owns its exchange rather than
+        # borrowing one that the first caller may close
+        exchange = ccxt.okx({"enableRateLimit": True})
+        try:
+            return await exchange.fetch_markets()
+        finally:
+            await exchange.close()
+
+    return await okx_markets_cache.get_or_fetch("okx", _fetch)
+
+
+async def fetch_okx_ticker(symbol: str) -> dict:
+    # streamed tickers are always at least as fresh as the cached ones
+    ticker = okx_risk_stream_manager.get_ticker(symbol)
+    if ticker is not None:
+        return ticker
+
+    async def _fetch() -> dict:
+        markets = await fetch_okx_markets()
+        exchange = ccxt.okx({"enableRateLimit": True})
+        try:
+            # the cached markets spare the new exchange from loading them again
+            exchange.set_markets(markets)
+            return await exchange.fetch_ticker(symbol)
+        finally:
+            await exchange.close()
+
+    return await okx_ticker_cache.get_or_fetch(("okx", symbol), _fetch)
+
+
+async def get_okx_market_info_by_symbol(symbol: str) -> Optional[dict]:
+    markets = await fetch_okx_markets()
+    return next((market for market in markets if market["symbol"] == symbol), None)
+
+
+async def get_insturment_by_symbol(symbol: str) -> str:
+    target_market = await get_okx_market_info_by_symbol(symbol=symbol)
+    if target_market["type"] == "spot":
+        instrument = "spot"
+    elif target_market["type"] == "future":
+        instrument = "future"
+    elif target_market["type"] == "option":
+        instrument = "option"
+    elif target_market["type"] == "swap":
+        instrument = "perpetual"
+    else:
+        instrument = "Not Found"
+    return instrument
+
+
+async def get_currencies_by_symbol(symbol: str) -> tuple[str, str]:
+    target_market = await get_okx_market_info_by_symbol(symbol=symbol)
+    return target_market["base"], target_market["quote"]
+
+
+async def find_okx_positions(
+    chore_master_api_db: AsyncMongoDB,
+    user_reference: str,
+    okx_account_names: list[str],
+) -> list[OkxPosition]:
+    """
+    Derivative positions and spot balances of the selected OKX accounts of the
+    user, served from the streamed book when the account is streaming and
+    fetched through REST otherwise. Unknown account names are skipped.
+    """
+    okx_account_map = await get_okx_account_map(chore_master_api_db, user_reference)
+    if okx_account_map is None:
+        return []
+
+    positions = []
+    for okx_account_name in okx_account_names:
+        okx_account = okx_account_map.get(okx_account_name)
+        if okx_account is None:
+            logging.info(f"selected_okx_account_name: {okx_account_name}")
+            continue
+        okx_account_stream = await okx_risk_stream_manager.get_ready_stream(
+            user_reference, okx_account_name, okx_account
+        )
+        if okx_account_stream is not None:
+            book = okx_account_stream.book
+            positions.extend(
+                await _to_okx_positions(
+                    okx_account_name,
+                    raw_positions=list(book.position_map.values()),
+                    trading_balance_details=list(
+                        book.trading_balance_detail_map.values()
+                    ),
+                    funding_balance_details=book.funding_balance_details,
+                    savings_balances=book.savings_balances,
+                )
+            )
+            continue
+
+        exchange = ccxt.okx(
+            {
+                "apiKey": okx_account["api_key"],
+                "secret": okx_account["passphrase"],
+                "password": okx_account["password"],
+                "enableRateLimit": True,
+            }
+        )
+        try:
+            raw_positions = await exchange.fetch_positions()
+            raw_balances = await exchange.fetch_balance({"type": "trading"})
+            raw_balances_funding_account = await exchange.fetch_balance(
+                {"type": "funding"}
+            )
+            finance_account = await exchange.privateGetFinanceSavingsBalance()
+            positions.extend(
+                await _to_okx_positions(
+                    okx_account_name,
+                    raw_positions=raw_positions,
+                    trading_balance_details=raw_balances["info"]["data"][0]["details"],
+                    funding_balance_details=raw_balances_funding_account["info"][
+                        "data"
+                    ],
+                    savings_balances=finance_account["data"],
+                )
+            )
+        finally:
+            await exchange.close()
+    return positions
+
+
+async def _to_okx_positions(
+    okx_account_name: str,
+    raw_positions: list[dict],
+    trading_balance_details: list[dict],
+    funding_balance_details: list[dict],
+    savings_balances: list[dict],
+) -> list[OkxPosition]:
+    def _to_spot_position(
+        currency: str, token_amount: str, margin_ratio: Optional[float] = None
+    ) -> OkxPosition:
+        return OkxPosition(
+            symbol=currency,
+            instrument="spot",
+            account_name=okx_account_name,
+            max_leverage=1,
+            side="long",
+            token_amount=float(token_amount),
+            contract_amount=None,
+            liquidation_price=None,
+            entry_price=None,
+            mark_price=None,
+            profit_and_loss=None,
+            realized_pnl=None,
+            unrealized_pnl=None,
+            percentage_to_liquidation=None,
+            current_margin=None,
+            initial_margin=None,
+            maintenance_margin=None,
+            margin_ratio=margin_ratio,
+        )
+
+    positions = [
+        OkxPosition(
+            symbol=position["symbol"],
+            instrument=await get_insturment_by_symbol(position["symbol"]),
+            account_name=okx_account_name,
+            max_leverage=position["leverage"],
+            side=position["side"],
+            token_amount=position["contracts"] * position["contractSize"],
+            contract_amount=position["contracts"],
+            liquidation_price=position["liquidationPrice"],
+            entry_price=position["entryPrice"],
+            mark_price=position["markPrice"],
+            profit_and_loss=position["unrealizedPnl"] + position["realizedPnl"],
+            realized_pnl=position["realizedPnl"],
+            unrealized_pnl=position["unrealizedPnl"],
+            percentage_to_liquidation=(
+                abs(
+                    (position["liquidationPrice"] - position["markPrice"])
+                    / position["markPrice"]
+                )
+                if position["liquidationPrice"] is not None
+                else None
+            ),
+            current_margin=position["initialMargin"],
+            initial_margin=position["collateral"],
+            maintenance_margin=position["maintenanceMargin"],
+            margin_ratio=position["marginRatio"],
+        )
+        for position in raw_positions
+    ]
+    positions.extend(
+        _to_spot_position(
+            balance["ccy"],
+            balance["eq"],
+            margin_ratio=(
+                float(Decimal(balance["mgnRatio"]))
+                if balance["mgnRatio"] != ""
+                else None
+            ),
+        )
+        for balance in trading_balance_details
+    )
+    positions.extend(
+        _to_spot_position(balance["ccy"], balance["bal"])
+        for balance in funding_balance_details
+    )
+    positions.extend(
+        _to_spot_position(balance["ccy"], balance["amt"])
+        for balance in savings_balances
+    )
+    return positions
+
+
+# Rho function (the derivative of option price with respect to risk-free interest rate)
+def get_rho(option_type, S, K, T, r, sigma):
+    d2 = (np.log(S / K) + (r - 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
+    if option_type == "call":
+        return K * T * np.exp(-r * T) * (0.5 * (1.0 + erf(d2 / np.sqrt(2.0))))
+    else:
+        return -K * T * np.exp(-r * T) * (0.5 * (1.0 + erf(-d2 / np.sqrt(2.0))))
+
+
+def _get_days_to_maturity(market_info: dict) -> float:
+    maturity_time = datetime.strptime(
+        market_info["expiryDatetime"], "%Y-%m-%dT%H:%M:%S.%fZ"
+    )
+    current_time = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+    days_to_maturity = float((maturity_time - current_time).days)
+    if days_to_maturity < 1:
+        seconds_to_maturity = (maturity_time - current_time).seconds
+        days_to_maturity = seconds_to_maturity / (24 * 60 * 60)
+    return days_to_maturity
+
+
+async def compute_okx_fx_risks(
+    positions: list[OkxPosition],
+) -> list[OkxPositionFxRisk]:
+    """
+    Delta, gamma, vega and theta of every position in its quote currency, for a
+    1% move of the base currency.
+    """
+    positions_fx_risk = []
+    exchange_rate_map = defaultdict(dict)
+    for position in positions:
+        if position.instrument != "spot":
+            base_currency, quote_currency = await get_currencies_by_symbol(
+                position.symbol
+            )
+        else:
+            base_currency = position.symbol
+            quote_currency = "USDT"
+
+        if base_currency + "/" + quote_currency in exchange_rate_map:
+            exchange_rate = exchange_rate_map[base_currency + "/" + quote_currency]
+        else:
+            # Get base currency to quote currency exchange rate
+            query_symbol = (
+                base_currency + "/" + quote_currency + "T"
+                if quote_currency == "USD"
+                else base_currency + "/" + quote_currency
+            )
+            exchange_rate = (
+                (await fetch_okx_ticker(query_symbol))["last"]
+                if base_currency != quote_currency
+                else 1
+            )
+            exchange_rate_map[query_symbol] = exchange_rate
+
+        delta = 0.0
+        gamma = 0.0
+        vega = 0.0
+        theta = 0.0
+
+        if position.instrument == "spot":
+            if base_currency == quote_currency:
+                delta = 0.0
+            else:
+                delta = position.token_amount * (
+                    +0.01 * exchange_rate
+                    if position.side == "long"
+                    else -0.01 * exchange_rate
+                )
+
+        elif position.instrument == "future":
+            market_info = await get_okx_market_info_by_symbol(position.symbol)
+            days_to_maturity = _get_days_to_maturity(market_info)
+            time_to_maturity = days_to_maturity / 365
+            time_to_maturity_tomorrow = max((days_to_maturity - 1), 0.0) / 365
+            if days_to_maturity <= 1.0:
+                theta = 0.0
+            else:
+                # get the spot price from the order book
+                spot_symbol = base_currency + "/" + quote_currency
+                spot_price = await fetch_okx_ticker(spot_symbol)
+                implied_term_rate = (
+                    (position.mark_price - spot_price["last"])
+                    / spot_price["last"]
+                    / time_to_maturity
+                )
+                term_price_today = spot_price["last"] * (
+                    1 + implied_term_rate * time_to_maturity
+                )
+                theoretical_term_price_in_tomorrow = spot_price["last"] * (
+                    1 + implied_term_rate * time_to_maturity_tomorrow
+                )
+                theta = (
+                    (theoretical_term_price_in_tomorrow - term_price_today)
+                    * position.token_amount
+                    * (+1 if position.side == "long" else -1)
+                )
+            delta = position.token_amount * (
+                +0.01 * exchange_rate
+                if position.side == "long"
+                else -0.01 * exchange_rate
+            )
+
+        elif position.instrument == "option":
+            # option greeks are not aggregated into the fx risk yet
+            continue
+
+        elif position.instrument == "perpetual":
+            delta = position.token_amount * (
+                +0.01 * exchange_rate
+                if position.side == "long"
+                else -0.01 * exchange_rate
+            )
+        else:
+            logging.info(f"symbol: {position.symbol}, greeks do not calculate")
+
+        positions_fx_risk.append(
+            OkxPositionFxRisk(
+                symbol=position.symbol,
+                instrument=position.instrument,
+                base_currency=base_currency,
+                quote_currency=quote_currency,
+                account_name=position.account_name,
+                side=position.side,
+                token_amount=position.token_amount,
+                delta=delta,
+                gamma=gamma,
+                vega=vega,
+                theta=theta,
+            )
+        )
+    return positions_fx_risk
+
+
+async def compute_okx_ir_risks(
+    positions: list[OkxPosition],
+) -> list[OkxPositionIrRisk]:
+    """
+    DV01 of futures and rho of options for a 1 percentage point rate move, with
+    rates read off the futures term structure of the underlying.
+    """
+    positions_ir_risk = []
+    # one shared curve per underlying instead of a spot ticker per position
+    if any(position.instrument in ("future", "option") for position in positions):
+        term_structure_curve_map = await load_term_structure_curves()
+    else:
+        term_structure_curve_map = {}
+    for position in positions:
+        positions_ir_risk.append(
+            await _get_position_ir_risk(position, term_structure_curve_map)
+        )
+    return positions_ir_risk
+
+
+async def _get_position_ir_risk(
+    position: OkxPosition,
+    term_structure_curve_map: dict[tuple[str, str], TermStructureCurve],
+) -> OkxPositionIrRisk:
+    if position.instrument != "spot":
+        base_currency, quote_currency = await get_currencies_by_symbol(position.symbol)
+    else:
+        base_currency = position.symbol
+        quote_currency = "USDT"
+    term_structure_curve = term_structure_curve_map.get((base_currency, quote_currency))
+
+    # DV01 and Rho change interest rate by 1 percentage point
+    change_in_interest_rate = 0.01
+
+    dvo1 = 0.0
+    rho = 0.0
+
+    if position.instrument == "future":
+        market_info = await get_okx_market_info_by_symbol(position.symbol)
+        days_to_maturity = _get_days_to_maturity(market_info)
+        time_to_maturity = days_to_maturity / 365
+        if days_to_maturity > 1.0 and term_structure_curve is not None:
+            spot_price = term_structure_curve.spot_price
+            implied_term_rate = float(
+                interpolate_rates(term_structure_curve, time_to_maturity)
+            )
+            term_price_today = spot_price * (1 + implied_term_rate * time_to_maturity)
+            term_price_after_change_in_interest_rate = spot_price * (
+                1 + (implied_term_rate + change_in_interest_rate) * time_to_maturity
+            )
+            dvo1 = (
+                (term_price_after_change_in_interest_rate - term_price_today)
+                * position.token_amount
+                * (+1 if position.side == "long" else -1)
+            )
+
+    elif position.instrument == "option":
+        market_info = await get_okx_market_info_by_symbol(position.symbol)
+        # the curve is priced against the same spot, so a ticker is only fetched
+        # for underlyings without listed futures
+        if term_structure_curve is not None:
+            spot_price = term_structure_curve.spot_price
+        else:
+            spot_symbol = (
+                base_currency + "/" + quote_currency + "T"
+                if quote_currency == "USD"
+                else base_currency + "/" + quote_currency
+            )
+            spot_price = (await fetch_okx_ticker(spot_symbol))["last"]
+        option_type = "put" if market_info["id"][-1:] == "P" else "call"
+        strike_price = float(Decimal(market_info["strike"]))
+        time_to_maturity = _get_days_to_maturity(market_info) / 365
+
+        # Implied volatility
+        option_ticker = await fetch_okx_ticker(position.symbol)
+        # coin margined options are quoted in the base currency
+        option_price = (option_ticker["last"] or 0.0) * (
+            spot_price if market_info.get("settle") == base_currency else 1.0
+        )
+        if term_structure_curve is None or time_to_maturity <= 0:
+            implied_term_rate = 0.0
+        else:
+            implied_term_rate = float(
+                to_continuous_rates(
+                    interpolate_rates(term_structure_curve, time_to_maturity),
+                    time_to_maturity,
+                )
+            )
+        if time_to_maturity > 0 and option_price:
+            sigma = float(
+                implied_volatility(
+                    option_type == "call",
+                    option_price,
+                    spot_price,
+                    strike_price,
+                    time_to_maturity,
+                    implied_term_rate,
+                )
+            )
+            rho = (
+                get_rho(
+                    option_type,
+                    spot_price,
+                    strike_price,
+                    time_to_maturity,
+                    implied_term_rate,
+                    sigma,
+                )
+                * change_in_interest_rate
+                * position.token_amount
+                * (+1 if position.side == "long" else -1)
+            )
+    elif position.instrument not in ("spot", "perpetual"):
+        logging.info(f"symbol: {position.symbol}, greeks do not calculate")
+
+    return OkxPositionIrRisk(
+        symbol=position.symbol,
+        instrument=position.instrument,
+        base_currency=base_currency,
+        quote_currency=quote_currency,
+        account_name=position.account_name,
+        side=position.side,
+        token_amount=position.token_amount,
+        dv01=dvo1,
+        rho=rho,
+    )
+
+
+async def aggregate_okx_risks(
+    positions_fx_risk: list[OkxPositionFxRisk],
+    positions_ir_risk: list[OkxPositionIrRisk],
+) -> OkxRiskSummary:
+    """
+    Sum up the risks of every position in `NUMERAIRE_CURRENCY`. Positions whose
+    quote currency has no exchange rate are left out.
+    """
+    symbol_to_exchange_rate_map: dict[str, float] = {}
+
+    async def _get_exchange_rate(quote_currency: str) -> Optional[float]:
+        query_symbol = (
+            quote_currency + "T" + "/" + NUMERAIRE_CURRENCY
+            if quote_currency == "USD"
+            else quote_currency + "/" + NUMERAIRE_CURRENCY
+        )
+        if query_symbol in symbol_to_exchange_rate_map:
+            return symbol_to_exchange_rate_map[query_symbol]
+        inverse_query_symbol = (
+            NUMERAIRE_CURRENCY + "/" + quote_currency + "T"
+            if quote_currency == "USD"
+            else NUMERAIRE_CURRENCY + "/" + quote_currency
+        )
+        try:
+            exchange_rate = (
+                (await fetch_okx_ticker(query_symbol))["last"]
+                if query_symbol.split("/")[0] != query_symbol.split("/")[1]
+                else 1
+            )
+        except Exception:
+            try:
+                exchange_rate = 1 / (
+                    (await fetch_okx_ticker(inverse_query_symbol))["last"]
+                    if inverse_query_symbol.split("/")[0]
+                    != inverse_query_symbol.split("/")[1]
+                    else 1
+                )
+            except Exception:
+                return None
+        symbol_to_exchange_rate_map[query_symbol] = exchange_rate
+        return exchange_rate
+
+    aggregated_risks_map = defaultdict(float)
+    for fx_risk in positions_fx_risk:
+        if fx_risk.quote_currency == NUMERAIRE_CURRENCY:
+            exchange_rate = 1
+        else:
+            exchange_rate = await _get_exchange_rate(fx_risk.quote_currency)
+        if exchange_rate is None:
+            logging.info(f"symbol: {fx_risk.symbol}, exchange rate not found")
+            continue
+        aggregated_risks_map["aggregated_delta"] += fx_risk.delta * exchange_rate
+        aggregated_risks_map["aggregated_vega"] += fx_risk.vega * exchange_rate
+        aggregated_risks_map["aggregated_gamma"] += fx_risk.gamma * exchange_rate
+        aggregated_risks_map["aggregated_theta"] += fx_risk.theta * exchange_rate
+
+    for ir_risk in positions_ir_risk:
+        if ir_risk.quote_currency == NUMERAIRE_CURRENCY:
+            exchange_rate = 1
+        else:
+            exchange_rate = await _get_exchange_rate(ir_risk.quote_currency)
+        if exchange_rate is None:
+            logging.info(f"symbol: {ir_risk.symbol}, exchange rate not found")
+            continue
+        aggregated_risks_map["aggregated_dv01"] += ir_risk.dv01 * exchange_rate
+        aggregated_risks_map["aggregated_rho"] += ir_risk.rho * exchange_rate
+
+    return OkxRiskSummary(
+        aggregated_dv01=aggregated_risks_map["aggregated_dv01"],
+        aggregated_gamma=aggregated_risks_map["aggregated_gamma"],
+        aggregated_theta=aggregated_risks_map["aggregated_theta"],
+        aggregated_vega=aggregated_risks_map["aggregated_vega"],
+        aggregated_rho=aggregated_risks_map["aggregated_rho"],
+        aggregated_delta=aggregated_risks_map["aggregated_delta"],
+        numeraire_currency=NUMERAIRE_CURRENCY,
+    )
+
+
+async def compute_okx_risk_summary(
+    chore_master_api_db: AsyncMongoDB,
+    user_reference: str,
+    okx_account_names: list[str],
+) -> OkxRiskSummary:
+    """
+    Aggregated risks of the selected accounts, with the fx and ir risks computed
+    from a single fetch of the positions.
+    """
+    positions = await find_okx_positions(
+        chore_master_api_db, user_reference, okx_account_names
+    )
+    return await aggregate_okx_risks(
+        await compute_okx_fx_risks(positions), await compute_okx_ir_risks(positions)
+    )
@@ -0,0 +1,975 @@
+from __future__ import annotations
+
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, NamedTuple, Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.future import select
+
+from apps.chore_master_api.end_user_space.models.finance import (
+    Account,
+    BalanceEntry,
+    BalanceSheet,
+    Portfolio,
+    PortfolioHoldingSnapshot,
+    Price,
+    Transaction,
+    Transfer,
+)
+from apps.chore_master_api.end_user_space.unit_of_works.finance import (
+    FinanceSQLAlchemyUnitOfWork,
+)
+from apps.chore_master_api.modules.performance import (
+    DAYS_PER_YEAR,
+    internal_rates_of_return,
+    linked_modified_dietz_returns,
+    max_drawdowns,
+)
+from apps.chore_master_api.service_layers.database import create_db_and_db_registry
+from modules.database.relational_database import RelationalDatabase
+from modules.utils.cache_utils import SingleFlightCache
+from modules.utils.import_utils import ImportUtils
+
+np = ImportUtils.lazy_import("numpy")
+
+TRANSFER_STREAM_BATCH_SIZE = 1000
+MAX_LEDGER_CHECKPOINT_COUNT = 256
+# cumulative sums of larger raw amounts could overflow int64
+MAX_INT64_AMOUNT_SUM = 2**62
+PORTFOLIO_PERFORMANCE_TTL_SECONDS = 600
+
+
+class LedgerFingerprint(NamedTuple):
+    """
+    Summary of the transfers a ledger has applied, it changes when any of them is
+    inserted, updated or deleted afterwards.
+    """
+
+    transfer_count: int
+    max_transfer_updated_time: Optional[datetime]
+    max_transaction_updated_time: Optional[datetime]
+
+
+class PortfolioLedger:
+    """
+    Average cost positions of a portfolio, replayed transaction by transaction in
+    time order. Amounts are raw integers like the stored ones: asset amounts are
+    scaled by the decimals of their asset, costs and P&L by the ones of the
+    settlement asset.
+
+    Every transfer changes the holding of its asset by `asset_amount_change`.
+    `settlement_asset_amount_change` is the cash flow it stands for, negative
+    when paying, and only affects costs and P&L. Without one the holding moves
+    at no cost.
+    """
+
+    def __init__(self, settlement_asset_reference: str):
+        self.settlement_asset_reference = settlement_asset_reference
+        self.asset_reference_to_quantity_map: dict[str, int] = defaultdict(int)
+        self.asset_reference_to_cost_basis_map: dict[str, int] = defaultdict(int)
+        self.asset_reference_to_realized_pnl_map: dict[str, int] = defaultdict(int)
+        self.realized_pnl = 0
+        # one point per transaction, after applying all of its transfers
+        self.point_times: list[datetime] = []
+        self.point_realized_pnls: list[int] = []
+        # position changes as aligned columns, accumulated into holdings on read
+        self.transfer_point_idxs: list[int] = []
+        self.transfer_asset_references: list[str] = []
+        self.transfer_quantity_changes: list[int] = []
+        self.transfer_cost_basis_changes: list[int] = []
+        # the last applied `(transacted_time, transaction_reference)`
+        self.watermark: Optional[tuple[datetime, str]] = None
+        self.fingerprint: Optional[LedgerFingerprint] = None
+
+    def copy(self) -> PortfolioLedger:
+        ledger = PortfolioLedger(self.settlement_asset_reference)
+        for key, value in self.__dict__.items():
+            if isinstance(value, (dict, list)):
+                value = value.copy()
+            setattr(ledger, key, value)
+        return ledger
+
+    def apply_transaction(
+        self,
+        transaction_reference: str,
+        transacted_time: datetime,
+        transfer_rows: list[tuple[str, str, int, Optional[int]]],
+    ):
+        """
+        `transfer_rows` are `(flow_type, asset_reference, asset_amount_change,
+        settlement_asset_amount_change)`.
+        """
+        point_idx = len(self.point_times)
+        for (
+            flow_type,
+            asset_reference,
+            asset_amount_change,
+            settlement_asset_amount_change,
+        ) in transfer_rows:
+            cost_basis = self.asset_reference_to_cost_basis_map[asset_reference]
+            self._apply_transfer(
+                flow_type,
+                asset_reference,
+                asset_amount_change,
+                settlement_asset_amount_change,
+            )
+            self.transfer_point_idxs.append(point_idx)
+            self.transfer_asset_references.append(asset_reference)
+            self.transfer_quantity_changes.append(asset_amount_change)
+            self.transfer_cost_basis_changes.append(
+                self.asset_reference_to_cost_basis_map[asset_reference] - cost_basis
+            )
+        self.point_times.append(transacted_time)
+        self.point_realized_pnls.append(self.realized_pnl)
+        self.watermark = (transacted_time, transaction_reference)
+
+    def _apply_transfer(
+        self,
+        flow_type: str,
+        asset_reference: str,
+        asset_amount_change: int,
+        settlement_asset_amount_change: Optional[int],
+    ):
+        is_trade = flow_type == Transfer.FlowTypeEnum.UPDATE_POSITION.value
+        if asset_reference == self.settlement_asset_reference:
+            # deposits and withdrawals of cash are no P&L, income and fees are
+            if not is_trade:
+                self._realize(asset_reference, asset_amount_change)
+            self.asset_reference_to_quantity_map[asset_reference] += asset_amount_change
+            return
+
+        settlement_amount = settlement_asset_amount_change or 0
+        if is_trade:
+            self._apply_trade(asset_reference, asset_amount_change, settlement_amount)
+        elif asset_amount_change > 0:
+            # income received in kind is realized, then held at its value
+            self._realize(asset_reference, abs(settlement_amount))
+            self._apply_trade(
+                asset_reference, asset_amount_change, -abs(settlement_amount)
+            )
+        else:
+            # fees paid in kind give up their cost without proceeds
+            self._apply_trade(asset_reference, asset_amount_change, 0)
+
+    def _apply_trade(
+        self, asset_reference: str, quantity_change: int, settlement_amount: int
+    ):
+        quantity = self.asset_reference_to_quantity_map[asset_reference]
+        cost_basis = self.asset_reference_to_cost_basis_map[asset_reference]
+        if (
+            quantity_change == 0
+            or quantity == 0
+            or (quantity > 0) == (quantity_change > 0)
+        ):
+            new_cost_basis = cost_basis - settlement_amount
+        else:
+            closed_quantity = min(abs(quantity_change), abs(quantity))
+            released_cost_basis = _divide(cost_basis * closed_quantity, abs(quantity))
+            closed_settlement_amount = _divide(
+                settlement_amount * closed_quantity, abs(quantity_change)
+            )
+            self._realize(
+                asset_reference, closed_settlement_amount - released_cost_basis
+            )
+            # what is left of the change opens a position on the other side
+            new_cost_basis = (
+                cost_basis
+                - released_cost_basis
+                - (settlement_amount - closed_settlement_amount)
+            )
+        self.asset_reference_to_quantity_map[asset_reference] = (
+            quantity + quantity_change
+        )
+        self.asset_reference_to_cost_basis_map[asset_reference] = new_cost_basis
+
+    def _realize(self, asset_reference: str, pnl: int):
+        self.asset_reference_to_realized_pnl_map[asset_reference] += pnl
+        self.realized_pnl += pnl
+
+    def get_position_matrices(
+        self, asset_references: list[str]
+    ) -> tuple["np.ndarray", "np.ndarray"]:
+        """
+        Raw quantities and cost bases after every point, both of shape
+        `(point, asset)`, as cumulative sums of the transfer columns.
+        """
+        asset_reference_to_idx_map = {
+            asset_reference: idx for idx, asset_reference in enumerate(asset_references)
+        }
+        idxs = (
+            np.asarray(self.transfer_point_idxs, dtype=np.int64),
+            np.array(
+                [
+                    asset_reference_to_idx_map[asset_reference]
+                    for asset_reference in self.transfer_asset_references
+                ],
+                dtype=np.int64,
+            ),
+        )
+        position_matrices = []
+        for changes in (
+            self.transfer_quantity_changes,
+            self.transfer_cost_basis_changes,
+        ):
+            changes = _to_fixed_point_array(changes)
+            change_matrix = np.zeros(
+                (len(self.point_times), len(asset_references)), dtype=changes.dtype
+            )
+            np.add.at(change_matrix, idxs, changes)
+            position_matrices.append(np.cumsum(change_matrix, axis=0))
+        return position_matrices[0], position_matrices[1]
+
+
+class PortfolioPnlSeries(NamedTuple):
+    """
+    Columns in settlement asset units with one row per transaction of the
+    portfolio, and a last one at the time it was marked. Holdings without a
+    price are valued at their cost.
+    """
+
+    times: list[datetime]
+    market_values: list[float]
+    cost_bases: list[float]
+    realized_pnls: list[float]
+    unrealized_pnls: list[float]
+    # of the latest holdings
+    asset_reference_to_market_value_map: dict[str, float]
+    asset_reference_to_unrealized_pnl_map: dict[str, float]
+    unpriced_asset_references: list[str]
+
+
+class PortfolioPerformance(NamedTuple):
+    """
+    Returns of a portfolio from the valuations of its user's balance sheets in
+    the settlement asset, telling contributions from returns by the external
+    cash flows of the portfolio. Balance sheets holding unpriced assets are
+    left out. Metrics are None without enough valuations for them.
+    """
+
+    valuation_times: list[datetime]
+    valuations: list[float]
+    # linked time-weighted returns since the first valuation
+    cumulative_returns: list[float]
+    drawdowns: list[float]
+    time_weighted_return: Optional[float]
+    annualized_time_weighted_return: Optional[float]
+    # yearly internal rate of return
+    money_weighted_return: Optional[float]
+    max_drawdown: Optional[float]
+    unpriced_asset_references: list[str]
+
+
+# keyed by `(user_reference, portfolio_reference, as_of_date)`. Invalidation only
+# reaches the current worker, so the TTL bounds how long other workers may serve
+# outdated performances
+portfolio_performance_cache: SingleFlightCache[
+    PortfolioPerformance
+] = SingleFlightCache(ttl_seconds=PORTFOLIO_PERFORMANCE_TTL_SECONDS, max_size=1024)
+
+# checkpoints live in the worker, keyed by portfolio reference
+_portfolio_ledger_map: OrderedDict[str, PortfolioLedger] = OrderedDict()
+
+
+async def get_portfolio_ledger(
+    portfolio: Portfolio, finance_uow: FinanceSQLAlchemyUnitOfWork
+) -> PortfolioLedger:
+    """
+    Continue the checkpoint of the portfolio with the transfers after it, or
+    replay all of them when the ones it applied have changed since. Must be
+    called within `finance_uow`.
+    """
+    ledger = _portfolio_ledger_map.get(portfolio.reference)
+    if (
+        ledger is None
+        or ledger.settlement_asset_reference != portfolio.settlement_asset_reference
+        or ledger.fingerprint
+        != await _find_ledger_fingerprint(portfolio.reference, ledger, finance_uow)
+    ):
+        ledger = PortfolioLedger(portfolio.settlement_asset_reference)
+    else:
+        # concurrent requests may continue the same checkpoint
+        ledger = ledger.copy()
+
+    await _apply_transfers(ledger, portfolio.reference, finance_uow)
+    ledger.fingerprint = await _find_ledger_fingerprint(
+        portfolio.reference, ledger, finance_uow
+    )
+    _portfolio_ledger_map[portfolio.reference] = ledger
+    _portfolio_ledger_map.move_to_end(portfolio.reference)
+    while len(_portfolio_ledger_map) > MAX_LEDGER_CHECKPOINT_COUNT:
+        _portfolio_ledger_map.popitem(last=False)
+    return ledger
+
+
+async def get_portfolio_pnl_series(
+    portfolio: Portfolio,
+    ledger: PortfolioLedger,
+    as_of_time: datetime,
+    finance_uow: FinanceSQLAlchemyUnitOfWork,
+) -> PortfolioPnlSeries:
+    """
+    Mark the holdings after every transaction to market with the latest
+    `finance_price` confirmed at or before it. Prices are not part of the
+    checkpoint, so ones filled in later are picked up. Must be called within
+    `finance_uow`.
+    """
+    asset_references = sorted(
+        set(ledger.transfer_asset_references) | {ledger.settlement_asset_reference}
+    )
+    settlement_idx = asset_references.index(ledger.settlement_asset_reference)
+    assets = await finance_uow.asset_repository.find_many(
+        filter={"user_reference": portfolio.user_reference}
+    )
+    asset_reference_to_decimals_map = {
+        asset.reference: asset.decimals for asset in assets
+    }
+    scales = np.array(
+        [
+            10.0 ** asset_reference_to_decimals_map.get(asset_reference, 0)
+            for asset_reference in asset_references
+        ]
+    )
+
+    # the latest holdings are repeated at `as_of_time`
+    times = ledger.point_times + [as_of_time]
+    quantity_matrix, cost_basis_matrix = (
+        (
+            np.vstack([matrix, matrix[-1:]])
+            if len(matrix) > 0
+            else np.zeros((1, len(asset_references)), dtype=np.int64)
+        )
+        for matrix in ledger.get_position_matrices(asset_references)
+    )
+    quantities = quantity_matrix.astype(np.float64) / scales
+    cost_bases = cost_basis_matrix.astype(np.float64) / scales[settlement_idx]
+    realized_pnls = (
+        np.array(ledger.point_realized_pnls + [ledger.realized_pnl], dtype=np.float64)
+        / scales[settlement_idx]
+    )
+    prices = await _find_settlement_prices(
+        portfolio.user_reference,
+        ledger.settlement_asset_reference,
+        asset_references,
+        times,
+        finance_uow,
+    )
+    is_unpriced = np.isnan(prices)
+    market_values = np.where(is_unpriced, cost_bases, quantities * prices)
+    total_market_values = market_values.sum(axis=1)
+    total_cost_bases = cost_bases.sum(axis=1)
+    # cash is carried at no cost
+    unrealized_pnls = market_values - cost_bases
+    unrealized_pnls[:, settlement_idx] = 0.0
+    return PortfolioPnlSeries(
+        times=times,
+        market_values=total_market_values.tolist(),
+        cost_bases=total_cost_bases.tolist(),
+        realized_pnls=realized_pnls.tolist(),
+        unrealized_pnls=unrealized_pnls.sum(axis=1).tolist(),
+        asset_reference_to_market_value_map=dict(
+            zip(asset_references, market_values[-1].tolist())
+        ),
+        asset_reference_to_unrealized_pnl_map=dict(
+            zip(asset_references, unrealized_pnls[-1].tolist())
+        ),
+        unpriced_asset_references=[
+            asset_reference
+            for asset_reference, is_unpriced_held in zip(
+                asset_references, (is_unpriced & (quantity_matrix != 0)).any(axis=0)
+            )
+            if is_unpriced_held
+        ],
+    )
+
+
+async def get_portfolio_performance(
+    portfolio: Portfolio,
+    as_of_date: date,
+    chore_master_db: RelationalDatabase,
+) -> PortfolioPerformance:
+    """
+    Performance up to the end of `as_of_date`.
+    """
+    portfolio_reference = portfolio.reference
+
+    async def _fetch() -> PortfolioPerformance:
+        # the fetch is shared by every waiter and outlives the request starting
+        # it, so it reads through its own unit of work
+        async with FinanceSQLAlchemyUnitOfWork(chore_master_db) as finance_uow:
+            fetched_portfolio = await finance_uow.portfolio_repository.find_one(
+                filter={"reference": portfolio_reference}
+            )
+            return await _find_portfolio_performance(
+                fetched_portfolio, as_of_date, finance_uow
+            )
+
+    return await portfolio_performance_cache.get_or_fetch(
+        (portfolio.user_reference, portfolio_reference, as_of_date), _fetch
+    )
+
+
+def invalidate_portfolio_performances(
+    user_reference: Optional[str] = None, portfolio_reference: Optional[str] = None
+):
+    """
+    Drop the cached performances of every portfolio of the user, or of the
+    portfolio only, after writing data they are computed from.
+    """
+    portfolio_performance_cache.invalidate_many(
+        lambda key: key[0] == user_reference or key[1] == portfolio_reference
+    )
+
+
+async def rebuild_portfolio_holding_snapshots(
+    portfolio: Portfolio, finance_uow: FinanceSQLAlchemyUnitOfWork
+) -> list[PortfolioHoldingSnapshot]:
+    """
+    Replace the holding snapshots of the portfolio with a replay of all of its
+    transfers. Must be called within `finance_uow`, whose pending writes are
+    flushed to be replayed as well.
+    """
+    await finance_uow.session.flush()
+    ledger = PortfolioLedger(portfolio.settlement_asset_reference)
+    await _apply_transfers(ledger, portfolio.reference, finance_uow)
+    await finance_uow.portfolio_holding_snapshot_repository.delete_many(
+        filter={"portfolio_reference": portfolio.reference}
+    )
+    # otherwise the inserts below are flushed first and break the unique index
+    await finance_uow.session.flush()
+    if ledger.watermark is None:
+        return []
+    portfolio_holding_snapshots = [
+        PortfolioHoldingSnapshot(
+            portfolio_reference=portfolio.reference,
+            asset_reference=asset_reference,
+            quantity=str(quantity),
+            cost_basis=str(ledger.asset_reference_to_cost_basis_map[asset_reference]),
+            realized_pnl=str(
+                ledger.asset_reference_to_realized_pnl_map[asset_reference]
+            ),
+            applied_transacted_time=ledger.watermark[0],
+            applied_transaction_reference=ledger.watermark[1],
+        )
+        for asset_reference, quantity in ledger.asset_reference_to_quantity_map.items()
+    ]
+    await finance_uow.portfolio_holding_snapshot_repository.insert_many(
+        portfolio_holding_snapshots
+    )
+    return portfolio_holding_snapshots
+
+
+async def apply_transfer_to_portfolio_holding_snapshots(
+    portfolio: Portfolio,
+    transfer: Transfer,
+    finance_uow: FinanceSQLAlchemyUnitOfWork,
+):
+    """
+    Apply an inserted transfer to the holding snapshots of its portfolio in
+    O(assets) when it is not older than the transactions they have applied.
+    Otherwise they are rebuilt, an average cost cannot be unwound. Must be
+    called within `finance_uow`, after inserting the transfer.
+    """
+    await finance_uow.session.flush()
+    portfolio_holding_snapshots = (
+        await finance_uow.portfolio_holding_snapshot_repository.find_many(
+            filter={"portfolio_reference": portfolio.reference}
+        )
+    )
+    transaction = await finance_uow.transaction_repository.find_one(
+        filter={"reference": transfer.transaction_reference}
+    )
+    transaction_key = (transaction.transacted_time, transaction.reference)
+    watermark = (
+        (
+            portfolio_holding_snapshots[0].applied_transacted_time,
+            portfolio_holding_snapshots[0].applied_transaction_reference,
+        )
+        if len(portfolio_holding_snapshots) > 0
+        else None
+    )
+    # within a transaction only transfers of the same asset depend on their order
+    if (
+        watermark is None
+        or transaction_key < watermark
+        or (
+            transaction_key == watermark
+            and await finance_uow.transfer_repository.count(
+                filter={
+                    "transaction_reference": transaction.reference,
+                    "asset_reference": transfer.asset_reference,
+                }
+            )
+            > 1
+        )
+    ):
+        await rebuild_portfolio_holding_snapshots(portfolio, finance_uow)
+        return
+
+    ledger = PortfolioLedger(portfolio.settlement_asset_reference)
+    asset_reference_to_snapshot_map = {
+        portfolio_holding_snapshot.asset_reference: portfolio_holding_snapshot
+        for portfolio_holding_snapshot in portfolio_holding_snapshots
+    }
+    portfolio_holding_snapshot = asset_reference_to_snapshot_map.get(
+        transfer.asset_reference
+    )
+    if portfolio_holding_snapshot is not None:
+        ledger.asset_reference_to_quantity_map[transfer.asset_reference] = int(
+            portfolio_holding_snapshot.quantity
+        )
+        ledger.asset_reference_to_cost_basis_map[transfer.asset_reference] = int(
+            portfolio_holding_snapshot.cost_basis
+        )
+        ledger.asset_reference_to_realized_pnl_map[transfer.asset_reference] = int(
+            portfolio_holding_snapshot.realized_pnl
+        )
+    ledger.apply_transaction(
+        transaction.reference,
+        transaction.transacted_time,
+        [
+            _to_transfer_row(
+                transfer.flow_type,
+                transfer.asset_reference,
+                transfer.asset_amount_change,
+                transfer.settlement_asset_amount_change,
+            )
+        ],
+    )
+    values = {
+        "quantity": str(
+            ledger.asset_reference_to_quantity_map[transfer.asset_reference]
+        ),
+        "cost_basis": str(
+            ledger.asset_reference_to_cost_basis_map[transfer.asset_reference]
+        ),
+        "realized_pnl": str(
+            ledger.asset_reference_to_realized_pnl_map[transfer.asset_reference]
+        ),
+    }
+    if portfolio_holding_snapshot is None:
+        await finance_uow.portfolio_holding_snapshot_repository.insert_one(
+            PortfolioHoldingSnapshot(
+                portfolio_reference=portfolio.reference,
+                asset_reference=transfer.asset_reference,
+                applied_transacted_time=transaction.transacted_time,
+                applied_transaction_reference=transaction.reference,
+                **values,
+            )
+        )
+    else:
+        await finance_uow.portfolio_holding_snapshot_repository.update_many(
+            values=values,
+            filter={"reference": portfolio_holding_snapshot.reference},
+        )
+    if transaction_key != watermark:
+        await finance_uow.portfolio_holding_snapshot_repository.update_many(
+            values={
+                "applied_transacted_time": transaction.transacted_time,
+                "applied_transaction_reference": transaction.reference,
+            },
+            filter={"portfolio_reference": portfolio.reference},
+        )
+
+
+async def rebuild_all_portfolio_holding_snapshots(
+    portfolio_references: Optional[list[str]] = None,
+):
+    """
+    Rebuild the holding snapshots of the given portfolios, or of every one, each
+    in its own transaction. Repairs snapshots that went out of sync.
+    """
+    chore_master_db, _chore_master_db_registry = await create_db_and_db_registry()
+    finance_uow = FinanceSQLAlchemyUnitOfWork(relational_database=chore_master_db)
+    try:
+        if portfolio_references is None:
+            async with finance_uow:
+                portfolio_references = [
+                    portfolio.reference
+                    for portfolio in await finance_uow.portfolio_repository.find_many()
+                ]
+        for portfolio_reference in portfolio_references:
+            async with finance_uow:
+                portfolio = await finance_uow.portfolio_repository.find_one(
+                    filter={"reference": portfolio_reference}
+                )
+                portfolio_holding_snapshots = await rebuild_portfolio_holding_snapshots(
+                    portfolio, finance_uow
+                )
+                await finance_uow.commit()
+            print(
+                f"Rebuilt {len(portfolio_holding_snapshots)} holding snapshots of "
+                f"portfolio {portfolio_reference}",
+                flush=True,
+            )
+    finally:
+        await chore_master_db.dispose()
+
+
+async def _find_portfolio_performance(
+    portfolio: Portfolio,
+    as_of_date: date,
+    finance_uow: FinanceSQLAlchemyUnitOfWork,
+) -> PortfolioPerformance:
+    end_time = datetime.combine(as_of_date + timedelta(days=1), time.min)
+    assets = await finance_uow.asset_repository.find_many(
+        filter={"user_reference": portfolio.user_reference}
+    )
+    asset_reference_to_decimals_map = {
+        asset.reference: asset.decimals for asset in assets
+    }
+    settlement_scale = 10.0 ** asset_reference_to_decimals_map.get(
+        portfolio.settlement_asset_reference, 0
+    )
+
+    statement = (
+        select(
+            BalanceSheet.reference,
+            BalanceSheet.balanced_time,
+            Account.settlement_asset_reference,
+            BalanceEntry.amount,
+        )
+        .join(
+            BalanceSheet, BalanceEntry.balance_sheet_reference == BalanceSheet.reference
+        )
+        .join(Account, BalanceEntry.account_reference == Account.reference)
+        .where(
+            BalanceSheet.user_reference == portfolio.user_reference,
+            BalanceSheet.balanced_time < end_time,
+        )
+        .order_by(BalanceSheet.balanced_time, BalanceSheet.reference)
+    )
+    result = await finance_uow.session.execute(statement)
+    balanced_times: list[datetime] = []
+    balance_sheet_reference_to_idx_map: dict[str, int] = {}
+    # raw amounts are summed exactly before scaling
+    balance_key_to_amount_map: dict[tuple[int, str], int] = defaultdict(int)
+    for (
+        balance_sheet_reference,
+        balanced_time,
+        asset_reference,
+        amount,
+    ) in result:
+        idx = balance_sheet_reference_to_idx_map.setdefault(
+            balance_sheet_reference, len(balanced_times)
+        )
+        if idx == len(balanced_times):
+            balanced_times.append(balanced_time)
+        balance_key_to_amount_map[(idx, asset_reference)] += int(amount)
+    asset_references = sorted(
+        {asset_reference for _, asset_reference in balance_key_to_amount_map}
+    )
+    asset_reference_to_idx_map = {
+        asset_reference: idx for idx, asset_reference in enumerate(asset_references)
+    }
+    amount_matrix = np.zeros((len(balanced_times), len(asset_references)))
+    for (idx, asset_reference), amount in balance_key_to_amount_map.items():
+        amount_matrix[idx, asset_reference_to_idx_map[asset_reference]] = amount
+    amount_matrix /= np.array(
+        [
+            10.0 ** asset_reference_to_decimals_map.get(asset_reference, 0)
+            for asset_reference in asset_references
+        ]
+    )
+    prices = await _find_settlement_prices(
+        portfolio.user_reference,
+        portfolio.settlement_asset_reference,
+        asset_references,
+        balanced_times,
+        finance_uow,
+    )
+    is_unpriced = np.isnan(prices) & (amount_matrix != 0)
+    is_valued = ~is_unpriced.any(axis=1)
+    valuation_times = [
+        balanced_time
+        for balanced_time, is_valued_time in zip(balanced_times, is_valued)
+        if is_valued_time
+    ]
+    valuations = np.nansum(amount_matrix * prices, axis=1)[is_valued]
+
+    # the capital put in is cash plus costs, less what was realized on them, so
+    # trades and income never count as flows
+    ledger = await get_portfolio_ledger(portfolio, finance_uow)
+    ledger_asset_references = sorted(
+        set(ledger.transfer_asset_references) | {ledger.settlement_asset_reference}
+    )
+    quantity_matrix, cost_basis_matrix = ledger.get_position_matrices(
+        ledger_asset_references
+    )
+    invested_capitals = (
+        quantity_matrix[
+            :, ledger_asset_references.index(ledger.settlement_asset_reference)
+        ].astype(object)
+        + cost_basis_matrix.sum(axis=1).astype(object)
+        - np.array(ledger.point_realized_pnls, dtype=object)
+    )
+    cash_flows = (
+        np.diff(invested_capitals, prepend=0).astype(np.float64) / settlement_scale
+    )
+    cash_flow_times = np.array(ledger.point_times, dtype="datetime64[us]")
+
+    if len(valuation_times) == 0:
+        return PortfolioPerformance(
+            valuation_times=[],
+            valuations=[],
+            cumulative_returns=[],
+            drawdowns=[],
+            time_weighted_return=None,
+            annualized_time_weighted_return=None,
+            money_weighted_return=None,
+            max_drawdown=None,
+            unpriced_asset_references=[],
+        )
+    start_time = np.datetime64(valuation_times[0], "us")
+    valuation_days = (
+        np.array(valuation_times, dtype="datetime64[us]") - start_time
+    ) / np.timedelta64(1, "D")
+    cash_flow_days = (cash_flow_times - start_time) / np.timedelta64(1, "D")
+    returns = linked_modified_dietz_returns(
+        valuation_days, valuations, cash_flow_days, cash_flows
+    )
+    cumulative_returns = np.append(0.0, np.cumprod(1.0 + returns) - 1.0)
+    drawdowns = max_drawdowns(cumulative_returns)
+
+    time_weighted_return = None
+    annualized_time_weighted_return = None
+    money_weighted_return = None
+    years = valuation_days[-1] / DAYS_PER_YEAR
+    if len(valuations) > 1:
+        time_weighted_return = float(cumulative_returns[-1])
+        if years > 0 and time_weighted_return > -1:
+            annualized_time_weighted_return = float(
+                (1.0 + time_weighted_return) ** (1.0 / years) - 1.0
+            )
+        # from the investor's side: the first valuation and later contributions
+        # are paid, the last valuation is received
+        is_within = (cash_flow_days > 0) & (cash_flow_days <= valuation_days[-1])
+        money_weighted_return = float(
+            internal_rates_of_return(
+                np.concatenate([[0.0], cash_flow_days[is_within], [valuation_days[-1]]])
+                / DAYS_PER_YEAR,
+                np.concatenate(
+                    [[-valuations[0]], -cash_flows[is_within], [valuations[-1]]]
+                ),
+            )[0]
+        )
+        if not np.isfinite(money_weighted_return):
+            money_weighted_return = None
+    return PortfolioPerformance(
+        valuation_times=valuation_times,
+        valuations=valuations.tolist(),
+        cumulative_returns=cumulative_returns.tolist(),
+        drawdowns=drawdowns.tolist(),
+        time_weighted_return=time_weighted_return,
+        annualized_time_weighted_return=annualized_time_weighted_return,
+        money_weighted_return=money_weighted_return,
+        max_drawdown=float(drawdowns.min()),
+        unpriced_asset_references=[
+            asset_reference
+            for asset_reference, is_unpriced_asset in zip(
+                asset_references, is_unpriced.any(axis=0)
+            )
+            if is_unpriced_asset
+        ],
+    )
+
+
+async def _apply_transfers(
+    ledger: PortfolioLedger,
+    portfolio_reference: str,
+    finance_uow: FinanceSQLAlchemyUnitOfWork,
+):
+    # streamed in batches, in the order the ledger replays them
+    statement = (
+        select(
+            Transaction.reference,
+            Transaction.transacted_time,
+            Transfer.flow_type,
+            Transfer.asset_reference,
+            Transfer.asset_amount_change,
+            Transfer.settlement_asset_amount_change,
+        )
+        .join(Transaction, Transfer.transaction_reference == Transaction.reference)
+        .where(Transaction.portfolio_reference == portfolio_reference)
+        .order_by(
+            Transaction.transacted_time, Transaction.reference, Transfer.reference
+        )
+        .execution_options(yield_per=TRANSFER_STREAM_BATCH_SIZE)
+    )
+    if ledger.watermark is not None:
+        statement = statement.where(~_get_applied_filter(ledger))
+    result = await finance_uow.session.stream(statement)
+    transaction_key = None
+    transfer_rows = []
+    async for rows in result.partitions():
+        for (
+            transaction_reference,
+            transacted_time,
+            flow_type,
+            asset_reference,
+            asset_amount_change,
+            settlement_asset_amount_change,
+        ) in rows:
+            if transaction_key != (transacted_time, transaction_reference):
+                if transaction_key is not None:
+                    ledger.apply_transaction(
+                        transaction_key[1], transaction_key[0], transfer_rows
+                    )
+                transaction_key = (transacted_time, transaction_reference)
+                transfer_rows = []
+            transfer_rows.append(
+                _to_transfer_row(
+                    flow_type,
+                    asset_reference,
+                    asset_amount_change,
+                    settlement_asset_amount_change,
+                )
+            )
+    if transaction_key is not None:
+        ledger.apply_transaction(transaction_key[1], transaction_key[0], transfer_rows)
+
+
+def _to_transfer_row(
+    flow_type: str,
+    asset_reference: str,
+    asset_amount_change: str,
+    settlement_asset_amount_change: Optional[str],
+) -> tuple[str, str, int, Optional[int]]:
+    return (
+        Transfer.FlowTypeEnum(flow_type).value,
+        asset_reference,
+        int(asset_amount_change),
+        (
+            int(settlement_asset_amount_change)
+            if settlement_asset_amount_change is not None
+            else None
+        ),
+    )
+
+
+def _get_applied_filter(ledger: PortfolioLedger):
+    transacted_time, transaction_reference = ledger.watermark
+    return or_(
+        Transaction.transacted_time < transacted_time,
+        and_(
+            Transaction.transacted_time == transacted_time,
+            Transaction.reference <= transaction_reference,
+        ),
+    )
+
+
+async def _find_ledger_fingerprint(
+    portfolio_reference: str,
+    ledger: PortfolioLedger,
+    finance_uow: FinanceSQLAlchemyUnitOfWork,
+) -> LedgerFingerprint:
+    if ledger.watermark is None:
+        return LedgerFingerprint(
+            transfer_count=0,
+            max_transfer_updated_time=None,
+            max_transaction_updated_time=None,
+        )
+    statement = (
+        select(
+            func.count(Transfer.reference),
+            func.max(Transfer.updated_time),
+            func.max(Transaction.updated_time),
+        )
+        .join(Transaction, Transfer.transaction_reference == Transaction.reference)
+        .where(
+            Transaction.portfolio_reference == portfolio_reference,
+            _get_applied_filter(ledger),
+        )
+    )
+    result = await finance_uow.session.execute(statement)
+    return LedgerFingerprint(*result.one())
+
+
+async def _find_settlement_prices(
+    user_reference: str,
+    settlement_asset_reference: str,
+    asset_references: list[str],
+    times: list[datetime],
+    finance_uow: FinanceSQLAlchemyUnitOfWork,
+) -> "np.ndarray":
+    """
+    Settlement asset units per unit of every asset as of every time, of shape
+    `(time, asset)` and NaN where unknown. An asset is priced by its pair with
+    the settlement asset in either direction, or else across a common base.
+    """
+    statement = (
+        select(
+            Price.base_asset_reference,
+            Price.quote_asset_reference,
+            Price.confirmed_time,
+            Price.value,
+        )
+        .where(
+            Price.user_reference == user_reference,
+            or_(
+                Price.base_asset_reference.in_(asset_references),
+                Price.quote_asset_reference.in_(asset_references),
+            ),
+        )
+        .order_by(Price.confirmed_time)
+    )
+    result = await finance_uow.session.execute(statement)
+    pair_to_points_map: dict[tuple[str, str], tuple[list, list]] = {}
+    for base_asset_reference, quote_asset_reference, confirmed_time, value in result:
+        if float(value) <= 0:
+            continue
+        confirmed_times, values = pair_to_points_map.setdefault(
+            (base_asset_reference, quote_asset_reference), ([], [])
+        )
+        confirmed_times.append(confirmed_time)
+        values.append(float(value))
+    point_times = np.array(times, dtype="datetime64[us]")
+
+    def get_pair_prices(pair: tuple[str, str]) -> "np.ndarray":
+        confirmed_times, values = pair_to_points_map.get(pair, ([], []))
+        idxs = (
+            np.searchsorted(
+                np.array(confirmed_times, dtype="datetime64[us]"),
+                point_times,
+                side="right",
+            )
+            - 1
+        )
+        # `idxs` of -1 pick the trailing NaN
+        return np.append(np.array(values, dtype=np.float64), np.nan)[idxs]
+
+    def iter_asset_prices(asset_reference: str) -> Iterator["np.ndarray"]:
+        yield get_pair_prices((asset_reference, settlement_asset_reference))
+        yield 1.0 / get_pair_prices((settlement_asset_reference, asset_reference))
+        for base_asset_reference, quote_asset_reference in pair_to_points_map:
+            if quote_asset_reference == asset_reference:
+                yield get_pair_prices(
+                    (base_asset_reference, settlement_asset_reference)
+                ) / get_pair_prices((base_asset_reference, asset_reference))
+
+    prices = np.full((len(times), len(asset_references)), np.nan)
+    for idx, asset_reference in enumerate(asset_references):
+        if asset_reference == settlement_asset_reference:
+            prices[:, idx] = 1.0
+            continue
+        # gaps left by one pair are filled by the next one
+        for asset_prices in iter_asset_prices(asset_reference):
+            prices[:, idx] = np.where(
+                np.isnan(prices[:, idx]), asset_prices, prices[:, idx]
+            )
+            if not np.isnan(prices[:, idx]).any():
+                break
+    return prices
+
+
+def _divide(numerator: int, denominator: int) -> int:
+    # rounded toward zero, so long and short positions release costs alike
+    quotient = abs(numerator) // denominator
+    return quotient if numerator >= 0 else -quotient
+
+
+def _to_fixed_point_array(amounts: list[int]) -> "np.ndarray":
+    # exact either way, int64 only when no partial sum can overflow it
+    if sum(abs(amount) for amount in amounts) < MAX_INT64_AMOUNT_SUM:
+        return np.array(amounts, dtype=np.int64)
+    return np.array(amounts, dtype=object)
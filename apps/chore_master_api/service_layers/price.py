@@ -0,0 +1,347 @@
+import asyncio
+import bisect
+import json
+import time
+import traceback
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from apps.chore_master_api.config import get_chore_master_api_web_server_config
+from apps.chore_master_api.end_user_space.models.finance import Price
+from apps.chore_master_api.end_user_space.models.integration import Operator
+from apps.chore_master_api.end_user_space.unit_of_works.finance import (
+    FinanceSQLAlchemyUnitOfWork,
+)
+from apps.chore_master_api.end_user_space.unit_of_works.integration import (
+    IntegrationSQLAlchemyUnitOfWork,
+)
+from apps.chore_master_api.end_user_space.unit_of_works.trace import (
+    TraceSQLAlchemyUnitOfWork,
+)
+from apps.chore_master_api.modules.background_job_runner import ProgressReporter
+from apps.chore_master_api.modules.feed_discriminated_operator import (
+    FeedDiscriminatedOperator,
+    FeedPrices,
+    IntervalEnum,
+)
+from apps.chore_master_api.service_layers.database import create_db_and_db_registry
+from apps.chore_master_api.service_layers.quota import increase_used_quota
+from modules.database.distributed_lock import (
+    LockNotAcquiredError,
+    create_distributed_lock,
+)
+from modules.database.relational_database import RelationalDatabase
+
+
+class MissingPriceTarget(NamedTuple):
+    base_asset_reference: str
+    quote_asset_reference: str
+    instrument_symbol: str
+    existing_datetimes_set: set[datetime]
+    target_datetimes: list[datetime]
+
+
+async def find_missing_price_targets(
+    user_reference: str, finance_uow: FinanceSQLAlchemyUnitOfWork
+) -> list[MissingPriceTarget]:
+    """
+    Pair USD with every other settleable asset, and collect the balance sheet
+    times without a price yet. Must be called within `finance_uow`, the targets
+    stay usable after it is closed.
+    """
+    settlable_assets = await finance_uow.asset_repository.find_many(
+        filter={
+            "user_reference": user_reference,
+            "is_settleable": True,
+        }
+    )
+    base_asset = next(
+        (
+            settlable_asset
+            for settlable_asset in settlable_assets
+            if settlable_asset.symbol == "USD"
+        ),
+        None,
+    )
+    if base_asset is None:
+        return []
+    quote_assets = [
+        settlable_asset
+        for settlable_asset in settlable_assets
+        if settlable_asset.symbol != "USD"
+    ]
+    balance_sheets = await finance_uow.balance_sheet_repository.find_many(
+        filter={
+            "user_reference": user_reference,
+        }
+    )
+    occupied_datetimes_set = {
+        balance_sheet.balanced_time for balance_sheet in balance_sheets
+    }
+    missing_price_targets = []
+    for quote_asset in quote_assets:
+        prices = await finance_uow.price_repository.find_many(
+            filter={
+                "user_reference": user_reference,
+                "base_asset_reference": base_asset.reference,
+                "quote_asset_reference": quote_asset.reference,
+            },
+        )
+        existing_datetimes_set = {price.confirmed_time for price in prices}
+        existing_datetimes = sorted(existing_datetimes_set)
+        missing_price_targets.append(
+            MissingPriceTarget(
+                base_asset_reference=base_asset.reference,
+                quote_asset_reference=quote_asset.reference,
+                instrument_symbol=f"{base_asset.symbol}_{quote_asset.symbol}",
+                existing_datetimes_set=existing_datetimes_set,
+                target_datetimes=[
+                    occupied_datetime
+                    for occupied_datetime in occupied_datetimes_set
+                    if not _is_covered(existing_datetimes, occupied_datetime)
+                ],
+            )
+        )
+    return missing_price_targets
+
+
+def _is_covered(existing_datetimes: list[datetime], target_datetime: datetime) -> bool:
+    # feeds match the latest candle at or before the target, so a price within a
+    # day before the target is what a fetch would return again
+    idx = bisect.bisect_right(existing_datetimes, target_datetime)
+    return idx > 0 and target_datetime - existing_datetimes[idx - 1] < timedelta(days=1)
+
+
+async def insert_fetched_prices(
+    user_reference: str,
+    missing_price_target: MissingPriceTarget,
+    feed_prices: FeedPrices,
+    finance_uow: FinanceSQLAlchemyUnitOfWork,
+) -> int:
+    inserted_count = 0
+    for matched_datetime, matched_price in zip(
+        feed_prices["matched_datetimes"], feed_prices["matched_prices"]
+    ):
+        if matched_datetime is None:
+            continue
+        if matched_datetime not in missing_price_target.existing_datetimes_set:
+            entity = Price(
+                user_reference=user_reference,
+                base_asset_reference=missing_price_target.base_asset_reference,
+                quote_asset_reference=missing_price_target.quote_asset_reference,
+                value=f"{matched_price}",
+                confirmed_time=matched_datetime,
+            )
+            await finance_uow.price_repository.insert_one(entity)
+            # feeds may match several targets to the same candle
+            missing_price_target.existing_datetimes_set.add(matched_datetime)
+            inserted_count += 1
+    return inserted_count
+
+
+async def auto_fill_prices(
+    user_reference: str,
+    operator_reference: str,
+    finance_uow: FinanceSQLAlchemyUnitOfWork,
+    integration_uow: IntegrationSQLAlchemyUnitOfWork,
+    report_progress: Optional[ProgressReporter] = None,
+) -> int:
+    """
+    Fetch the missing prices of every balance sheet time and return how many
+    prices are inserted.
+    """
+    inserted_count = 0
+    async with finance_uow, integration_uow:
+        operator = await integration_uow.operator_repository.find_one(
+            filter={
+                "reference": operator_reference,
+                "user_reference": user_reference,
+            }
+        )
+        feed_operator: FeedDiscriminatedOperator = operator.to_discriminated_operator()
+
+        missing_price_targets = await find_missing_price_targets(
+            user_reference, finance_uow
+        )
+        for i, missing_price_target in enumerate(missing_price_targets):
+            if len(missing_price_target.target_datetimes) > 0:
+                feed_prices = await feed_operator.fetch_prices(
+                    instrument_symbol=missing_price_target.instrument_symbol,
+                    target_interval=IntervalEnum.PER_1_DAY,
+                    target_datetimes=missing_price_target.target_datetimes,
+                )
+                inserted_count += await insert_fetched_prices(
+                    user_reference, missing_price_target, feed_prices, finance_uow
+                )
+            if report_progress is not None:
+                await report_progress(
+                    (i + 1) / len(missing_price_targets),
+                    f"{missing_price_target.instrument_symbol} is filled",
+                )
+        await finance_uow.commit()
+    return inserted_count
+
+
+def get_feed_provider_key(operator: Operator) -> str:
+    """
+    Operators of the same kind and settings reach the same remote data, no matter
+    which user owns them.
+    """
+    return f"{operator.discriminator}:{json.dumps(operator.value, sort_keys=True)}"
+
+
+async def snapshot_prices(
+    chore_master_db: RelationalDatabase, max_concurrency: int = 4
+) -> int:
+    """
+    Fill the missing prices of every user with a feed operator. Identical
+    (provider, instrument) fetches across users are coalesced into one remote call
+    over the union of the target times.
+
+    The first feed operator of a user by name is used for all of their assets.
+    """
+    async with IntegrationSQLAlchemyUnitOfWork(chore_master_db) as integration_uow:
+        operators = await integration_uow.operator_repository.find_many()
+        user_reference_to_operator_map: dict[str, Operator] = {}
+        for operator in sorted(operators, key=lambda operator: operator.name):
+            if operator.user_reference in user_reference_to_operator_map:
+                continue
+            if isinstance(
+                operator.to_discriminated_operator(), FeedDiscriminatedOperator
+            ):
+                user_reference_to_operator_map[operator.user_reference] = operator
+        provider_key_to_feed_operator_map: dict[str, FeedDiscriminatedOperator] = {
+            get_feed_provider_key(operator): operator.to_discriminated_operator()
+            for operator in user_reference_to_operator_map.values()
+        }
+        user_reference_to_provider_key_map = {
+            user_reference: get_feed_provider_key(operator)
+            for user_reference, operator in user_reference_to_operator_map.items()
+        }
+
+    fetch_key_to_targets_map: dict[
+        tuple[str, str], list[tuple[str, MissingPriceTarget]]
+    ] = defaultdict(list)
+    for user_reference, provider_key in user_reference_to_provider_key_map.items():
+        async with FinanceSQLAlchemyUnitOfWork(chore_master_db) as finance_uow:
+            missing_price_targets = await find_missing_price_targets(
+                user_reference, finance_uow
+            )
+        for missing_price_target in missing_price_targets:
+            if len(missing_price_target.target_datetimes) == 0:
+                continue
+            fetch_key = (provider_key, missing_price_target.instrument_symbol)
+            fetch_key_to_targets_map[fetch_key].append(
+                (user_reference, missing_price_target)
+            )
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _fetch(fetch_key: tuple[str, str]) -> Optional[FeedPrices]:
+        provider_key, instrument_symbol = fetch_key
+        target_datetimes = sorted(
+            {
+                target_datetime
+                for _user_reference, missing_price_target in fetch_key_to_targets_map[
+                    fetch_key
+                ]
+                for target_datetime in missing_price_target.target_datetimes
+            }
+        )
+        async with semaphore:
+            try:
+                return await provider_key_to_feed_operator_map[
+                    provider_key
+                ].fetch_prices(
+                    instrument_symbol=instrument_symbol,
+                    target_interval=IntervalEnum.PER_1_DAY,
+                    target_datetimes=target_datetimes,
+                )
+            except Exception as e:
+                print(f"Failed to fetch `{instrument_symbol}` prices: {e}", flush=True)
+                return None
+
+    fetch_keys = list(fetch_key_to_targets_map.keys())
+    fetched_feed_prices_list = await asyncio.gather(
+        *[_fetch(fetch_key) for fetch_key in fetch_keys]
+    )
+
+    user_reference_to_targets_map: dict[
+        str, list[tuple[MissingPriceTarget, FeedPrices]]
+    ] = defaultdict(list)
+    for fetch_key, feed_prices in zip(fetch_keys, fetched_feed_prices_list):
+        if feed_prices is None:
+            continue
+        target_datetime_to_idx_map = {
+            target_datetime: idx
+            for idx, target_datetime in enumerate(feed_prices["target_datetimes"])
+        }
+        for user_reference, missing_price_target in fetch_key_to_targets_map[fetch_key]:
+            idxs = [
+                target_datetime_to_idx_map[target_datetime]
+                for target_datetime in missing_price_target.target_datetimes
+            ]
+            user_reference_to_targets_map[user_reference].append(
+                (
+                    missing_price_target,
+                    {
+                        **feed_prices,
+                        "target_datetimes": [
+                            feed_prices["target_datetimes"][idx] for idx in idxs
+                        ],
+                        "matched_datetimes": [
+                            feed_prices["matched_datetimes"][idx] for idx in idxs
+                        ],
+                        "matched_prices": [
+                            feed_prices["matched_prices"][idx] for idx in idxs
+                        ],
+                    },
+                )
+            )
+
+    # written per user, so a failing user does not hold back the others
+    total_inserted_count = 0
+    for user_reference, targets in user_reference_to_targets_map.items():
+        inserted_count = 0
+        async with FinanceSQLAlchemyUnitOfWork(chore_master_db) as finance_uow:
+            for missing_price_target, feed_prices in targets:
+                inserted_count += await insert_fetched_prices(
+                    user_reference, missing_price_target, feed_prices, finance_uow
+                )
+            await finance_uow.commit()
+        if inserted_count > 0:
+            await increase_used_quota(
+                user_reference=user_reference,
+                delta=inserted_count,
+                trace_uow=TraceSQLAlchemyUnitOfWork(chore_master_db),
+            )
+        total_inserted_count += inserted_count
+    return total_inserted_count
+
+
+async def run_price_snapshot_scheduler():
+    chore_master_api_web_server_config = get_chore_master_api_web_server_config()
+    chore_master_db, _chore_master_db_registry = await create_db_and_db_registry()
+    # a single round at a time across every scheduler instance
+    distributed_lock = create_distributed_lock(chore_master_db, lock_dir=".cache/locks")
+    try:
+        while True:
+            started_time = time.perf_counter()
+            try:
+                async with distributed_lock.acquire("price_snapshot"):
+                    inserted_count = await snapshot_prices(chore_master_db)
+                print(
+                    f"Inserted {inserted_count} prices in "
+                    f"{time.perf_counter() - started_time:.1f}s",
+                    flush=True,
+                )
+            except LockNotAcquiredError:
+                print("Price snapshot is running elsewhere, skipped", flush=True)
+            except Exception:
+                traceback.print_exc()
+            await asyncio.sleep(
+                chore_master_api_web_server_config.PRICE_SNAPSHOT_INTERVAL_SECONDS
+            )
+    finally:
+        await chore_master_db.dispose()
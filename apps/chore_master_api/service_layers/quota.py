@@ -0,0 +1,135 @@
+from typing import Optional
+
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
+
+from apps.chore_master_api.end_user_space.models.finance import (
+    BalanceSheet,
+    Portfolio,
+    Transaction,
+)
+from apps.chore_master_api.end_user_space.models.trace import Quota
+from apps.chore_master_api.end_user_space.unit_of_works.finance import (
+    FinanceSQLAlchemyUnitOfWork,
+)
+from apps.chore_master_api.end_user_space.unit_of_works.integration import (
+    IntegrationSQLAlchemyUnitOfWork,
+)
+from apps.chore_master_api.end_user_space.unit_of_works.trace import (
+    TraceSQLAlchemyUnitOfWork,
+)
+from apps.chore_master_api.modules.background_job_runner import ProgressReporter
+
+
+async def increase_used_quota(
+    user_reference: str, delta: int, trace_uow: TraceSQLAlchemyUnitOfWork
+):
+    async with trace_uow:
+        quotas = await trace_uow.quota_repository.find_many(
+            filter={"user_reference": user_reference},
+        )
+        if len(quotas) == 0:
+            await trace_uow.quota_repository.insert_one(
+                Quota(user_reference=user_reference, used=delta, limit=0)
+            )
+        else:
+            await trace_uow.quota_repository.update_many(
+                filter={
+                    "reference": quotas[0].reference,
+                    "user_reference": user_reference,
+                },
+                values={"used": Quota.used + delta},
+            )
+        await trace_uow.commit()
+
+
+async def recalculate_used_quota(
+    user_reference: str,
+    trace_uow: TraceSQLAlchemyUnitOfWork,
+    integration_uow: IntegrationSQLAlchemyUnitOfWork,
+    finance_uow: FinanceSQLAlchemyUnitOfWork,
+    report_progress: Optional[ProgressReporter] = None,
+) -> int:
+    async with trace_uow, integration_uow, finance_uow:
+        quotas = await trace_uow.quota_repository.find_many(
+            filter={"user_reference": user_reference},
+        )
+
+        used = 0
+
+        operators_count = await integration_uow.operator_repository.count(
+            filter={"user_reference": user_reference},
+        )
+        used += operators_count
+
+        accounts_count = await finance_uow.account_repository.count(
+            filter={"user_reference": user_reference},
+        )
+        used += accounts_count
+
+        assets_count = await finance_uow.asset_repository.count(
+            filter={"user_reference": user_reference},
+        )
+        used += assets_count
+        if report_progress is not None:
+            await report_progress(0.25, "integration and finance entities are counted")
+
+        statement = (
+            select(BalanceSheet)
+            .where(
+                BalanceSheet.user_reference == user_reference,
+            )
+            .options(
+                joinedload(BalanceSheet.balance_entries),
+            )
+        )
+        result = await finance_uow.session.execute(statement)
+        balance_sheets = result.scalars().unique().all()
+        used += len(balance_sheets)
+        for balance_sheet in balance_sheets:
+            used += len(balance_sheet.balance_entries)
+        if report_progress is not None:
+            await report_progress(0.5, "balance sheets are counted")
+
+        portfolios_count = await finance_uow.portfolio_repository.count(
+            filter={"user_reference": user_reference},
+        )
+        used += portfolios_count
+
+        statement = (
+            select(Transaction)
+            .join(Portfolio, Transaction.portfolio_reference == Portfolio.reference)
+            .where(
+                Portfolio.user_reference == user_reference,
+            )
+            .options(
+                joinedload(Transaction.transfers),
+            )
+        )
+        result = await finance_uow.session.execute(statement)
+        transactions = result.scalars().unique().all()
+        used += len(transactions)
+        for transaction in transactions:
+            used += len(transaction.transfers)
+        if report_progress is not None:
+            await report_progress(0.75, "portfolios are counted")
+
+        if len(quotas) == 0:
+            await trace_uow.quota_repository.insert_one(
+                Quota(
+                    user_reference=user_reference,
+                    used=used,
+                    limit=0,
+                )
+            )
+        else:
+            quota = quotas[0]
+            await trace_uow.quota_repository.update_many(
+                filter={
+                    "reference": quota.reference,
+                    "user_reference": user_reference,
+                },
+                values={"used": used},
+            )
+        await trace_uow.commit()
+    return used
@@ -0,0 +1,274 @@
+import asyncio
+import time
+import traceback
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, NamedTuple
+
+from sqlalchemy.future import select
+
+from apps.chore_master_api.config import get_chore_master_api_web_server_config
+from apps.chore_master_api.end_user_space.models.risk import RiskSnapshot
+from apps.chore_master_api.end_user_space.unit_of_works.risk import (
+    RiskSQLAlchemyUnitOfWork,
+)
+from apps.chore_master_api.service_layers.database import create_db_and_db_registry
+from apps.chore_master_api.service_layers.okx_risk import (
+    aggregate_okx_risks,
+    compute_okx_fx_risks,
+    compute_okx_ir_risks,
+    find_okx_positions,
+)
+from modules.base.config import get_base_config
+from modules.database.async_mongo_client import AsyncMongoClient, AsyncMongoDB
+from modules.database.distributed_lock import (
+    LockNotAcquiredError,
+    create_distributed_lock,
+)
+from modules.database.relational_database import RelationalDatabase
+from modules.utils.import_utils import ImportUtils
+
+np = ImportUtils.lazy_import("numpy")
+
+AGGREGATED_RISK_KEYS = (
+    "aggregated_delta",
+    "aggregated_gamma",
+    "aggregated_vega",
+    "aggregated_theta",
+    "aggregated_dv01",
+    "aggregated_rho",
+)
+
+
+class RiskSnapshotSeries(NamedTuple):
+    snapshotted_times: list[datetime]
+    # keyed by `AGGREGATED_RISK_KEYS`, aligned with `snapshotted_times`
+    aggregated_risks_map: dict[str, list[float]]
+    snapshot_count: int
+
+
+async def insert_risk_snapshot(
+    user_reference: str,
+    snapshotted_time: datetime,
+    numeraire_currency: str,
+    aggregated_risks_map: dict[str, float],
+    position_keys: dict[str, list],
+    position_risks: dict[str, list],
+    risk_uow: RiskSQLAlchemyUnitOfWork,
+) -> RiskSnapshot:
+    """
+    Position keys equal to the ones of the previous snapshot are not stored
+    again. Must be called within `risk_uow`.
+    """
+    statement = (
+        select(RiskSnapshot)
+        .where(
+            RiskSnapshot.user_reference == user_reference,
+            RiskSnapshot.snapshotted_time < snapshotted_time,
+        )
+        .order_by(RiskSnapshot.snapshotted_time.desc())
+        .limit(1)
+    )
+    result = await risk_uow.session.execute(statement)
+    previous_risk_snapshot = result.scalars().first()
+    position_keys_snapshotted_time = snapshotted_time
+    stored_position_keys = position_keys
+    if previous_risk_snapshot is not None:
+        previous_position_keys = previous_risk_snapshot.position_keys
+        if previous_position_keys is None:
+            previous_position_keys = (
+                await risk_uow.risk_snapshot_repository.find_one(
+                    filter={
+                        "user_reference": user_reference,
+                        "snapshotted_time": previous_risk_snapshot.position_keys_snapshotted_time,
+                    }
+                )
+            ).position_keys
+        if previous_position_keys == position_keys:
+            position_keys_snapshotted_time = (
+                previous_risk_snapshot.position_keys_snapshotted_time
+            )
+            stored_position_keys = None
+    risk_snapshot = RiskSnapshot(
+        user_reference=user_reference,
+        snapshotted_time=snapshotted_time,
+        numeraire_currency=numeraire_currency,
+        **{key: aggregated_risks_map[key] for key in AGGREGATED_RISK_KEYS},
+        position_keys_snapshotted_time=position_keys_snapshotted_time,
+        position_keys=stored_position_keys,
+        position_risks=position_risks,
+    )
+    await risk_uow.risk_snapshot_repository.insert_one(risk_snapshot)
+    return risk_snapshot
+
+
+async def find_risk_snapshot_series(
+    user_reference: str,
+    start_time: datetime,
+    end_time: datetime,
+    max_point_count: int,
+    risk_uow: RiskSQLAlchemyUnitOfWork,
+) -> RiskSnapshotSeries:
+    """
+    Aggregated risks within `[start_time, end_time)` from one range scan of the
+    `(user_reference, snapshotted_time)` index, skipping the per-position
+    columns. Longer series are downsampled to the last snapshot of each of
+    `max_point_count` equal time buckets.
+    """
+    statement = (
+        select(
+            RiskSnapshot.snapshotted_time,
+            *[getattr(RiskSnapshot, key) for key in AGGREGATED_RISK_KEYS],
+        )
+        .where(
+            RiskSnapshot.user_reference == user_reference,
+            RiskSnapshot.snapshotted_time >= start_time,
+            RiskSnapshot.snapshotted_time < end_time,
+        )
+        .order_by(RiskSnapshot.snapshotted_time)
+    )
+    result = await risk_uow.session.execute(statement)
+    rows = result.all()
+    snapshotted_times = [row[0] for row in rows]
+    idxs = np.arange(len(rows))
+    if len(rows) > max_point_count:
+        elapsed_seconds = np.array(
+            [
+                (snapshotted_time - start_time).total_seconds()
+                for snapshotted_time in snapshotted_times
+            ]
+        )
+        buckets = np.minimum(
+            (
+                elapsed_seconds
+                / (end_time - start_time).total_seconds()
+                * max_point_count
+            ).astype(np.int64),
+            max_point_count - 1,
+        )
+        # rows are sorted, so a bucket ends where the next one starts
+        idxs = idxs[np.append(buckets[1:] != buckets[:-1], True)]
+    return RiskSnapshotSeries(
+        snapshotted_times=[snapshotted_times[idx] for idx in idxs],
+        aggregated_risks_map={
+            key: [rows[idx][key_idx + 1] for idx in idxs]
+            for key_idx, key in enumerate(AGGREGATED_RISK_KEYS)
+        },
+        snapshot_count=len(rows),
+    )
+
+
+async def snapshot_okx_risks(
+    chore_master_db: RelationalDatabase, chore_master_api_db: AsyncMongoDB
+) -> int:
+    """
+    Store the risks over all OKX accounts of every end user having any, with the
+    per-position risks as aligned columns.
+    """
+    end_user_collection = chore_master_api_db.get_collection("end_user")
+    end_user_cursor = end_user_collection.find(
+        filter={"okx_trade.account_map": {"$exists": True}},
+        projection={"_id": 0, "reference": 1, "okx_trade.account_map": 1},
+    )
+    inserted_count = 0
+    async for end_user_dict in end_user_cursor:
+        user_reference = end_user_dict["reference"]
+        okx_account_names = list(end_user_dict["okx_trade"]["account_map"].keys())
+        if len(okx_account_names) == 0:
+            continue
+        # a user with broken credentials must not hold back the others
+        try:
+            snapshotted_time = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+            positions = await find_okx_positions(
+                chore_master_api_db, user_reference, okx_account_names
+            )
+            positions_fx_risk = await compute_okx_fx_risks(positions)
+            positions_ir_risk = await compute_okx_ir_risks(positions)
+            okx_risk_summary = await aggregate_okx_risks(
+                positions_fx_risk, positions_ir_risk
+            )
+        except Exception:
+            traceback.print_exc()
+            continue
+        # option positions have no fx risk, so match the ir risks by key
+        key_to_ir_risk_map = {
+            (ir_risk.account_name, ir_risk.symbol, ir_risk.side): ir_risk
+            for ir_risk in positions_ir_risk
+        }
+        position_keys = defaultdict(list)
+        position_risks = defaultdict(list)
+        for fx_risk in positions_fx_risk:
+            ir_risk = key_to_ir_risk_map.get(
+                (fx_risk.account_name, fx_risk.symbol, fx_risk.side)
+            )
+            position_keys["account_names"].append(fx_risk.account_name)
+            position_keys["symbols"].append(fx_risk.symbol)
+            position_keys["instruments"].append(fx_risk.instrument)
+            position_keys["sides"].append(fx_risk.side)
+            position_keys["quote_currencies"].append(fx_risk.quote_currency)
+            position_risks["token_amounts"].append(fx_risk.token_amount)
+            position_risks["deltas"].append(fx_risk.delta)
+            position_risks["gammas"].append(fx_risk.gamma)
+            position_risks["vegas"].append(fx_risk.vega)
+            position_risks["thetas"].append(fx_risk.theta)
+            position_risks["dv01s"].append(ir_risk.dv01 if ir_risk else 0.0)
+            position_risks["rhos"].append(ir_risk.rho if ir_risk else 0.0)
+        async with RiskSQLAlchemyUnitOfWork(chore_master_db) as risk_uow:
+            await insert_risk_snapshot(
+                user_reference=user_reference,
+                snapshotted_time=snapshotted_time,
+                numeraire_currency=okx_risk_summary.numeraire_currency,
+                aggregated_risks_map=okx_risk_summary._asdict(),
+                position_keys=dict(position_keys),
+                position_risks=dict(position_risks),
+                risk_uow=risk_uow,
+            )
+            await risk_uow.commit()
+        inserted_count += 1
+    return inserted_count
+
+
+async def run_risk_snapshot_scheduler(
+    snapshot_risks: Callable[[RelationalDatabase, AsyncMongoDB], Awaitable[int]],
+):
+    """
+    Store the risks of every user periodically. `snapshot_risks` computes and
+    inserts them, and returns the number of snapshots written.
+    """
+    base_config = get_base_config()
+    chore_master_api_web_server_config = get_chore_master_api_web_server_config()
+    chore_master_db, _chore_master_db_registry = await create_db_and_db_registry()
+    chore_master_api_mongo_client = AsyncMongoClient(
+        chore_master_api_web_server_config.MONGODB_URI,
+        min_pool_size=chore_master_api_web_server_config.MONGODB_MIN_POOL_SIZE,
+        max_pool_size=chore_master_api_web_server_config.MONGODB_MAX_POOL_SIZE,
+        max_idle_time_ms=chore_master_api_web_server_config.MONGODB_MAX_IDLE_TIME_MS,
+    )
+    chore_master_api_db = chore_master_api_mongo_client.get_database(
+        base_config.SERVICE_NAME
+    )
+    # a single round at a time across every scheduler instance
+    distributed_lock = create_distributed_lock(chore_master_db, lock_dir=".cache/locks")
+    try:
+        while True:
+            started_time = time.perf_counter()
+            try:
+                async with distributed_lock.acquire("risk_snapshot"):
+                    inserted_count = await snapshot_risks(
+                        chore_master_db, chore_master_api_db
+                    )
+                print(
+                    f"Inserted {inserted_count} risk snapshots in "
+                    f"{time.perf_counter() - started_time:.1f}s",
+                    flush=True,
+                )
+            except LockNotAcquiredError:
+                print("Risk snapshot is running elsewhere, skipped", flush=True)
+            except Exception:
+                traceback.print_exc()
+            await asyncio.sleep(
+                chore_master_api_web_server_config.RISK_SNAPSHOT_INTERVAL_SECONDS
+            )
+    finally:
+        chore_master_api_mongo_client.close()
+        await chore_master_db.dispose()
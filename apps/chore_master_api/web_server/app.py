@@ -1,4 +1,4 @@
-import asyncio
+import time
 from contextlib import asynccontextmanager
 from typing import Optional
 
@@ -7,20 +7,30 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from apps.chore_master_api.config import get_chore_master_api_web_server_config
 from apps.chore_master_api.end_user_space.mapper import Mapper
+from apps.chore_master_api.modules.background_job_runner import BackgroundJobRunner
+from apps.chore_master_api.modules.okx_risk_stream import okx_risk_stream_manager
 
 # from apps.chore_master_api.service_layers.onboarding import ensure_system_initialized
 # from apps.chore_master_api.web_server.dependencies.database import get_schema_migration
-from apps.chore_master_api.web_server.routers import router as base_router
+from apps.chore_master_api.web_server.dependencies.database import (
+    create_schema_migration,
+)
 from modules.base.config import get_base_config
 from modules.base.schemas.system import BaseConfigSchema
+from modules.database.distributed_lock import create_distributed_lock
 from modules.database.relational_database import RelationalDatabase
+from modules.utils.import_utils import ImportUtils
 from modules.web_server.base_fastapi import BaseFastAPI
+from modules.web_server.instrumentation import Instrumentation
 
 
 def get_app(base_config: Optional[BaseConfigSchema] = None) -> FastAPI:
     if base_config is None:
         base_config = get_base_config()
     chore_master_api_web_server_config = get_chore_master_api_web_server_config()
+    instrumentation = None
+    if chore_master_api_web_server_config.INSTRUMENTATION_ENABLED:
+        instrumentation = Instrumentation()
 
     @asynccontextmanager
     async def lifespan(app: FastAPI):
@@ -35,6 +45,8 @@ def get_app(base_config: Optional[BaseConfigSchema] = None) -> FastAPI:
             metadata=metadata
         )
         Mapper(chore_master_db_registry).map_models_to_tables()
+        if instrumentation is not None:
+            instrumentation.instrument_database(chore_master_db)
 
         # schema_migration = await get_schema_migration(chore_master_db)
         # await ensure_system_initialized(
@@ -42,15 +54,53 @@ def get_app(base_config: Optional[BaseConfigSchema] = None) -> FastAPI:
         #     chore_master_db_registry=chore_master_db_registry,
         #     schema_migration=schema_migration,
         # )
+        # the lifespan runs once per worker process, so everything kept in
+        # `app.state` (engines, executors) is owned by a single worker
         app.state.chore_master_db = chore_master_db
         app.state.chore_master_db_registry = chore_master_db_registry
-        app.state.mutex = asyncio.Lock()
+        app.state.chore_master_db_schema_migration = create_schema_migration(
+            chore_master_db
+        )
+        # shared by all workers, unlike the rest of `app.state`
+        app.state.distributed_lock = create_distributed_lock(
+            chore_master_db, lock_dir=".cache/locks"
+        )
+        app.state.background_job_runner = BackgroundJobRunner(
+            chore_master_db,
+            max_concurrency=chore_master_api_web_server_config.BACKGROUND_JOB_MAX_CONCURRENCY,
+        )
+        chore_master_api_mongo_client = None
+        if chore_master_api_web_server_config.MONGODB_URI is not None:
+            from modules.database.async_mongo_client import AsyncMongoClient
+
+            chore_master_api_mongo_client = AsyncMongoClient(
+                chore_master_api_web_server_config.MONGODB_URI,
+                min_pool_size=chore_master_api_web_server_config.MONGODB_MIN_POOL_SIZE,
+                max_pool_size=chore_master_api_web_server_config.MONGODB_MAX_POOL_SIZE,
+                max_idle_time_ms=chore_master_api_web_server_config.MONGODB_MAX_IDLE_TIME_MS,
+            )
+            if instrumentation is not None:
+                instrumentation.instrument_mongo_client(chore_master_api_mongo_client)
+            # fail fast on a bad uri, and keep server discovery off the first request
+            await chore_master_api_mongo_client.warm_up()
+        app.state.chore_master_api_mongo_client = chore_master_api_mongo_client
+        # websocket subscriptions are per worker, each serves its own requests
+        okx_risk_stream_manager.is_enabled = (
+            chore_master_api_web_server_config.OKX_RISK_STREAM_ENABLED
+        )
         yield
+        await okx_risk_stream_manager.shutdown()
+        await app.state.background_job_runner.shutdown()
+        if chore_master_api_mongo_client is not None:
+            chore_master_api_mongo_client.close()
+        app.state.chore_master_db_schema_migration.shutdown()
+        await chore_master_db.dispose()
 
     app = BaseFastAPI(
         base_config=base_config,
         title="Chore Master API",
         lifespan=lifespan,
+        instrumentation=instrumentation,
     )
     app.add_middleware(
         CORSMiddleware,
@@ -59,5 +109,22 @@ def get_app(base_config: Optional[BaseConfigSchema] = None) -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+
+    # routers are imported here rather than at module level, so that importing
+    # this module stays cheap and the cost shows up in the startup report
+    router_import_started_time = time.perf_counter()
+    from apps.chore_master_api.web_server.routers import router as base_router
+
     app.include_router(base_router)
+    app.state.router_import_seconds = time.perf_counter() - router_import_started_time
+    if chore_master_api_web_server_config.IMPORT_TIME_REPORT_ENABLED:
+        import_time_records = ImportUtils.profile_import_time(
+            "apps.chore_master_api.web_server.routers"
+        )
+        app.state.import_time_records = import_time_records
+        print(
+            f"Routers imported in {app.state.router_import_seconds:.3f}s\n"
+            f"{ImportUtils.format_import_time_report(import_time_records)}",
+            flush=True,
+        )
     return app
@@ -1,37 +1,29 @@
-from typing import AsyncIterator
+from typing import Optional
 
 from fastapi import Depends, Request
 
-from apps.chore_master_api.config import get_chore_master_api_web_server_config
-from apps.chore_master_api.web_server.schemas.config import (
-    ChoreMasterAPIWebServerConfigSchema,
-)
 from modules.base.config import get_base_config
 from modules.base.schemas.system import BaseConfigSchema
 from modules.database.async_mongo_client import AsyncMongoClient, AsyncMongoDB
+from modules.web_server.exceptions import InternalServerError
 
 
-async def get_chore_master_api_mongo_client(
-    chore_master_api_web_server_config: ChoreMasterAPIWebServerConfigSchema = Depends(
-        get_chore_master_api_web_server_config
-    ),
-) -> AsyncIterator[AsyncMongoClient]:
-    async_mongo_client = AsyncMongoClient(
-        chore_master_api_web_server_config.MONGODB_URI,
-        min_pool_size=1,
-        max_pool_size=8,
-    )
-    yield async_mongo_client
-    async_mongo_client.close()
+def get_chore_master_api_mongo_client(request: Request) -> AsyncMongoClient:
+    # created once per worker by the app lifespan, so requests share its pool
+    chore_master_api_mongo_client: Optional[
+        AsyncMongoClient
+    ] = request.app.state.chore_master_api_mongo_client
+    if chore_master_api_mongo_client is None:
+        raise InternalServerError("`MONGODB_URI` is not configured")
+    return chore_master_api_mongo_client
 
 
 async def get_chore_master_api_db(
-    request: Request,
+    chore_master_api_mongo_client: AsyncMongoClient = Depends(
+        get_chore_master_api_mongo_client
+    ),
     base_config: BaseConfigSchema = Depends(get_base_config),
 ) -> AsyncMongoDB:
-    chore_master_api_mongo_client: AsyncMongoClient = (
-        request.app.state.chore_master_api_mongo_client
-    )
     chore_master_api_db = chore_master_api_mongo_client.get_database(
         base_config.SERVICE_NAME
     )
@@ -2,7 +2,6 @@ import google.auth.exceptions
 from fastapi import Depends
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from googleapiclient.errors import HttpError
 
 from apps.chore_master_api.config import get_chore_master_api_web_server_config
 from apps.chore_master_api.web_server.dependencies.auth import (
@@ -12,8 +11,11 @@ from apps.chore_master_api.web_server.schemas.config import (
     ChoreMasterAPIWebServerConfigSchema,
 )
 from modules.google_service.google_service import GoogleService
+from modules.utils.import_utils import ImportUtils
 from modules.web_server.exceptions import InternalServerError
 
+googleapiclient_errors = ImportUtils.lazy_import("googleapiclient.errors")
+
 
 async def get_credentials(
     current_end_user_session: dict = Depends(get_current_end_user_session),
@@ -34,7 +36,7 @@ async def get_credentials(
         except google.auth.exceptions.RefreshError:
             # TODO: logout the user
             raise InternalServerError()
-        except HttpError as err:
+        except googleapiclient_errors.HttpError as err:
             raise InternalServerError()
     return credentials
 
@@ -0,0 +1,7 @@
+from fastapi import Request
+
+from apps.chore_master_api.modules.background_job_runner import BackgroundJobRunner
+
+
+def get_background_job_runner(request: Request) -> BackgroundJobRunner:
+    return request.app.state.background_job_runner
@@ -1,14 +1,34 @@
-import asyncio
-from typing import AsyncIterator
+from typing import AsyncIterator, Callable
 
 from fastapi import Request
 
+from modules.database.distributed_lock import (
+    BaseDistributedLock,
+    DistributedLockLease,
+    LockNotAcquiredError,
+)
 from modules.web_server.exceptions import BadRequestError
 
 
-async def get_mutex(request: Request) -> AsyncIterator[asyncio.Lock]:
-    mutex: asyncio.Lock = request.app.state.mutex
-    if mutex.locked():
-        raise BadRequestError("Mutex is locked")
-    async with mutex:
-        yield mutex
+def get_distributed_lock(request: Request) -> BaseDistributedLock:
+    return request.app.state.distributed_lock
+
+
+def require_lock(
+    key: str, timeout_seconds: float = 0.0
+) -> Callable[[Request], AsyncIterator[DistributedLockLease]]:
+    """
+    Dependency holding the cluster wide lock `key` for the whole request.
+    """
+
+    async def _require_lock(request: Request) -> AsyncIterator[DistributedLockLease]:
+        distributed_lock = get_distributed_lock(request)
+        try:
+            async with distributed_lock.acquire(
+                key, timeout_seconds=timeout_seconds
+            ) as lease:
+                yield lease
+        except LockNotAcquiredError as e:
+            raise BadRequestError(str(e))
+
+    return _require_lock
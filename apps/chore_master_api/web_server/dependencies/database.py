@@ -18,9 +18,7 @@ async def get_chore_master_db_registry(
     return request.app.state.chore_master_db_registry
 
 
-async def get_schema_migration(
-    chore_master_db: RelationalDatabase = Depends(get_chore_master_db),
-) -> SchemaMigration:
+def create_schema_migration(chore_master_db: RelationalDatabase) -> SchemaMigration:
     schema_migration = SchemaMigration(
         database=chore_master_db,
         version_dir="./apps/chore_master_api/end_user_space/migrations",
@@ -29,6 +27,10 @@ async def get_schema_migration(
     return schema_migration
 
 
+async def get_schema_migration(request: Request) -> SchemaMigration:
+    return request.app.state.chore_master_db_schema_migration
+
+
 async def get_data_migration(
     chore_master_db: RelationalDatabase = Depends(get_chore_master_db),
     chore_master_db_registry: registry = Depends(get_chore_master_db_registry),
@@ -10,6 +10,9 @@ from apps.chore_master_api.end_user_space.unit_of_works.identity import (
 from apps.chore_master_api.end_user_space.unit_of_works.integration import (
     IntegrationSQLAlchemyUnitOfWork,
 )
+from apps.chore_master_api.end_user_space.unit_of_works.risk import (
+    RiskSQLAlchemyUnitOfWork,
+)
 from apps.chore_master_api.end_user_space.unit_of_works.some_module import (
     SomeModuleSQLAlchemyUnitOfWork,
 )
@@ -51,6 +54,13 @@ async def get_finance_uow(
     return FinanceSQLAlchemyUnitOfWork(relational_database=chore_master_db)
 
 
+async def get_risk_uow(
+    chore_master_db: RelationalDatabase = Depends(get_chore_master_db),
+    _end_user_db_registry: registry = Depends(get_chore_master_db_registry),
+) -> RiskSQLAlchemyUnitOfWork:
+    return RiskSQLAlchemyUnitOfWork(relational_database=chore_master_db)
+
+
 async def get_some_module_uow(
     chore_master_db: RelationalDatabase = Depends(get_chore_master_db),
     _end_user_db_registry: registry = Depends(get_chore_master_db_registry),
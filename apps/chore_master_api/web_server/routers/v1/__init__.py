@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 
+from apps.chore_master_api.web_server.routers.v1._risk import router as risk_router
 from apps.chore_master_api.web_server.routers.v1.admin import router as admin_router
 from apps.chore_master_api.web_server.routers.v1.content_delivery import (
     router as content_delivery_router,
@@ -23,5 +24,6 @@ router.include_router(admin_router)
 router.include_router(trace_router)
 router.include_router(integration_router)
 router.include_router(finance_router)
+router.include_router(risk_router)
 router.include_router(content_delivery_router)
 router.include_router(some_module_router)
@@ -1,26 +1,72 @@
-import logging
+import asyncio
+import time
 from collections import defaultdict
-from datetime import datetime
-from decimal import Decimal
-from math import erf, pi
+from datetime import datetime, timezone
+from typing import Annotated, Optional
 
-import ccxt.async_support as ccxt
-from fastapi import APIRouter, Depends
-from numpy import exp, log, sqrt
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
+from apps.chore_master_api.end_user_space.unit_of_works.risk import (
+    RiskSQLAlchemyUnitOfWork,
+)
+from apps.chore_master_api.modules.okx_risk_stream import okx_risk_stream_manager
+from apps.chore_master_api.modules.option_pricing import implied_volatility
+from apps.chore_master_api.modules.scenario_grid import (
+    ScenarioPositionKindEnum,
+    create_scenario_position_book,
+    evaluate_scenario_grid,
+)
+from apps.chore_master_api.modules.term_structure import (
+    interpolate_rates,
+    load_term_structure_curves,
+    to_continuous_rates,
+)
+from apps.chore_master_api.modules.value_at_risk import (
+    STABLE_CURRENCIES,
+    ValueAtRiskMethodEnum,
+    compute_value_at_risk,
+    get_horizon_log_returns,
+    load_return_matrix,
+    simulate_log_returns,
+)
+from apps.chore_master_api.service_layers.okx_account import get_okx_account_map
+from apps.chore_master_api.service_layers.okx_risk import (
+    compute_okx_fx_risks,
+    compute_okx_ir_risks,
+    compute_okx_risk_summary,
+    fetch_okx_ticker,
+    find_okx_positions,
+    get_currencies_by_symbol,
+    get_okx_market_info_by_symbol,
+)
+from apps.chore_master_api.service_layers.risk import (
+    AGGREGATED_RISK_KEYS,
+    find_risk_snapshot_series,
+)
 from apps.chore_master_api.web_server.dependencies._database import (
     get_chore_master_api_db,
 )
-from apps.chore_master_api.web_server.dependencies.auth import get_current_end_user
-from modules.database.mongo_client import MongoDB
+from apps.chore_master_api.web_server.dependencies.auth import (
+    get_current_user,
+    require_freemium_role,
+)
+from apps.chore_master_api.web_server.dependencies.unit_of_work import get_risk_uow
+from apps.chore_master_api.web_server.schemas.dto import CurrentUser
+from modules.database.async_mongo_client import AsyncMongoDB
+from modules.utils.import_utils import ImportUtils
+from modules.web_server.exceptions import BadRequestError
 from modules.web_server.schemas.response import ResponseSchema, StatusEnum
 
-router = APIRouter(prefix="/risk", tags=["Risk"])
+np = ImportUtils.lazy_import("numpy")
 
+router = APIRouter(prefix="/risk", tags=["Risk"])
 
-class ReadAbcResponse(BaseModel):
-    a: str
+RISK_STREAM_MIN_INTERVAL_SECONDS = 1.0
+# the summary is pushed again after this long even without changes, which also
+# keeps idle connections open
+RISK_STREAM_HEARTBEAT_SECONDS = 15.0
 
 
 class ReadPositionResponse(BaseModel):
@@ -79,6 +125,50 @@ class ReadPositionIrRiskResponse(BaseModel):
     positions_ir_risk: list[PositionIrRisk]
 
 
+class ReadValueAtRiskResponse(BaseModel):
+    class CurrencyExposure(BaseModel):
+        currency: str
+        exposure: float
+        expected_shortfall_contribution: float
+
+    method: ValueAtRiskMethodEnum
+    numeraire_currency: str
+    confidence_level: float
+    horizon_days: int
+    scenario_count: int
+    value_at_risk: float
+    expected_shortfall: float
+    exposures: list[CurrencyExposure]
+    unpriced_symbols: list[str]
+
+
+class ReadScenarioGridResponse(BaseModel):
+    numeraire_currency: str
+    spot_shocks: list[float]
+    volatility_shocks: list[float]
+    rate_shocks: list[float]
+    # indexed by [spot shock][volatility shock][rate shock]
+    profit_and_losses: list[list[list[float]]]
+    worst_profit_and_loss: float
+    worst_spot_shock: float
+    worst_volatility_shock: float
+    worst_rate_shock: float
+    unpriced_symbols: list[str]
+
+
+class ReadRiskSnapshotSeriesResponse(BaseModel):
+    numeraire_currency: str
+    # snapshots within the range, before downsampling
+    snapshot_count: int
+    snapshotted_times: list[datetime]
+    aggregated_delta: list[float]
+    aggregated_gamma: list[float]
+    aggregated_vega: list[float]
+    aggregated_theta: list[float]
+    aggregated_dv01: list[float]
+    aggregated_rho: list[float]
+
+
 class ReadPositionAlertResponse(BaseModel):
     class PositionRiskAlert(BaseModel):
         aggregated_dv01: float
@@ -105,298 +195,102 @@ class ReadPositionRiskSummaryResponse(BaseModel):
     positions_risk: PositionRiskSummary
 
 
-@router.get("/abc")
-async def get_some_entities():
-    return ResponseSchema(
-        status=StatusEnum.SUCCESS, data=ReadAbcResponse(a="some string")
-    )
-
-
 # Define a Pydantic model for the request
 class OKXPositionRequest(BaseModel):
     selected_okx_account_names: list[str]
 
 
-async def get_okx_market_info_by_symbol(symbol: str, exchange: ccxt.okx) -> dict:
-    market = await exchange.fetch_markets()
-    target_market_list = [m for m in market if m["symbol"] == symbol]
-    if target_market_list is None:
-        return None
-    else:
-        target_market = target_market_list[0]
-    return target_market
-
-
-async def get_insturment_by_symbol(symbol: str, exchange: ccxt.okx) -> dict[str, str]:
-    target_market = await get_okx_market_info_by_symbol(
-        symbol=symbol, exchange=exchange
-    )
-    if target_market["type"] == "spot":
-        instrument = "spot"
-    elif target_market["type"] == "future":
-        instrument = "future"
-    elif target_market["type"] == "option":
-        instrument = "option"
-    elif target_market["type"] == "swap":
-        instrument = "perpetual"
-    else:
-        instrument = "Not Found"
-    return instrument
-
-
-async def get_currencies_by_symbol(symbol: str, exchange: ccxt.okx) -> tuple[str, str]:
-    target_market = await get_okx_market_info_by_symbol(
-        symbol=symbol, exchange=exchange
-    )
-    return target_market["base"], target_market["quote"]
-
-
-@router.post("/positions")
+@router.post("/positions", dependencies=[Depends(require_freemium_role)])
 async def post_okx_positions(
     selected_okx_accounts: OKXPositionRequest,
-    chore_master_api_db: MongoDB = Depends(get_chore_master_api_db),
-    current_end_user: dict = Depends(get_current_end_user),
+    chore_master_api_db: AsyncMongoDB = Depends(get_chore_master_api_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Sample request body:
     ```
     {
-        "selected_okx_account_name": ["okx-data-01"]
+        "selected_okx_account_names": ["okx-data-01"]
     }
     ```
 
     """
-    end_user_collection = chore_master_api_db.get_collection("end_user")
-    account_info = end_user_collection.find(
-        filter={"reference": current_end_user["reference"]}, projection={"_id": 0}
+    positions = await find_okx_positions(
+        chore_master_api_db,
+        current_user.reference,
+        selected_okx_accounts.selected_okx_account_names,
     )
-    account_info = (await account_info.to_list(length=1))[0]
-    if "okx_trade" not in account_info:
-        return ResponseSchema[ReadPositionResponse](
-            status=StatusEnum.SUCCESS, data=ReadAbcResponse(a="some string")
-        )
-    elif "account_map" not in account_info["okx_trade"]:
-        return ResponseSchema[ReadPositionResponse](
-            status=StatusEnum.SUCCESS, data=ReadAbcResponse(a="some string")
-        )
-
-    okx_account_info = account_info["okx_trade"]["account_map"]
-
-    okx_accounts = defaultdict(dict)
-
-    for selected_okx_account_name in selected_okx_accounts.selected_okx_account_names:
-        if selected_okx_account_name in okx_account_info:
-            okx_accounts[selected_okx_account_name] = okx_account_info[
-                selected_okx_account_name
-            ]
-        else:
-            logging.info(f"selected_okx_account_name: {selected_okx_account_name}")
-
-    aggregated_positions = []
-
-    for selected_account_name, okx_account in okx_accounts.items():
-        exchange = ccxt.okx(
-            {
-                "apiKey": okx_account["api_key"],
-                "secret": okx_account["passphrase"],
-                "password": okx_account["password"],
-                "enableRateLimit": True,
-                # "sandbox": False if okx_account["env"] == "MAINNET" else True,
-            }
-        )
-        # fetch all positions
-        raw_positions = await exchange.fetch_positions()
-        raw_balances = await exchange.fetch_balance({"type": "trading"})
-        raw_balances_funding_account = await exchange.fetch_balance({"type": "funding"})
-        finance_account = await exchange.privateGetFinanceSavingsBalance()
-
-        # generate position by expression
-        positions = [
-            ReadPositionResponse.Position(
-                symbol=position["symbol"],
-                account_name=selected_account_name,
-                max_leverage=position["leverage"],
-                side=position["side"],
-                token_amount=position["contracts"] * position["contractSize"],
-                contract_amount=position["contracts"],
-                liquidation_price=position["liquidationPrice"],
-                entry_price=position["entryPrice"],
-                mark_price=position["markPrice"],
-                profit_and_loss=position["unrealizedPnl"] + position["realizedPnl"],
-                realized_pnl=position["realizedPnl"],
-                unrealized_pnl=position["unrealizedPnl"],
-                percentage_to_liquidation=(
-                    abs(
-                        (position["liquidationPrice"] - position["markPrice"])
-                        / position["markPrice"]
-                    )
-                    if position["liquidationPrice"] is not None
-                    else None
-                ),
-                current_margin=position["initialMargin"],
-                initial_margin=position["collateral"],
-                maintenance_margin=position["maintenanceMargin"],
-                margin_ratio=position["marginRatio"],
-                instrument=await get_insturment_by_symbol(position["symbol"], exchange),
-            )
-            for position in raw_positions
-        ]
-
-        spot_positions = [
-            ReadPositionResponse.Position(
-                symbol=balance["ccy"],
-                account_name=selected_account_name,
-                max_leverage=1,
-                side="long",
-                token_amount=balance["eq"],
-                contract_amount=None,
-                liquidation_price=None,
-                entry_price=None,
-                mark_price=None,
-                profit_and_loss=None,
-                realized_pnl=None,
-                unrealized_pnl=None,
-                percentage_to_liquidation=None,
-                current_margin=None,
-                initial_margin=None,
-                maintenance_margin=None,
-                margin_ratio=(
-                    float(Decimal(balance["mgnRatio"]))
-                    if balance["mgnRatio"] != ""
-                    else None
-                ),
-                instrument="spot",
-            )
-            for balance in raw_balances["info"]["data"][0]["details"]
-        ]
-
-        spot_positions_funding = [
-            ReadPositionResponse.Position(
-                symbol=balance["ccy"],
-                account_name=selected_account_name,
-                max_leverage=1,
-                side="long",
-                token_amount=balance["bal"],
-                contract_amount=None,
-                liquidation_price=None,
-                entry_price=None,
-                mark_price=None,
-                profit_and_loss=None,
-                realized_pnl=None,
-                unrealized_pnl=None,
-                percentage_to_liquidation=None,
-                current_margin=None,
-                initial_margin=None,
-                maintenance_margin=None,
-                margin_ratio=None,
-                instrument="spot",
-            )
-            for balance in raw_balances_funding_account["info"]["data"]
-        ]
-
-        spot_positions_finance = [
-            ReadPositionResponse.Position(
-                symbol=balance["ccy"],
-                account_name=selected_account_name,
-                max_leverage=1,
-                side="long",
-                token_amount=balance["amt"],
-                contract_amount=None,
-                liquidation_price=None,
-                entry_price=None,
-                mark_price=None,
-                profit_and_loss=None,
-                realized_pnl=None,
-                unrealized_pnl=None,
-                percentage_to_liquidation=None,
-                current_margin=None,
-                initial_margin=None,
-                maintenance_margin=None,
-                margin_ratio=None,
-                instrument="spot",
-            )
-            for balance in finance_account["data"]
-        ]
-
-        aggregated_positions.extend(positions)
-        aggregated_positions.extend(spot_positions)
-        aggregated_positions.extend(spot_positions_funding)
-        aggregated_positions.extend(spot_positions_finance)
-
     return ResponseSchema[ReadPositionResponse](
         status=StatusEnum.SUCCESS,
-        data=ReadPositionResponse(positions=aggregated_positions),
+        data=ReadPositionResponse(
+            positions=[position._asdict() for position in positions]
+        ),
     )
 
 
-def black_scholes(option_type, S, K, T, r, sigma):
-    d1 = (log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * sqrt(T))
-    d2 = d1 - sigma * sqrt(T)
-
-    if option_type == "call":
-        price = S * (0.5 * (1.0 + erf(d1 / sqrt(2.0)))) - K * exp(-r * T) * (
-            0.5 * (1.0 + erf(d2 / sqrt(2.0)))
-        )
-    else:
-        price = K * exp(-r * T) * (0.5 * (1.0 + erf(-d2 / sqrt(2.0)))) - S * (
-            0.5 * (1.0 + erf(-d1 / sqrt(2.0)))
-        )
-
-    return price
-
-
-# Vega function (the derivative of option price with respect to volatility)
-def vega(S, K, T, r, sigma):
-    d1 = (log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * sqrt(T))
-    return S * sqrt(T) * exp(-0.5 * d1**2) / sqrt(2 * pi)
-
-
-# Newton-Raphson method to calculate implied volatility
-def find_implied_volatility(
-    option_type,
-    option_price,
-    S,
-    K,
-    T,
-    r,
-    initial_guess=0.2,
-    tolerance=1e-6,
-    max_iterations=100,
+@router.post("/fxrisk", dependencies=[Depends(require_freemium_role)])
+async def post_okx_fx_risk(
+    selected_okx_accounts: OKXPositionRequest,
+    chore_master_api_db: AsyncMongoDB = Depends(get_chore_master_api_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    sigma = initial_guess  # Initial guess for volatility
-    for i in range(max_iterations):
-        price = black_scholes(
-            option_type, S, K, T, r, sigma
-        )  # Current option price using guessed sigma
-        v = vega(S, K, T, r, sigma)  # Current vega (sensitivity of price to volatility)
-
-        price_diff = (
-            price - option_price
-        )  # Difference between market price and Black-Scholes price
-        if (
-            abs(price_diff) < tolerance
-        ):  # If the difference is within the tolerance, we're done
-            return sigma
+    """
+    Sample request body:
+    ```
+    {
+        "selected_okx_account_names": ["okx-data-01"]
+    }
+    ```
 
-        sigma -= price_diff / v  # Update sigma using Newton's method
+    """
+    positions = await find_okx_positions(
+        chore_master_api_db,
+        current_user.reference,
+        selected_okx_accounts.selected_okx_account_names,
+    )
+    positions_fx_risk = await compute_okx_fx_risks(positions)
+    return ResponseSchema[ReadPositionFxRiskResponse](
+        status=StatusEnum.SUCCESS,
+        data=ReadPositionFxRiskResponse(
+            positions_fx_risk=[fx_risk._asdict() for fx_risk in positions_fx_risk]
+        ),
+    )
 
-    return sigma  # Return the result (may not have converged fully)
 
+@router.post("/irrisk", dependencies=[Depends(require_freemium_role)])
+async def post_okx_ir_risk(
+    selected_okx_accounts: OKXPositionRequest,
+    chore_master_api_db: AsyncMongoDB = Depends(get_chore_master_api_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Sample request body:
+    ```
+    {
+        "selected_okx_account_names": ["okx-data-01"]
+    }
+    ```
 
-# Rho function (the derivative of option price with respect to risk-free interest rate)
-def get_rho(option_type, S, K, T, r, sigma):
-    d2 = (log(S / K) + (r - 0.5 * sigma**2) * T) / (sigma * sqrt(T))
-    if option_type == "call":
-        return K * T * exp(-r * T) * (0.5 * (1.0 + erf(d2 / sqrt(2.0))))
-    else:
-        return -K * T * exp(-r * T) * (0.5 * (1.0 + erf(-d2 / sqrt(2.0))))
+    """
+    positions = await find_okx_positions(
+        chore_master_api_db,
+        current_user.reference,
+        selected_okx_accounts.selected_okx_account_names,
+    )
+    positions_ir_risk = await compute_okx_ir_risks(positions)
+    return ResponseSchema[ReadPositionIrRiskResponse](
+        status=StatusEnum.SUCCESS,
+        data=ReadPositionIrRiskResponse(
+            positions_ir_risk=[ir_risk._asdict() for ir_risk in positions_ir_risk]
+        ),
+    )
 
 
-@router.post("/fxrisk")
-async def post_okx_fx_risk(
+@router.post("/risk_summary", dependencies=[Depends(require_freemium_role)])
+async def post_okx_alert(
     selected_okx_accounts: OKXPositionRequest,
-    chore_master_api_db: MongoDB = Depends(get_chore_master_api_db),
-    current_end_user: dict = Depends(get_current_end_user),
+    chore_master_api_db: AsyncMongoDB = Depends(get_chore_master_api_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Sample request body:
@@ -407,483 +301,439 @@ async def post_okx_fx_risk(
     ```
 
     """
-    positions_response = await post_okx_positions(
-        selected_okx_accounts, chore_master_api_db, current_end_user
+    okx_risk_summary = await compute_okx_risk_summary(
+        chore_master_api_db,
+        current_user.reference,
+        selected_okx_accounts.selected_okx_account_names,
+    )
+    return ResponseSchema[ReadPositionRiskSummaryResponse](
+        status=StatusEnum.SUCCESS,
+        data=ReadPositionRiskSummaryResponse(positions_risk=okx_risk_summary._asdict()),
     )
-    positions = positions_response.data.positions
 
-    # Initialize positions_fx_risk dictionary
-    positions_fx_risk = []
 
-    exchange_rate_map = defaultdict(dict)
-    # Iterate over each position and calculate the FX risk metrics
-    for position in positions:
-        exchange = ccxt.okx(
-            {
-                "enableRateLimit": True,
-                # "sandbox": False if okx_account["env"] == "MAINNET" else True,
-            }
+@router.get("/risk_summary/stream", dependencies=[Depends(require_freemium_role)])
+async def get_okx_risk_summary_stream(
+    selected_okx_account_names: Annotated[list[str], Query()],
+    chore_master_api_db: AsyncMongoDB = Depends(get_chore_master_api_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Server-sent events of the risk summary, pushed whenever a streamed position,
+    balance or ticker changes, at most once per `RISK_STREAM_MIN_INTERVAL_SECONDS`.
+    """
+    if not okx_risk_stream_manager.is_enabled:
+        raise BadRequestError("Risk streaming is not enabled")
+    okx_account_map = await get_okx_account_map(
+        chore_master_api_db, current_user.reference
+    )
+    if okx_account_map is None:
+        raise BadRequestError("OKX accounts are not configured")
+    okx_account_streams = []
+    for selected_okx_account_name in selected_okx_account_names:
+        if selected_okx_account_name not in okx_account_map:
+            continue
+        okx_account_stream = await okx_risk_stream_manager.get_ready_stream(
+            current_user.reference,
+            selected_okx_account_name,
+            okx_account_map[selected_okx_account_name],
         )
-        # This is just a placeholder, replace with your actual logic to compute risk metrics
-        if position.instrument != "spot":
-            base_currency, quote_currency = await get_currencies_by_symbol(
-                position.symbol, exchange
-            )
-        else:
-            base_currency = position.symbol
-            quote_currency = "USDT"
-
-        if base_currency + "/" + quote_currency in exchange_rate_map:
-            exchange_rate = exchange_rate_map[base_currency + "/" + quote_currency]
-        else:
-
-            # Get base currency to quote currency exchange rate
-            query_symbol = (
-                base_currency + "/" + quote_currency + "T"
-                if quote_currency == "USD"
-                else base_currency + "/" + quote_currency
-            )
-            exchange_rate = (
-                (await exchange.fetch_ticker(query_symbol))["last"]
-                if base_currency != quote_currency
-                else 1
+        if okx_account_stream is None:
+            raise BadRequestError(
+                f"OKX account `{selected_okx_account_name}` is not streaming"
             )
-            exchange_rate_map[query_symbol] = exchange_rate
-
-        delta = 0.0
-        gamma = 0.0
-        vega = 0.0
-        theta = 0.0
+        okx_account_streams.append(okx_account_stream)
 
-        if position.instrument == "spot":
-            if base_currency == quote_currency:
-                delta = 0.0
-            else:
-                delta = position.token_amount * (
-                    +0.01 * exchange_rate
-                    if position.side == "long"
-                    else -0.01 * exchange_rate
-                )
-            gamma = 0.0
-            vega = 0.0
-            theta = 0.0
-
-        elif position.instrument == "future":
-            market_info = await get_okx_market_info_by_symbol(position.symbol, exchange)
-            maturity_time = datetime.strptime(
-                market_info["expiryDatetime"], "%Y-%m-%dT%H:%M:%S.%fZ"
+    async def _iterate_events():
+        while True:
+            # taken before computing, so changes meanwhile trigger the next push
+            change_versions = okx_risk_stream_manager.get_change_versions(
+                okx_account_streams
             )
-            current_time = datetime.utcnow()
-            days_to_maturity = float((maturity_time - current_time).days)
-            if days_to_maturity < 1:
-                seconds_to_maturity = (maturity_time - current_time).seconds
-                days_to_maturity = seconds_to_maturity / (24 * 60 * 60)
-            time_to_maturity = days_to_maturity / 365
-            time_to_maturity_tomorrow = max((days_to_maturity - 1), 0.0) / 365
-            if days_to_maturity <= 1.0:
-                theta = 0.0
-            else:
-                # get the spot price from the order book
-                spot_symbol = base_currency + "/" + quote_currency
-                spot_price = await exchange.fetch_ticker(spot_symbol)
-                implied_term_rate = (
-                    (position.mark_price - spot_price["last"])
-                    / spot_price["last"]
-                    / time_to_maturity
-                )
-                term_price_today = spot_price["last"] * (
-                    1 + implied_term_rate * time_to_maturity
-                )
-                theoretical_term_price_in_tomorrow = spot_price["last"] * (
-                    1 + implied_term_rate * time_to_maturity_tomorrow
-                )
-                theta = (
-                    (theoretical_term_price_in_tomorrow - term_price_today)
-                    * position.token_amount
-                    * (+1 if position.side == "long" else -1)
-                )
-            delta = position.token_amount * (
-                +0.01 * exchange_rate
-                if position.side == "long"
-                else -0.01 * exchange_rate
+            okx_risk_summary = await compute_okx_risk_summary(
+                chore_master_api_db, current_user.reference, selected_okx_account_names
             )
-            gamma = 0.0
-            vega = 0.0
-
-        elif position.instrument == "option":
-            continue
-            market_info = await get_okx_market_info_by_symbol(position.symbol, exchange)
-            spot_symbol = base_currency + "/" + quote_currency
-            spot_price = await exchange.fetch_ticker(spot_symbol)
-            option_type = market_info["info"]["optionType"]
-            maturity_time = market_info["info"]["settlementTime"]
-            strike_price = market_info["info"]["strike"]
-            # Days to maturity
-            current_time = datetime.now().timestamp()
-            days_to_maturity = (maturity_time - current_time) / (24 * 60 * 60)
-            time_to_maturity = days_to_maturity / 365
-            time_to_maturity_tomorrow = (days_to_maturity - 1) / 365
-
-            # Implied volatility
-            option_ticker = await exchange.fetch_ticker(position.symbol)
-            option_price = option_ticker["last"]
-            implied_term_rate = (1 / spot_price["last"]) ** (1 / days_to_maturity) - 1
-            sigma = find_implied_volatility(
-                option_type,
-                option_price,
-                spot_price["last"],
-                strike_price,
-                time_to_maturity,
-                implied_term_rate,
-                max_iterations=1000,
+            risk_summary_response = ReadPositionRiskSummaryResponse(
+                positions_risk=okx_risk_summary._asdict()
             )
-
-            # Black-Scholes parameters
-            d1 = (
-                log(spot_price / strike_price)
-                + (implied_term_rate + 0.5 * sigma**2) * time_to_maturity
-            ) / (sigma * sqrt(time_to_maturity))
-            d2 = d1 - sigma * sqrt(time_to_maturity)
-
-            # CDF and PDF from numpy equivalent for normal distribution
-            norm_cdf = lambda x: (1.0 + erf(x / sqrt(2.0))) / 2.0
-            norm_pdf = lambda x: exp(-0.5 * x**2) / sqrt(2 * pi)
-
-            # Calculate Greeks
-            delta = norm_cdf(d1) if option_type == "call" else norm_cdf(d1) - 1
-            gamma = norm_pdf(d1) / (spot_price * sigma * sqrt(time_to_maturity))
-            vega = spot_price * norm_pdf(d1) * sqrt(time_to_maturity)
-            theta = (
-                -spot_price * norm_pdf(d1) * sigma / (2 * sqrt(time_to_maturity))
-            ) - (
-                implied_term_rate
-                * strike_price
-                * exp(-implied_term_rate * time_to_maturity)
-                * norm_cdf(d2 if option_type == "call" else -d2)
+            yield f"data: {risk_summary_response.model_dump_json()}\n\n"
+            await asyncio.sleep(RISK_STREAM_MIN_INTERVAL_SECONDS)
+            await okx_risk_stream_manager.wait_for_change(
+                okx_account_streams,
+                change_versions,
+                timeout_seconds=RISK_STREAM_HEARTBEAT_SECONDS,
             )
 
-        elif position.instrument == "perpetual":
-            delta = position.token_amount * (
-                +0.01 * exchange_rate
-                if position.side == "long"
-                else -0.01 * exchange_rate
-            )
-            gamma = 0.0
-            vega = 0.0
-            theta = 0.0
-        else:
-            logging.info(f"symbol: {position.symbol}, greeks do not calculate")
-
-        fx_risk = ReadPositionFxRiskResponse.PositionFxRisk(
-            symbol=position.symbol,
-            instrument=position.instrument,
-            base_currency=base_currency,
-            quote_currency=quote_currency,
-            account_name=position.account_name,
-            side=position.side,
-            token_amount=position.token_amount,
-            delta=delta,
-            gamma=gamma,
-            vega=vega,
-            theta=theta,
-        )
+    return StreamingResponse(
+        _iterate_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        # Add to the positions_fx_risk dictionary with the symbol as the key
-        positions_fx_risk.append(fx_risk)
 
-    # Return the response with the calculated positions_fx_risk
-    return ResponseSchema[ReadPositionFxRiskResponse](
-        status=StatusEnum.SUCCESS,
-        data=ReadPositionFxRiskResponse(positions_fx_risk=positions_fx_risk),
-    )
+class ValueAtRiskRequest(OKXPositionRequest):
+    method: ValueAtRiskMethodEnum = ValueAtRiskMethodEnum.HISTORICAL
+    confidence_level: float = Field(default=0.99, gt=0.5, lt=1.0)
+    horizon_days: int = Field(default=1, ge=1, le=30)
+    lookback_days: int = Field(default=250, ge=30, le=300)
+    scenario_count: int = Field(default=10000, ge=100, le=100000)
+    seed: Optional[int] = None
 
 
-@router.post("/irrisk")
-async def post_okx_ir_risk(
-    selected_okx_accounts: OKXPositionRequest,
-    chore_master_api_db: MongoDB = Depends(get_chore_master_api_db),
-    current_end_user: dict = Depends(get_current_end_user),
+@router.post("/var", dependencies=[Depends(require_freemium_role)])
+async def post_okx_value_at_risk(
+    value_at_risk_request: ValueAtRiskRequest,
+    chore_master_api_db: AsyncMongoDB = Depends(get_chore_master_api_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
-    Sample request body:
+    Historical or Monte-Carlo VaR and expected shortfall of the selected accounts
+    in USDT, with spot, future and perpetual positions mapped to their base
+    currency exposure. Sample request body:
     ```
     {
-        "selected_okx_account_names": ["okx-data-01"]
+        "selected_okx_account_names": ["okx-data-01"],
+        "method": "historical",
+        "confidence_level": 0.99,
+        "horizon_days": 1
     }
     ```
 
     """
-    positions_response = await post_okx_positions(
-        selected_okx_accounts, chore_master_api_db, current_end_user
+    numeraire_currency = "USDT"
+    positions = await find_okx_positions(
+        chore_master_api_db,
+        current_user.reference,
+        value_at_risk_request.selected_okx_account_names,
     )
-    positions = positions_response.data.positions
-
-    # Initialize positions_fx_risk dictionary
-    positions_ir_risk = []
-    # Iterate over each position and calculate the FX risk metrics
+    currency_to_exposure_map: dict[str, float] = defaultdict(float)
+    unpriced_symbols = []
     for position in positions:
-        exchange = ccxt.okx(
-            {
-                "enableRateLimit": True,
-                # "sandbox": False if okx_account["env"] == "MAINNET" else True,
-            }
-        )
-        if position.instrument != "spot":
+        sign = +1 if position.side == "long" else -1
+        if position.instrument == "spot":
+            currency = position.symbol
+            if currency in STABLE_CURRENCIES:
+                continue
+            try:
+                ticker = await fetch_okx_ticker(f"{currency}/{numeraire_currency}")
+            except Exception:
+                unpriced_symbols.append(position.symbol)
+                continue
+            currency_to_exposure_map[currency] += (
+                sign * position.token_amount * ticker["last"]
+            )
+        elif position.instrument in ("future", "perpetual"):
             base_currency, quote_currency = await get_currencies_by_symbol(
-                position.symbol, exchange
+                position.symbol
             )
-        else:
-            base_currency = position.symbol
-            quote_currency = "USDT"
-
-        # DV01 and Rho change interest rate by 1 percentage point
-        change_in_interest_rate = 0.01
-
-        dvo1 = 0.0
-        rho = 0.0
-
-        if position.instrument == "spot":
-            dvo1 = 0.0
-            rho = 0.0
-
-        elif position.instrument == "future":
-            market_info = await get_okx_market_info_by_symbol(position.symbol, exchange)
-            maturity_time = datetime.strptime(
-                market_info["expiryDatetime"], "%Y-%m-%dT%H:%M:%S.%fZ"
+            if quote_currency not in STABLE_CURRENCIES or position.mark_price is None:
+                unpriced_symbols.append(position.symbol)
+                continue
+            currency_to_exposure_map[base_currency] += (
+                sign * position.token_amount * position.mark_price
             )
-            current_time = datetime.utcnow()
-            days_to_maturity = float((maturity_time - current_time).days)
-            if days_to_maturity < 1:
-                seconds_to_maturity = (maturity_time - current_time).seconds
-                days_to_maturity = seconds_to_maturity / (24 * 60 * 60)
-            time_to_maturity = days_to_maturity / 365
-            if days_to_maturity <= 1.0:
-                dvo1 = 0.0
-            else:
-                # get the spot price from the order book
-                spot_symbol = base_currency + "/" + quote_currency
-                spot_price = await exchange.fetch_ticker(spot_symbol)
-                implied_term_rate = (
-                    (position.mark_price - spot_price["last"])
-                    / spot_price["last"]
-                    / time_to_maturity
-                )
-                term_price_today = spot_price["last"] * (
-                    1 + implied_term_rate * time_to_maturity
-                )
-                term_price_after_change_in_interest_rate = spot_price["last"] * (
-                    1 + (implied_term_rate + change_in_interest_rate) * time_to_maturity
+        else:
+            # options need a pricing model rather than a linear exposure
+            unpriced_symbols.append(position.symbol)
+
+    if len(currency_to_exposure_map) == 0:
+        raise BadRequestError("No position has a price history")
+    return_matrix = await load_return_matrix(
+        list(currency_to_exposure_map.keys()),
+        lookback_days=value_at_risk_request.lookback_days,
+    )
+    unpriced_symbols.extend(
+        currency
+        for currency in currency_to_exposure_map
+        if currency not in return_matrix.currencies
+    )
+    exposures = np.array(
+        [currency_to_exposure_map[currency] for currency in return_matrix.currencies],
+        dtype=np.float64,
+    )
+    if len(return_matrix.currencies) == 0:
+        raise BadRequestError("No position has a price history")
+    # the return matrix only keeps the days every currency has a close, and fewer
+    # than 2 of them give NaN statistics to either method
+    if len(return_matrix.log_returns) < 2:
+        raise BadRequestError("Price history is too short for the selected positions")
+    if value_at_risk_request.method == ValueAtRiskMethodEnum.HISTORICAL:
+        scenario_log_returns = get_horizon_log_returns(
+            return_matrix.log_returns, value_at_risk_request.horizon_days
+        )
+    else:
+        scenario_log_returns = simulate_log_returns(
+            return_matrix.log_returns,
+            scenario_count=value_at_risk_request.scenario_count,
+            horizon_days=value_at_risk_request.horizon_days,
+            seed=value_at_risk_request.seed,
+        )
+    if len(scenario_log_returns) < 2:
+        raise BadRequestError("Price history is too short for the horizon")
+    value_at_risk_result = compute_value_at_risk(
+        scenario_log_returns, exposures, value_at_risk_request.confidence_level
+    )
+    return ResponseSchema[ReadValueAtRiskResponse](
+        status=StatusEnum.SUCCESS,
+        data=ReadValueAtRiskResponse(
+            method=value_at_risk_request.method,
+            numeraire_currency=numeraire_currency,
+            confidence_level=value_at_risk_request.confidence_level,
+            horizon_days=value_at_risk_request.horizon_days,
+            scenario_count=value_at_risk_result.scenario_count,
+            value_at_risk=value_at_risk_result.value_at_risk,
+            expected_shortfall=value_at_risk_result.expected_shortfall,
+            exposures=[
+                ReadValueAtRiskResponse.CurrencyExposure(
+                    currency=currency,
+                    exposure=exposure,
+                    expected_shortfall_contribution=expected_shortfall_contribution,
                 )
-                dvo1 = (
-                    (term_price_after_change_in_interest_rate - term_price_today)
-                    * position.token_amount
-                    * (+1 if position.side == "long" else -1)
+                for currency, exposure, expected_shortfall_contribution in zip(
+                    return_matrix.currencies,
+                    exposures.tolist(),
+                    value_at_risk_result.expected_shortfall_contributions.tolist(),
                 )
-            rho = 0.0
+            ],
+            unpriced_symbols=unpriced_symbols,
+        ),
+    )
 
-        elif position.instrument == "option":
-            market_info = await get_okx_market_info_by_symbol(position.symbol, exchange)
-            if quote_currency == "USD":
-                spot_symbol = base_currency + "/" + quote_currency + "T"
-            spot_price = await exchange.fetch_ticker(spot_symbol)
-            option_type = "put" if market_info["id"][-1:] == "P" else "call"
-            maturity_time = datetime.strptime(
-                market_info["expiryDatetime"], "%Y-%m-%dT%H:%M:%S.%fZ"
-            )
-            strike_price = float(Decimal(market_info["strike"]))
-            # Days to maturity
-            current_time = datetime.now()
-            days_to_maturity = float((maturity_time - current_time).days)
-            if days_to_maturity < 1:
-                seconds_to_maturity = (maturity_time - current_time).seconds
-                days_to_maturity = seconds_to_maturity / (24 * 60 * 60)
-            time_to_maturity = days_to_maturity / 365
-
-            # Implied volatility
-            option_ticker = await exchange.fetch_ticker(position.symbol)
-            option_price = option_ticker["last"]
-            implied_term_rate = 0  # TODO: build yield curve
-            sigma = 0.1  # TODO: find_implied_volatility
-
-            rho = 0.1
-            dvo1 = 0.0
-        elif position.instrument == "perpetual":
-            dvo1 = 0.0
-            rho = 0.0
-        else:
-            logging.info(f"symbol: {position.symbol}, greeks do not calculate")
-
-        # generate position by expression
-        ir_risk = ReadPositionIrRiskResponse.PositionIrRisk(
-            symbol=position.symbol,
-            instrument=position.instrument,
-            base_currency=base_currency,
-            quote_currency=quote_currency,
-            account_name=position.account_name,
-            side=position.side,
-            token_amount=position.token_amount,
-            dv01=dvo1,
-            rho=rho,
-        )
-        positions_ir_risk.append(ir_risk)
 
-    return ResponseSchema[ReadPositionIrRiskResponse](
-        status=StatusEnum.SUCCESS,
-        data=ReadPositionIrRiskResponse(positions_ir_risk=positions_ir_risk),
+async def get_spot_price(currency: str) -> Optional[float]:
+    if currency in STABLE_CURRENCIES:
+        return 1.0
+    try:
+        ticker = await fetch_okx_ticker(f"{currency}/USDT")
+    except Exception:
+        return None
+    return ticker["last"]
+
+
+class ScenarioGridRequest(OKXPositionRequest):
+    spot_shocks: list[float] = Field(
+        default=[-0.3, -0.2, -0.1, -0.05, 0.0, 0.05, 0.1, 0.2, 0.3],
+        min_length=1,
+        max_length=101,
+    )
+    volatility_shocks: list[float] = Field(
+        default=[-0.2, -0.1, 0.0, 0.1, 0.2], min_length=1, max_length=21
+    )
+    rate_shocks: list[float] = Field(
+        default=[-0.02, -0.01, 0.0, 0.01, 0.02], min_length=1, max_length=21
     )
 
 
-@router.post("/risk_summary")
-async def post_okx_alert(
-    selected_okx_accounts: OKXPositionRequest,
-    chore_master_api_db: MongoDB = Depends(get_chore_master_api_db),
-    current_end_user: dict = Depends(get_current_end_user),
+@router.post("/scenarios", dependencies=[Depends(require_freemium_role)])
+async def post_okx_scenarios(
+    scenario_grid_request: ScenarioGridRequest,
+    chore_master_api_db: AsyncMongoDB = Depends(get_chore_master_api_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
-    Sample request body:
+    P&L surface of the selected accounts, in USDT, from fully revaluing every
+    position on the grid of spot x volatility x rate shocks. Spot shocks are
+    relative, volatility and rate shocks are absolute. Sample request body:
     ```
     {
-        "selected_okx_account_names": ["okx-data-01"]
+        "selected_okx_account_names": ["okx-data-01"],
+        "spot_shocks": [-0.1, 0.0, 0.1]
     }
     ```
 
     """
-    # Risk metrics numeraire currency
-    numeraire_currency = "USDT"
-
-    # call the fx risk and ir risk function
-    fx_risk_response = await post_okx_fx_risk(
-        selected_okx_accounts, chore_master_api_db, current_end_user
-    )
-    ir_risk_response = await post_okx_ir_risk(
-        selected_okx_accounts, chore_master_api_db, current_end_user
-    )
-
-    # Aggregate the FX and IR risk metrics by symbol
-    aggregated_delta = 0.0
-    aggregated_vega = 0.0
-    aggregated_gamma = 0.0
-    aggregated_theta = 0.0
-    aggregated_dv01 = 0.0
-    aggregated_rho = 0.0
-
-    exchange_rate_map = defaultdict(dict)
-
-    exchange = ccxt.okx(
-        {
-            "enableRateLimit": True,
-            # "sandbox": False if okx_account["env"] == "MAINNET" else True,
-        }
+    positions = await find_okx_positions(
+        chore_master_api_db,
+        current_user.reference,
+        scenario_grid_request.selected_okx_account_names,
     )
+    now_milliseconds = time.time() * 1000
+    position_dicts = []
+    option_position_dicts = []
+    unpriced_symbols = []
+    if any(position.instrument in ("future", "option") for position in positions):
+        term_structure_curve_map = await load_term_structure_curves()
+    else:
+        term_structure_curve_map = {}
+    for position in positions:
+        sign = +1 if position.side == "long" else -1
+        quantity = sign * position.token_amount
+        if position.instrument == "spot":
+            if position.symbol in STABLE_CURRENCIES:
+                continue
+            spot_price = await get_spot_price(position.symbol)
+            if spot_price is None:
+                unpriced_symbols.append(position.symbol)
+                continue
+            position_dicts.append(
+                {
+                    "kind": ScenarioPositionKindEnum.LINEAR,
+                    "quantity": quantity,
+                    "underlying_price": spot_price,
+                }
+            )
+            continue
 
-    for fx_risk in fx_risk_response.data.positions_fx_risk:
-        if fx_risk.quote_currency == numeraire_currency:
-            aggregated_delta += fx_risk.delta
-            aggregated_vega += fx_risk.vega
-            aggregated_gamma += fx_risk.gamma
-            aggregated_theta += fx_risk.theta
-        else:
-            query_symbol = (
-                fx_risk.quote_currency + "T" + "/" + numeraire_currency
-                if fx_risk.quote_currency == "USD"
-                else fx_risk.quote_currency + "/" + numeraire_currency
+        market_info = await get_okx_market_info_by_symbol(position.symbol)
+        term_structure_curve = term_structure_curve_map.get(
+            (market_info["base"], market_info["quote"])
+        )
+        # the curve is priced against the same spot, so a ticker is only fetched
+        # for underlyings without listed futures
+        spot_price = (
+            term_structure_curve.spot_price
+            if term_structure_curve is not None
+            else await get_spot_price(market_info["base"])
+        )
+        if (
+            market_info["quote"] not in STABLE_CURRENCIES
+            or spot_price is None
+            or position.mark_price is None
+        ):
+            unpriced_symbols.append(position.symbol)
+            continue
+        time_to_maturity = (
+            max(market_info["expiry"] - now_milliseconds, 0.0)
+            / (365 * 24 * 60 * 60 * 1000)
+            if market_info.get("expiry") is not None
+            else 0.0
+        )
+        if position.instrument == "perpetual":
+            position_dicts.append(
+                {
+                    "kind": ScenarioPositionKindEnum.LINEAR,
+                    "quantity": quantity,
+                    "underlying_price": position.mark_price,
+                }
             )
-            if query_symbol in exchange_rate_map:
-                exchange_rate = exchange_rate_map[query_symbol]
-                aggregated_delta += fx_risk.delta * exchange_rate
-                aggregated_vega += fx_risk.vega * exchange_rate
-                aggregated_gamma += fx_risk.gamma * exchange_rate
-                aggregated_theta += fx_risk.theta * exchange_rate
-            else:
-                inverse_query_symbol = (
-                    numeraire_currency + "/" + fx_risk.quote_currency + "T"
-                    if fx_risk.quote_currency == "USD"
-                    else numeraire_currency + "/" + fx_risk.quote_currency
-                )
-                try:
-                    exchange_rate = (
-                        (await exchange.fetch_ticker(query_symbol))["last"]
-                        if query_symbol.split("/")[0] != query_symbol.split("/")[1]
-                        else 1
-                    )
-                    exchange_rate_map[query_symbol] = exchange_rate
-                    aggregated_delta += fx_risk.delta * exchange_rate
-                    aggregated_vega += fx_risk.vega * exchange_rate
-                    aggregated_gamma += fx_risk.gamma * exchange_rate
-                    aggregated_theta += fx_risk.theta * exchange_rate
-                except:
-                    try:
-                        exchange_rate = 1 / (
-                            (await exchange.fetch_ticker(inverse_query_symbol))["last"]
-                            if inverse_query_symbol.split("/")[0]
-                            else 1
-                        )
-                        exchange_rate_map[query_symbol] = exchange_rate
-                        aggregated_delta += fx_risk.delta * exchange_rate
-                        aggregated_vega += fx_risk.vega * exchange_rate
-                        aggregated_gamma += fx_risk.gamma * exchange_rate
-                        aggregated_theta += fx_risk.theta * exchange_rate
-                    except:
-                        logging.info(
-                            f"symbol: {fx_risk.symbol}, exchange rate not found"
-                        )
-
-    for ir_risk in ir_risk_response.data.positions_ir_risk:
-        if ir_risk.quote_currency == numeraire_currency:
-            aggregated_dv01 += ir_risk.dv01
-            aggregated_rho += ir_risk.rho
-        else:
-            query_symbol = (
-                ir_risk.quote_currency + "T" + "/" + numeraire_currency
-                if ir_risk.quote_currency == "USD"
-                else ir_risk.quote_currency + "/" + numeraire_currency
+        elif position.instrument == "future":
+            position_dicts.append(
+                {
+                    "kind": ScenarioPositionKindEnum.FUTURE,
+                    "quantity": quantity,
+                    "underlying_price": spot_price,
+                    # the same simple rate convention as the ir risk
+                    "rate": (
+                        (position.mark_price - spot_price)
+                        / spot_price
+                        / time_to_maturity
+                        if time_to_maturity > 0
+                        else 0.0
+                    ),
+                    "time_to_maturity": time_to_maturity,
+                }
             )
-            if query_symbol in exchange_rate_map:
-                exchange_rate = exchange_rate_map[query_symbol]
-                aggregated_dv01 += ir_risk.dv01 * exchange_rate
-                aggregated_rho += ir_risk.rho * exchange_rate
-            else:
-                inverse_query_symbol = (
-                    numeraire_currency + "/" + ir_risk.quote_currency + "T"
-                    if ir_risk.quote_currency == "USD"
-                    else numeraire_currency + "/" + ir_risk.quote_currency
-                )
-                try:
-                    exchange_rate = (
-                        (await exchange.fetch_ticker(query_symbol))["last"]
-                        if query_symbol.split("/")[0] != query_symbol.split("/")[1]
-                        else 1
+        elif position.instrument == "option":
+            rate = (
+                float(
+                    to_continuous_rates(
+                        interpolate_rates(term_structure_curve, time_to_maturity),
+                        time_to_maturity,
                     )
-                    exchange_rate_map[query_symbol] = exchange_rate
-                    aggregated_dv01 += ir_risk.dv01 * exchange_rate
-                    aggregated_rho += ir_risk.rho * exchange_rate
-                except:
-                    try:
-                        exchange_rate = 1 / (
-                            (await exchange.fetch_ticker(inverse_query_symbol))["last"]
-                            if inverse_query_symbol.split("/")[0]
-                            != inverse_query_symbol.split("/")[1]
-                            else 1
-                        )
-                        exchange_rate_map[query_symbol] = exchange_rate
-                        aggregated_dv01 += ir_risk.dv01 * exchange_rate
-                        aggregated_rho += ir_risk.rho * exchange_rate
-                    except:
-                        logging.info(
-                            f"symbol: {ir_risk.symbol}, exchange rate not found"
-                        )
-
-    position_risk_summary = ReadPositionRiskSummaryResponse.PositionRiskSummary(
-        aggregated_dv01=aggregated_dv01,
-        aggregated_gamma=aggregated_gamma,
-        aggregated_theta=aggregated_theta,
-        aggregated_vega=aggregated_vega,
-        aggregated_rho=aggregated_rho,
-        aggregated_delta=aggregated_delta,
-        numeraire_currency=numeraire_currency,
+                )
+                if term_structure_curve is not None
+                else 0.0
+            )
+            # coin margined options are quoted in the base currency
+            option_price = (
+                position.mark_price * spot_price
+                if market_info.get("settle") == market_info["base"]
+                else position.mark_price
+            )
+            option_position_dicts.append(
+                {
+                    "kind": ScenarioPositionKindEnum.OPTION,
+                    "quantity": quantity,
+                    "underlying_price": spot_price,
+                    "rate": rate,
+                    "time_to_maturity": time_to_maturity,
+                    "strike": float(market_info["strike"]),
+                    "is_call": market_info.get("optionType") == "call",
+                    "option_price": option_price,
+                }
+            )
+        else:
+            unpriced_symbols.append(position.symbol)
+
+    if len(option_position_dicts) > 0:
+        volatilities = implied_volatility(
+            np.array([d["is_call"] for d in option_position_dicts]),
+            np.array([d["option_price"] for d in option_position_dicts]),
+            np.array([d["underlying_price"] for d in option_position_dicts]),
+            np.array([d["strike"] for d in option_position_dicts]),
+            np.array([d["time_to_maturity"] for d in option_position_dicts]),
+            np.array([d["rate"] for d in option_position_dicts]),
+        )
+        for option_position_dict, volatility in zip(
+            option_position_dicts, volatilities.tolist()
+        ):
+            option_position_dict["volatility"] = volatility
+            position_dicts.append(option_position_dict)
+
+    profit_and_losses = evaluate_scenario_grid(
+        create_scenario_position_book(position_dicts),
+        spot_shocks=scenario_grid_request.spot_shocks,
+        volatility_shocks=scenario_grid_request.volatility_shocks,
+        rate_shocks=scenario_grid_request.rate_shocks,
+    )
+    worst_spot_idx, worst_volatility_idx, worst_rate_idx = np.unravel_index(
+        np.argmin(profit_and_losses), profit_and_losses.shape
+    )
+    return ResponseSchema[ReadScenarioGridResponse](
+        status=StatusEnum.SUCCESS,
+        data=ReadScenarioGridResponse(
+            numeraire_currency="USDT",
+            spot_shocks=scenario_grid_request.spot_shocks,
+            volatility_shocks=scenario_grid_request.volatility_shocks,
+            rate_shocks=scenario_grid_request.rate_shocks,
+            profit_and_losses=profit_and_losses.tolist(),
+            worst_profit_and_loss=float(profit_and_losses.min()),
+            worst_spot_shock=scenario_grid_request.spot_shocks[worst_spot_idx],
+            worst_volatility_shock=scenario_grid_request.volatility_shocks[
+                worst_volatility_idx
+            ],
+            worst_rate_shock=scenario_grid_request.rate_shocks[worst_rate_idx],
+            unpriced_symbols=unpriced_symbols,
+        ),
     )
 
-    return ResponseSchema[ReadPositionRiskSummaryResponse](
+
+@router.get("/snapshots", dependencies=[Depends(require_freemium_role)])
+async def get_okx_risk_snapshots(
+    start_time: datetime,
+    end_time: datetime,
+    max_point_count: Annotated[int, Query(ge=1, le=5000)] = 500,
+    risk_uow: RiskSQLAlchemyUnitOfWork = Depends(get_risk_uow),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Time series of the stored aggregated risks within `[start_time, end_time)`,
+    downsampled to at most `max_point_count` points for charting.
+    """
+    # snapshots are stored in naive UTC
+    start_time, end_time = [
+        t.astimezone(timezone.utc).replace(tzinfo=None) if t.tzinfo else t
+        for t in [start_time, end_time]
+    ]
+    if start_time >= end_time:
+        raise BadRequestError("`start_time` must be before `end_time`")
+    async with risk_uow:
+        risk_snapshot_series = await find_risk_snapshot_series(
+            user_reference=current_user.reference,
+            start_time=start_time,
+            end_time=end_time,
+            max_point_count=max_point_count,
+            risk_uow=risk_uow,
+        )
+    return ResponseSchema[ReadRiskSnapshotSeriesResponse](
         status=StatusEnum.SUCCESS,
-        data=ReadPositionRiskSummaryResponse(positions_risk=position_risk_summary),
+        data=ReadRiskSnapshotSeriesResponse(
+            numeraire_currency="USDT",
+            snapshot_count=risk_snapshot_series.snapshot_count,
+            snapshotted_times=risk_snapshot_series.snapshotted_times,
+            **{
+                key: risk_snapshot_series.aggregated_risks_map[key]
+                for key in AGGREGATED_RISK_KEYS
+            },
+        ),
     )
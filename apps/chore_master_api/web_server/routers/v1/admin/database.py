@@ -1,12 +1,11 @@
-import os
-import shutil
-import tempfile
+import time
+from datetime import datetime
 from typing import Annotated, Optional
 
 import alembic
-from fastapi import APIRouter, Depends, Path, UploadFile
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Path, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import registry
 
 from apps.chore_master_api.web_server.dependencies.auth import require_admin_role
@@ -17,15 +16,20 @@ from apps.chore_master_api.web_server.dependencies.database import (
     get_schema_migration,
 )
 from modules.database.relational_database import (
+    DataFileFormatEnum,
     DataMigration,
     RelationalDatabase,
     SchemaMigration,
+    SchemaMigrationJobStatusEnum,
 )
 from modules.web_server.exceptions import BadRequestError, NotFoundError
 from modules.web_server.schemas.response import ResponseSchema, StatusEnum
 
 router = APIRouter()
 
+DATA_MIGRATION_MAX_WORKERS = 8
+DATA_MIGRATION_PROGRESS_INTERVAL_SECONDS = 10.0
+
 
 class ReadDatabaseConnectionResponse(BaseModel):
     all_revisions: list[dict]
@@ -37,6 +41,15 @@ class ReadDatabaseConnectionResponse(BaseModel):
 #     relational_database_schema_name: Optional[str] = None
 
 
+class ReadDatabaseMigrationJobResponse(BaseModel):
+    reference: str
+    command_name: str
+    status: SchemaMigrationJobStatusEnum
+    error_message: Optional[str]
+    created_time: datetime
+    finished_time: Optional[datetime]
+
+
 class ReadDatabaseSchemaResponse(BaseModel):
     class _Table(BaseModel):
         class _Column(BaseModel):
@@ -52,6 +65,8 @@ class ReadDatabaseSchemaResponse(BaseModel):
 
 class PostDatabaseTablesDataExportFilesRequest(BaseModel):
     table_name_to_selected_column_names: dict[str, list[str]]
+    file_format: DataFileFormatEnum = DataFileFormatEnum.CSV
+    max_workers: int = Field(default=1, ge=1, le=DATA_MIGRATION_MAX_WORKERS)
 
 
 @router.post("/database/reset", dependencies=[Depends(require_admin_role)])
@@ -70,11 +85,11 @@ async def get_database_migrations_revisions(
     chore_master_db_registry: registry = Depends(get_chore_master_db_registry),
     schema_migration: SchemaMigration = Depends(get_schema_migration),
 ):
-    all_revisions = schema_migration.all_revisions(
-        metadata=chore_master_db_registry.metadata
+    all_revisions = await schema_migration.run_in_executor(
+        schema_migration.all_revisions, metadata=chore_master_db_registry.metadata
     )
-    applied_revision = schema_migration.applied_revision(
-        metadata=chore_master_db_registry.metadata
+    applied_revision = await schema_migration.run_in_executor(
+        schema_migration.applied_revision, metadata=chore_master_db_registry.metadata
     )
     return ResponseSchema[ReadDatabaseConnectionResponse](
         status=StatusEnum.SUCCESS,
@@ -94,7 +109,10 @@ async def post_database_migrations_generate_revision(
     schema_migration: SchemaMigration = Depends(get_schema_migration),
 ):
     try:
-        schema_migration.generate_revision(metadata=chore_master_db_registry.metadata)
+        await schema_migration.run_in_executor(
+            schema_migration.generate_revision,
+            metadata=chore_master_db_registry.metadata,
+        )
     except alembic.util.exc.CommandError as e:
         raise BadRequestError(str(e))
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
@@ -102,11 +120,23 @@ async def post_database_migrations_generate_revision(
 
 @router.post("/database/migrations/upgrade", dependencies=[Depends(require_admin_role)])
 async def post_database_migrations_upgrade(
+    is_background: Annotated[bool, Query()] = False,
     chore_master_db_registry: registry = Depends(get_chore_master_db_registry),
     schema_migration: SchemaMigration = Depends(get_schema_migration),
 ):
+    if is_background:
+        job = schema_migration.submit_job(
+            "upgrade",
+            schema_migration.upgrade,
+            metadata=chore_master_db_registry.metadata,
+        )
+        return ResponseSchema[ReadDatabaseMigrationJobResponse](
+            status=StatusEnum.SUCCESS, data=job.to_dict()
+        )
     try:
-        schema_migration.upgrade(metadata=chore_master_db_registry.metadata)
+        await schema_migration.run_in_executor(
+            schema_migration.upgrade, metadata=chore_master_db_registry.metadata
+        )
     except alembic.util.exc.CommandError as e:
         raise BadRequestError(str(e))
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
@@ -116,16 +146,44 @@ async def post_database_migrations_upgrade(
     "/database/migrations/downgrade", dependencies=[Depends(require_admin_role)]
 )
 async def post_database_migrations_downgrade(
+    is_background: Annotated[bool, Query()] = False,
     chore_master_db_registry: registry = Depends(get_chore_master_db_registry),
     schema_migration: SchemaMigration = Depends(get_schema_migration),
 ):
+    if is_background:
+        job = schema_migration.submit_job(
+            "downgrade",
+            schema_migration.downgrade,
+            metadata=chore_master_db_registry.metadata,
+        )
+        return ResponseSchema[ReadDatabaseMigrationJobResponse](
+            status=StatusEnum.SUCCESS, data=job.to_dict()
+        )
     try:
-        schema_migration.downgrade(metadata=chore_master_db_registry.metadata)
+        await schema_migration.run_in_executor(
+            schema_migration.downgrade, metadata=chore_master_db_registry.metadata
+        )
     except alembic.util.exc.CommandError as e:
         raise BadRequestError(str(e))
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
+@router.get(
+    "/database/migrations/jobs/{job_reference}",
+    dependencies=[Depends(require_admin_role)],
+)
+async def get_database_migrations_job(
+    job_reference: Annotated[str, Path()],
+    schema_migration: SchemaMigration = Depends(get_schema_migration),
+):
+    job = schema_migration.get_job(job_reference)
+    if job is None:
+        raise NotFoundError(f"job `{job_reference}` is not found")
+    return ResponseSchema[ReadDatabaseMigrationJobResponse](
+        status=StatusEnum.SUCCESS, data=job.to_dict()
+    )
+
+
 @router.get(
     "/database/migrations/{revision}", dependencies=[Depends(require_admin_role)]
 )
@@ -134,8 +192,8 @@ async def get_database_migrations_revision(
     chore_master_db_registry: registry = Depends(get_chore_master_db_registry),
     end_user_db_migration: SchemaMigration = Depends(get_schema_migration),
 ):
-    all_revisions = end_user_db_migration.all_revisions(
-        metadata=chore_master_db_registry.metadata
+    all_revisions = await end_user_db_migration.run_in_executor(
+        end_user_db_migration.all_revisions, metadata=chore_master_db_registry.metadata
     )
     script_path = next(
         (rev["path"] for rev in all_revisions if rev["revision"] == revision), None
@@ -157,15 +215,13 @@ async def delete_database_migrations_revision(
     chore_master_db_registry: registry = Depends(get_chore_master_db_registry),
     end_user_db_migration: SchemaMigration = Depends(get_schema_migration),
 ):
-    all_revisions = end_user_db_migration.all_revisions(
-        metadata=chore_master_db_registry.metadata
-    )
-    script_path = next(
-        (rev["path"] for rev in all_revisions if rev["revision"] == revision), None
+    is_deleted = await end_user_db_migration.run_in_executor(
+        end_user_db_migration.delete_revision,
+        metadata=chore_master_db_registry.metadata,
+        revision=revision,
     )
-    if script_path is None:
+    if not is_deleted:
         raise NotFoundError(f"revision `{revision}` is not found")
-    os.remove(script_path)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
@@ -207,20 +263,19 @@ async def post_database_tables_data_export_files(
     data_migration: DataMigration = Depends(get_data_migration),
 ):
     try:
-        local_directory_path = tempfile.mkdtemp()
-        file_name: str = "download.zip"
-        local_file_path = os.path.join(local_directory_path, file_name)
-        with tempfile.TemporaryDirectory() as temp_directory_path:
-            await data_migration.export_files(
-                table_name_to_selected_column_names=post_database_tables_data_export_files_request.table_name_to_selected_column_names,
-                output_directory_path=temp_directory_path,
-            )
-            shutil.make_archive(
-                local_file_path.replace(".zip", ""), "zip", temp_directory_path
-            )
-        return FileResponse(local_file_path)
+        zip_chunks = data_migration.export_files(
+            table_name_to_selected_column_names=post_database_tables_data_export_files_request.table_name_to_selected_column_names,
+            file_format=post_database_tables_data_export_files_request.file_format,
+            max_workers=post_database_tables_data_export_files_request.max_workers,
+            on_progress=_create_data_migration_progress_printer(),
+        )
     except (ValueError, TypeError) as e:
         raise BadRequestError(str(e))
+    return StreamingResponse(
+        zip_chunks,
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="download.zip"'},
+    )
 
 
 @router.patch(
@@ -229,6 +284,7 @@ async def post_database_tables_data_export_files(
 )
 async def patch_database_tables_data_import_files(
     upload_files: list[UploadFile],
+    max_workers: Annotated[int, Query(ge=1, le=DATA_MIGRATION_MAX_WORKERS)] = 1,
     data_migration: DataMigration = Depends(get_data_migration),
 ):
     try:
@@ -239,8 +295,35 @@ async def patch_database_tables_data_import_files(
                     upload_file.file,
                 )
                 for upload_file in upload_files
-            ]
+            ],
+            max_workers=max_workers,
+            on_progress=_create_data_migration_progress_printer(),
         )
         return ResponseSchema(status=StatusEnum.SUCCESS, data=None)
     except (ValueError, TypeError) as e:
         raise BadRequestError(str(e))
+
+
+def _create_data_migration_progress_printer(
+    interval_seconds: float = DATA_MIGRATION_PROGRESS_INTERVAL_SECONDS,
+):
+    # progress is reported per chunk, so print at most once per interval a table,
+    # but always print the final row count of a table
+    table_name_to_printed_time_map: dict[str, float] = {}
+
+    def _print_data_migration_progress(
+        table_name: str, row_count: int, is_finished: bool
+    ):
+        now = time.monotonic()
+        printed_time = table_name_to_printed_time_map.get(table_name)
+        if (
+            not is_finished
+            and printed_time is not None
+            and now - printed_time < interval_seconds
+        ):
+            return
+        table_name_to_printed_time_map[table_name] = now
+        status = "done" if is_finished else "in progress"
+        print(f"[DataMigration] {table_name}: {row_count} rows, {status}", flush=True)
+
+    return _print_data_migration_progress
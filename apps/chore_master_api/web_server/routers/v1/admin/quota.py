@@ -1,15 +1,7 @@
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, Path
-from sqlalchemy.future import select
-from sqlalchemy.orm import joinedload
-
-from apps.chore_master_api.end_user_space.models.finance import (
-    BalanceSheet,
-    Portfolio,
-    Transaction,
-)
-from apps.chore_master_api.end_user_space.models.trace import Quota
+from fastapi import APIRouter, Depends, Path, Query
+
 from apps.chore_master_api.end_user_space.unit_of_works.finance import (
     FinanceSQLAlchemyUnitOfWork,
 )
@@ -19,14 +11,31 @@ from apps.chore_master_api.end_user_space.unit_of_works.integration import (
 from apps.chore_master_api.end_user_space.unit_of_works.trace import (
     TraceSQLAlchemyUnitOfWork,
 )
-from apps.chore_master_api.web_server.dependencies.auth import require_admin_role
+from apps.chore_master_api.modules.background_job_runner import (
+    BackgroundJobRunner,
+    JobContext,
+)
+from apps.chore_master_api.service_layers.quota import recalculate_used_quota
+from apps.chore_master_api.web_server.dependencies.auth import (
+    get_current_user,
+    require_admin_role,
+)
+from apps.chore_master_api.web_server.dependencies.background_job import (
+    get_background_job_runner,
+)
+from apps.chore_master_api.web_server.dependencies.database import get_chore_master_db
 from apps.chore_master_api.web_server.dependencies.unit_of_work import (
     get_finance_uow,
     get_integration_uow,
     get_trace_uow,
 )
+from apps.chore_master_api.web_server.schemas.dto import CurrentUser
 from apps.chore_master_api.web_server.schemas.request import BaseUpdateEntityRequest
-from apps.chore_master_api.web_server.schemas.response import BaseQueryEntityResponse
+from apps.chore_master_api.web_server.schemas.response import (
+    BaseQueryEntityResponse,
+    ReadJobResponse,
+)
+from modules.database.relational_database import RelationalDatabase
 from modules.web_server.schemas.response import ResponseSchema, StatusEnum
 
 router = APIRouter()
@@ -82,84 +91,38 @@ async def patch_quotas_quota_reference(
 )
 async def patch_users_user_reference_quotas_recalculate(
     user_reference: Annotated[str, Path()],
+    is_background: Annotated[bool, Query()] = False,
+    current_user: CurrentUser = Depends(get_current_user),
+    chore_master_db: RelationalDatabase = Depends(get_chore_master_db),
     trace_uow: TraceSQLAlchemyUnitOfWork = Depends(get_trace_uow),
     integration_uow: IntegrationSQLAlchemyUnitOfWork = Depends(get_integration_uow),
     finance_uow: FinanceSQLAlchemyUnitOfWork = Depends(get_finance_uow),
+    background_job_runner: BackgroundJobRunner = Depends(get_background_job_runner),
 ):
-    async with trace_uow, integration_uow, finance_uow:
-        quotas = await trace_uow.quota_repository.find_many(
-            filter={"user_reference": user_reference},
-        )
-
-        used = 0
-
-        operators_count = await integration_uow.operator_repository.count(
-            filter={"user_reference": user_reference},
-        )
-        used += operators_count
-
-        accounts_count = await finance_uow.account_repository.count(
-            filter={"user_reference": user_reference},
-        )
-        used += accounts_count
-
-        assets_count = await finance_uow.asset_repository.count(
-            filter={"user_reference": user_reference},
-        )
-        used += assets_count
-
-        statement = (
-            select(BalanceSheet)
-            .where(
-                BalanceSheet.user_reference == user_reference,
+    if is_background:
+
+        async def _recalculate_used_quota(job_context: JobContext) -> dict:
+            used = await recalculate_used_quota(
+                user_reference=user_reference,
+                trace_uow=TraceSQLAlchemyUnitOfWork(chore_master_db),
+                integration_uow=IntegrationSQLAlchemyUnitOfWork(chore_master_db),
+                finance_uow=FinanceSQLAlchemyUnitOfWork(chore_master_db),
+                report_progress=job_context.report_progress,
             )
-            .options(
-                joinedload(BalanceSheet.balance_entries),
-            )
-        )
-        result = await finance_uow.session.execute(statement)
-        balance_sheets = result.scalars().unique().all()
-        used += len(balance_sheets)
-        for balance_sheet in balance_sheets:
-            used += len(balance_sheet.balance_entries)
-
-        portfolios_count = await finance_uow.portfolio_repository.count(
-            filter={"user_reference": user_reference},
-        )
-        used += portfolios_count
+            return {"user_reference": user_reference, "used": used}
 
-        statement = (
-            select(Transaction)
-            .join(Portfolio, Transaction.portfolio_reference == Portfolio.reference)
-            .where(
-                Portfolio.user_reference == user_reference,
-            )
-            .options(
-                joinedload(Transaction.transfers),
-            )
+        # owned by the requesting admin, who polls it
+        job_dict = await background_job_runner.submit(
+            user_reference=current_user.reference,
+            name="recalculate_used_quota",
+            func=_recalculate_used_quota,
         )
-        result = await finance_uow.session.execute(statement)
-        transactions = result.scalars().unique().all()
-        used += len(transactions)
-        for transaction in transactions:
-            used += len(transaction.transfers)
-
-        if len(quotas) == 0:
-            await trace_uow.quota_repository.insert_one(
-                Quota(
-                    user_reference=user_reference,
-                    used=used,
-                    limit=0,
-                )
-            )
-        else:
-            quota = quotas[0]
-            await trace_uow.quota_repository.update_many(
-                filter={
-                    "reference": quota.reference,
-                    "user_reference": user_reference,
-                },
-                values={"used": used},
-            )
-        await trace_uow.commit()
+        return ResponseSchema[ReadJobResponse](status=StatusEnum.SUCCESS, data=job_dict)
+
+    await recalculate_used_quota(
+        user_reference=user_reference,
+        trace_uow=trace_uow,
+        integration_uow=integration_uow,
+        finance_uow=finance_uow,
+    )
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
@@ -10,6 +10,9 @@ from apps.chore_master_api.end_user_space.models.finance import Account
 from apps.chore_master_api.end_user_space.unit_of_works.finance import (
     FinanceSQLAlchemyUnitOfWork,
 )
+from apps.chore_master_api.service_layers.portfolio import (
+    invalidate_portfolio_performances,
+)
 from apps.chore_master_api.web_server.dependencies.auth import (
     get_current_user,
     require_freemium_role,
@@ -147,6 +150,7 @@ async def patch_users_me_accounts_account_reference(
             },
         )
         await uow.commit()
+        invalidate_portfolio_performances(user_reference=current_user.reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
@@ -170,4 +174,5 @@ async def delete_users_me_accounts_account_reference(
         )
         used_quota_counter.decrease(1)
         await uow.commit()
+        invalidate_portfolio_performances(user_reference=current_user.reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
@@ -14,6 +14,9 @@ from apps.chore_master_api.end_user_space.models.finance import (
 from apps.chore_master_api.end_user_space.unit_of_works.finance import (
     FinanceSQLAlchemyUnitOfWork,
 )
+from apps.chore_master_api.service_layers.portfolio import (
+    invalidate_portfolio_performances,
+)
 from apps.chore_master_api.web_server.dependencies.auth import (
     get_current_user,
     require_freemium_role,
@@ -34,6 +37,7 @@ from apps.chore_master_api.web_server.schemas.request import (
 from apps.chore_master_api.web_server.schemas.response import BaseQueryEntityResponse
 from modules.utils.string_utils import StringUtils
 from modules.web_server.exceptions import NotFoundError
+from modules.web_server.responses import FastJSONResponse
 from modules.web_server.schemas.response import (
     MetadataSchema,
     ResponseSchema,
@@ -126,6 +130,7 @@ async def post_users_me_balance_sheets(
         used_quota_counter.increase(1)
 
         await uow.commit()
+        invalidate_portfolio_performances(user_reference=current_user.reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
@@ -172,21 +177,19 @@ async def get_users_me_balance_sheets_series(
         statement = select(Account).filter(Account.reference.in_(account_reference_set))
         result = await uow.session.execute(statement)
         accounts = result.scalars().unique().all()
+        # entities are rendered by their own serializers while still loaded
         response_data = {
-            "accounts": [account.model_dump() for account in accounts],
-            "balance_sheets": [
-                balance_sheet.model_dump() for balance_sheet in balance_sheets
-            ],
-            "balance_entries": [
-                balance_entry.model_dump(mode="json")
-                for balance_entry in balance_entries
-            ],
+            "accounts": accounts,
+            "balance_sheets": balance_sheets,
+            "balance_entries": balance_entries,
         }
-    return ResponseSchema[dict](
-        status=StatusEnum.SUCCESS,
-        data=response_data,
-        metadata=metadata,
-    )
+        return FastJSONResponse(
+            ResponseSchema[dict](
+                status=StatusEnum.SUCCESS,
+                data=response_data,
+                metadata=metadata,
+            )
+        )
 
 
 @router.get(
@@ -284,6 +287,7 @@ async def put_users_me_balance_sheets_balance_sheet_reference(
             },
         )
         await uow.commit()
+        invalidate_portfolio_performances(user_reference=current_user.reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
@@ -329,4 +333,5 @@ async def delete_users_me_balance_sheets_balance_sheet_reference(
         used_quota_counter.decrease(balance_sheet_count)
 
         await uow.commit()
+        invalidate_portfolio_performances(user_reference=current_user.reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
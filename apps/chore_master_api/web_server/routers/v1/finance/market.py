@@ -10,7 +10,7 @@
 # from bs4 import BeautifulSoup
 from fastapi import APIRouter, Query
 
-# from apps.chore_master_api.web_server.dependencies.concurrency import get_mutex
+# from apps.chore_master_api.web_server.dependencies.concurrency import require_lock
 # from modules.scraper.cloud_flare_solver import CloudflareSolver
 # from modules.scraper.etherscan_scraper import EtherscanScraper
 # from modules.utils.cache_utils import FileSystemCache
@@ -702,7 +702,9 @@ async def get_interest_rate_inspect(cap_amount: int = Query(default=800000)):
 
 
 # @router.get("/a_token_transactions")
-# async def get_a_token_transactions(mutex: asyncio.Lock = Depends(get_mutex)):
+# async def get_a_token_transactions(
+#     lease: DistributedLockLease = Depends(require_lock("a_token_transactions")),
+# ):
 #     cloudflare_cache = FileSystemCache(base_dir=".cache/cloudflare")
 #     cloudflare_context_text = cloudflare_cache.get(keys=["context.json"])
 #     if cloudflare_context_text is None:
@@ -1,6 +1,8 @@
+from datetime import date, datetime, timezone
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, Path
+from fastapi import APIRouter, Depends, Path, Query
+from pydantic import BaseModel
 from sqlalchemy import func
 from sqlalchemy.future import select
 
@@ -8,10 +10,17 @@ from apps.chore_master_api.end_user_space.models.finance import Portfolio
 from apps.chore_master_api.end_user_space.unit_of_works.finance import (
     FinanceSQLAlchemyUnitOfWork,
 )
+from apps.chore_master_api.service_layers.portfolio import (
+    get_portfolio_ledger,
+    get_portfolio_performance,
+    get_portfolio_pnl_series,
+    invalidate_portfolio_performances,
+)
 from apps.chore_master_api.web_server.dependencies.auth import (
     get_current_user,
     require_freemium_role,
 )
+from apps.chore_master_api.web_server.dependencies.database import get_chore_master_db
 from apps.chore_master_api.web_server.dependencies.pagination import (
     get_offset_pagination,
 )
@@ -26,6 +35,7 @@ from apps.chore_master_api.web_server.schemas.request import (
     BaseUpdateEntityRequest,
 )
 from apps.chore_master_api.web_server.schemas.response import BaseQueryEntityResponse
+from modules.database.relational_database import RelationalDatabase
 from modules.web_server.schemas.response import (
     MetadataSchema,
     ResponseSchema,
@@ -47,11 +57,53 @@ class ReadPortfolioResponse(BaseQueryEntityResponse):
     description: Optional[str]
 
 
+class ReadPortfolioPerformanceResponse(BaseModel):
+    settlement_asset_reference: str
+    as_of_date: date
+    valuation_times: list[datetime]
+    valuations: list[float]
+    cumulative_returns: list[float]
+    drawdowns: list[float]
+    time_weighted_return: Optional[float]
+    annualized_time_weighted_return: Optional[float]
+    money_weighted_return: Optional[float]
+    max_drawdown: Optional[float]
+    unpriced_asset_references: list[str]
+
+
 class UpdatePortfolioRequest(BaseUpdateEntityRequest):
     name: Optional[str] = None
     description: Optional[str] = None
 
 
+class ReadPortfolioHoldingResponse(BaseModel):
+    asset_reference: str
+    quantity: str
+    cost_basis: str
+    realized_pnl: str
+    applied_transacted_time: datetime
+
+
+class ReadPortfolioPnlResponse(BaseModel):
+    class Position(BaseModel):
+        asset_reference: str
+        # raw amounts like the ones of transfers
+        quantity: str
+        cost_basis: str
+        realized_pnl: str
+        market_value: float
+        unrealized_pnl: float
+
+    settlement_asset_reference: str
+    times: list[datetime]
+    market_values: list[float]
+    cost_bases: list[float]
+    realized_pnls: list[float]
+    unrealized_pnls: list[float]
+    positions: list[Position]
+    unpriced_asset_references: list[str]
+
+
 @router.get("/portfolios", dependencies=[Depends(require_freemium_role)])
 async def get_portfolios(
     offset_pagination: OffsetPagination = Depends(get_offset_pagination),
@@ -113,6 +165,107 @@ async def get_portfolios_portfolio_reference(
     )
 
 
+@router.get(
+    "/portfolios/{portfolio_reference}/holdings",
+    dependencies=[Depends(require_freemium_role)],
+)
+async def get_portfolios_portfolio_reference_holdings(
+    portfolio_reference: Annotated[str, Path()],
+    uow: FinanceSQLAlchemyUnitOfWork = Depends(get_finance_uow),
+):
+    async with uow:
+        entities = await uow.portfolio_holding_snapshot_repository.find_many(
+            filter={"portfolio_reference": portfolio_reference}
+        )
+        response_data = [entity.model_dump() for entity in entities]
+    return ResponseSchema[list[ReadPortfolioHoldingResponse]](
+        status=StatusEnum.SUCCESS, data=response_data
+    )
+
+
+@router.get(
+    "/portfolios/{portfolio_reference}/pnl",
+    dependencies=[Depends(require_freemium_role)],
+)
+async def get_portfolios_portfolio_reference_pnl(
+    portfolio_reference: Annotated[str, Path()],
+    uow: FinanceSQLAlchemyUnitOfWork = Depends(get_finance_uow),
+):
+    async with uow:
+        portfolio = await uow.portfolio_repository.find_one(
+            filter={"reference": portfolio_reference}
+        )
+        ledger = await get_portfolio_ledger(portfolio, uow)
+        pnl_series = await get_portfolio_pnl_series(
+            portfolio,
+            ledger,
+            datetime.now(tz=timezone.utc).replace(tzinfo=None),
+            uow,
+        )
+        response_data = {
+            "settlement_asset_reference": portfolio.settlement_asset_reference,
+            "times": pnl_series.times,
+            "market_values": pnl_series.market_values,
+            "cost_bases": pnl_series.cost_bases,
+            "realized_pnls": pnl_series.realized_pnls,
+            "unrealized_pnls": pnl_series.unrealized_pnls,
+            "positions": [
+                {
+                    "asset_reference": asset_reference,
+                    "quantity": str(quantity),
+                    "cost_basis": str(
+                        ledger.asset_reference_to_cost_basis_map[asset_reference]
+                    ),
+                    "realized_pnl": str(
+                        ledger.asset_reference_to_realized_pnl_map[asset_reference]
+                    ),
+                    "market_value": pnl_series.asset_reference_to_market_value_map[
+                        asset_reference
+                    ],
+                    "unrealized_pnl": pnl_series.asset_reference_to_unrealized_pnl_map[
+                        asset_reference
+                    ],
+                }
+                for asset_reference, quantity in sorted(
+                    ledger.asset_reference_to_quantity_map.items()
+                )
+            ],
+            "unpriced_asset_references": pnl_series.unpriced_asset_references,
+        }
+    return ResponseSchema[ReadPortfolioPnlResponse](
+        status=StatusEnum.SUCCESS, data=response_data
+    )
+
+
+@router.get(
+    "/portfolios/{portfolio_reference}/performance",
+    dependencies=[Depends(require_freemium_role)],
+)
+async def get_portfolios_portfolio_reference_performance(
+    portfolio_reference: Annotated[str, Path()],
+    as_of_date: Annotated[Optional[date], Query()] = None,
+    uow: FinanceSQLAlchemyUnitOfWork = Depends(get_finance_uow),
+    chore_master_db: RelationalDatabase = Depends(get_chore_master_db),
+):
+    if as_of_date is None:
+        as_of_date = datetime.now(tz=timezone.utc).date()
+    async with uow:
+        portfolio = await uow.portfolio_repository.find_one(
+            filter={"reference": portfolio_reference}
+        )
+        portfolio_performance = await get_portfolio_performance(
+            portfolio, as_of_date, chore_master_db
+        )
+        response_data = {
+            "settlement_asset_reference": portfolio.settlement_asset_reference,
+            "as_of_date": as_of_date,
+            **portfolio_performance._asdict(),
+        }
+    return ResponseSchema[ReadPortfolioPerformanceResponse](
+        status=StatusEnum.SUCCESS, data=response_data
+    )
+
+
 @router.patch(
     "/portfolios/{portfolio_reference}", dependencies=[Depends(require_freemium_role)]
 )
@@ -169,6 +322,12 @@ async def delete_portfolios_portfolio_reference(
         )
         used_quota_counter.decrease(len(transactions))
 
+        await uow.portfolio_holding_snapshot_repository.delete_many(
+            filter={
+                "portfolio_reference": portfolio_reference,
+            },
+        )
+
         await uow.portfolio_repository.delete_many(
             filter={
                 "reference": portfolio_reference,
@@ -179,4 +338,5 @@ async def delete_portfolios_portfolio_reference(
         used_quota_counter.decrease(1)
 
         await uow.commit()
+        invalidate_portfolio_performances(portfolio_reference=portfolio_reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
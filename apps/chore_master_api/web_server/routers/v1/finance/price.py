@@ -13,14 +13,26 @@ from apps.chore_master_api.end_user_space.unit_of_works.finance import (
 from apps.chore_master_api.end_user_space.unit_of_works.integration import (
     IntegrationSQLAlchemyUnitOfWork,
 )
-from apps.chore_master_api.modules.feed_discriminated_operator import (
-    FeedDiscriminatedOperator,
-    IntervalEnum,
+from apps.chore_master_api.end_user_space.unit_of_works.trace import (
+    TraceSQLAlchemyUnitOfWork,
 )
+from apps.chore_master_api.modules.background_job_runner import (
+    BackgroundJobRunner,
+    JobContext,
+)
+from apps.chore_master_api.service_layers.portfolio import (
+    invalidate_portfolio_performances,
+)
+from apps.chore_master_api.service_layers.price import auto_fill_prices
+from apps.chore_master_api.service_layers.quota import increase_used_quota
 from apps.chore_master_api.web_server.dependencies.auth import (
     get_current_user,
     require_freemium_role,
 )
+from apps.chore_master_api.web_server.dependencies.background_job import (
+    get_background_job_runner,
+)
+from apps.chore_master_api.web_server.dependencies.database import get_chore_master_db
 from apps.chore_master_api.web_server.dependencies.pagination import (
     get_offset_pagination,
 )
@@ -37,7 +49,12 @@ from apps.chore_master_api.web_server.schemas.request import (
     BaseCreateEntityRequest,
     BaseUpdateEntityRequest,
 )
-from apps.chore_master_api.web_server.schemas.response import BaseQueryEntityResponse
+from apps.chore_master_api.web_server.schemas.response import (
+    BaseQueryEntityResponse,
+    ReadJobResponse,
+)
+from modules.database.relational_database import RelationalDatabase
+from modules.web_server.responses import FastJSONResponse
 from modules.web_server.schemas.response import (
     MetadataSchema,
     ResponseSchema,
@@ -127,12 +144,13 @@ async def get_users_me_prices(
         )
         result = await uow.session.execute(statement)
         entities = result.scalars().unique().all()
-        response_data = [entity.model_dump() for entity in entities]
-    return ResponseSchema[list[ReadPriceResponse]](
-        status=StatusEnum.SUCCESS,
-        data=response_data,
-        metadata=metadata,
-    )
+        return FastJSONResponse(
+            ResponseSchema[list[ReadPriceResponse]](
+                status=StatusEnum.SUCCESS,
+                data=entities,
+                metadata=metadata,
+            )
+        )
 
 
 @router.post("/users/me/prices", dependencies=[Depends(require_freemium_role)])
@@ -151,6 +169,7 @@ async def post_users_me_prices(
         await uow.price_repository.insert_one(entity)
         used_quota_counter.increase(1)
         await uow.commit()
+        invalidate_portfolio_performances(user_reference=current_user.reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
@@ -161,75 +180,47 @@ async def post_users_me_prices(
 )
 async def patch_users_me_prices_auto_fill(
     auto_fill_price_request: AutoFillPriceRequest,
+    is_background: Annotated[bool, Query()] = False,
     current_user: CurrentUser = Depends(get_current_user),
+    chore_master_db: RelationalDatabase = Depends(get_chore_master_db),
     finance_uow: FinanceSQLAlchemyUnitOfWork = Depends(get_finance_uow),
     integration_uow: IntegrationSQLAlchemyUnitOfWork = Depends(get_integration_uow),
     used_quota_counter: Counter = Depends(get_used_quota_counter),
+    background_job_runner: BackgroundJobRunner = Depends(get_background_job_runner),
 ):
-    async with finance_uow, integration_uow:
-        operator = await integration_uow.operator_repository.find_one(
-            filter={
-                "reference": auto_fill_price_request.operator_reference,
-                "user_reference": current_user.reference,
-            }
-        )
-        feed_operator: FeedDiscriminatedOperator = operator.to_discriminated_operator()
+    if is_background:
 
-        settlable_assets = await finance_uow.asset_repository.find_many(
-            filter={
-                "user_reference": current_user.reference,
-                "is_settleable": True,
-            }
-        )
-        base_asset = next(
-            (
-                settlable_asset
-                for settlable_asset in settlable_assets
-                if settlable_asset.symbol == "USD"
-            ),
-            None,
-        )
-        quote_assets = [
-            settlable_asset
-            for settlable_asset in settlable_assets
-            if settlable_asset.symbol != "USD"
-        ]
-        balance_sheets = await finance_uow.balance_sheet_repository.find_many(
-            filter={
-                "user_reference": current_user.reference,
-            }
-        )
-        occupied_datetimes_set = {
-            balance_sheet.balanced_time for balance_sheet in balance_sheets
-        }
-        for quote_asset in quote_assets:
-            prices = await finance_uow.price_repository.find_many(
-                filter={
-                    "user_reference": current_user.reference,
-                    "base_asset_reference": base_asset.reference,
-                    "quote_asset_reference": quote_asset.reference,
-                },
+        async def _auto_fill_prices(job_context: JobContext) -> dict:
+            inserted_count = await auto_fill_prices(
+                user_reference=current_user.reference,
+                operator_reference=auto_fill_price_request.operator_reference,
+                finance_uow=FinanceSQLAlchemyUnitOfWork(chore_master_db),
+                integration_uow=IntegrationSQLAlchemyUnitOfWork(chore_master_db),
+                report_progress=job_context.report_progress,
             )
-            existing_datetimes_set = {price.confirmed_time for price in prices}
-            target_datetimes = list(occupied_datetimes_set - existing_datetimes_set)
-            feed_price_dicts = await feed_operator.fetch_prices(
-                instrument_symbol=f"{base_asset.symbol}_{quote_asset.symbol}",
-                target_interval=IntervalEnum.PER_1_DAY,
-                target_datetimes=target_datetimes,
+            invalidate_portfolio_performances(user_reference=current_user.reference)
+            await increase_used_quota(
+                user_reference=current_user.reference,
+                delta=inserted_count,
+                trace_uow=TraceSQLAlchemyUnitOfWork(chore_master_db),
             )
-            for feed_price_dict in feed_price_dicts:
-                matched_datetime = feed_price_dict["matched_datetime"]
-                if matched_datetime not in existing_datetimes_set:
-                    entity = Price(
-                        user_reference=current_user.reference,
-                        base_asset_reference=base_asset.reference,
-                        quote_asset_reference=quote_asset.reference,
-                        value=f"{feed_price_dict['matched_price']}",
-                        confirmed_time=matched_datetime,
-                    )
-                    await finance_uow.price_repository.insert_one(entity)
-                    used_quota_counter.increase(1)
-        await finance_uow.commit()
+            return {"inserted_count": inserted_count}
+
+        job_dict = await background_job_runner.submit(
+            user_reference=current_user.reference,
+            name="auto_fill_prices",
+            func=_auto_fill_prices,
+        )
+        return ResponseSchema[ReadJobResponse](status=StatusEnum.SUCCESS, data=job_dict)
+
+    inserted_count = await auto_fill_prices(
+        user_reference=current_user.reference,
+        operator_reference=auto_fill_price_request.operator_reference,
+        finance_uow=finance_uow,
+        integration_uow=integration_uow,
+    )
+    invalidate_portfolio_performances(user_reference=current_user.reference)
+    used_quota_counter.increase(inserted_count)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
@@ -252,6 +243,7 @@ async def patch_users_me_prices_price_reference(
             },
         )
         await uow.commit()
+        invalidate_portfolio_performances(user_reference=current_user.reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
@@ -275,6 +267,7 @@ async def delete_users_me_prices_price_reference(
         )
         used_quota_counter.decrease(1)
         await uow.commit()
+        invalidate_portfolio_performances(user_reference=current_user.reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
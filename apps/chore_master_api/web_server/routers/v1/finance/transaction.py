@@ -13,6 +13,10 @@ from apps.chore_master_api.end_user_space.models.finance import Transaction, Tra
 from apps.chore_master_api.end_user_space.unit_of_works.finance import (
     FinanceSQLAlchemyUnitOfWork,
 )
+from apps.chore_master_api.service_layers.portfolio import (
+    invalidate_portfolio_performances,
+    rebuild_portfolio_holding_snapshots,
+)
 from apps.chore_master_api.web_server.dependencies.auth import require_freemium_role
 from apps.chore_master_api.web_server.dependencies.pagination import (
     get_offset_pagination,
@@ -141,15 +145,23 @@ async def patch_portfolios_portfolio_reference_transactions_transaction_referenc
     update_entity_request: UpdateTransactionRequest,
     uow: FinanceSQLAlchemyUnitOfWork = Depends(get_finance_uow),
 ):
+    values = update_entity_request.model_dump(exclude_unset=True)
     async with uow:
         await uow.transaction_repository.update_many(
-            values=update_entity_request.model_dump(exclude_unset=True),
+            values=values,
             filter={
                 "reference": transaction_reference,
                 "portfolio_reference": portfolio_reference,
             },
         )
+        # moving a transaction in time changes the order transfers are applied in
+        if "transacted_time" in values:
+            portfolio = await uow.portfolio_repository.find_one(
+                filter={"reference": portfolio_reference}
+            )
+            await rebuild_portfolio_holding_snapshots(portfolio, uow)
         await uow.commit()
+        invalidate_portfolio_performances(portfolio_reference=portfolio_reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
@@ -186,5 +198,12 @@ async def delete_portfolios_portfolio_reference_transactions_transaction_referen
         )
         used_quota_counter.decrease(1)
 
+        if transfer_count > 0:
+            portfolio = await uow.portfolio_repository.find_one(
+                filter={"reference": portfolio_reference}
+            )
+            await rebuild_portfolio_holding_snapshots(portfolio, uow)
+
         await uow.commit()
+        invalidate_portfolio_performances(portfolio_reference=portfolio_reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
@@ -9,6 +9,11 @@ from apps.chore_master_api.end_user_space.models.finance import Transfer
 from apps.chore_master_api.end_user_space.unit_of_works.finance import (
     FinanceSQLAlchemyUnitOfWork,
 )
+from apps.chore_master_api.service_layers.portfolio import (
+    apply_transfer_to_portfolio_holding_snapshots,
+    invalidate_portfolio_performances,
+    rebuild_portfolio_holding_snapshots,
+)
 from apps.chore_master_api.web_server.dependencies.auth import require_freemium_role
 from apps.chore_master_api.web_server.dependencies.trace import (
     Counter,
@@ -60,8 +65,13 @@ async def post_portfolios_portfolio_reference_transactions_transaction_reference
     async with uow:
         entity = Transfer(**entity_dict)
         await uow.transfer_repository.insert_one(entity)
+        portfolio = await uow.portfolio_repository.find_one(
+            filter={"reference": portfolio_reference}
+        )
+        await apply_transfer_to_portfolio_holding_snapshots(portfolio, entity, uow)
         used_quota_counter.increase(1)
         await uow.commit()
+        invalidate_portfolio_performances(portfolio_reference=portfolio_reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
@@ -76,15 +86,22 @@ async def patch_portfolios_portfolio_reference_transactions_transaction_referenc
     update_entity_request: UpdateTransferRequest,
     uow: FinanceSQLAlchemyUnitOfWork = Depends(get_finance_uow),
 ):
+    values = update_entity_request.model_dump(exclude_unset=True)
     async with uow:
         await uow.transfer_repository.update_many(
-            values=update_entity_request.model_dump(exclude_unset=True),
+            values=values,
             filter={
                 "reference": transfer_reference,
                 "transaction_reference": transaction_reference,
             },
         )
+        if set(values) - {"remark"}:
+            portfolio = await uow.portfolio_repository.find_one(
+                filter={"reference": portfolio_reference}
+            )
+            await rebuild_portfolio_holding_snapshots(portfolio, uow)
         await uow.commit()
+        invalidate_portfolio_performances(portfolio_reference=portfolio_reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
 
 
@@ -107,6 +124,11 @@ async def delete_portfolios_portfolio_reference_transactions_transaction_referen
             },
             limit=1,
         )
+        portfolio = await uow.portfolio_repository.find_one(
+            filter={"reference": portfolio_reference}
+        )
+        await rebuild_portfolio_holding_snapshots(portfolio, uow)
         used_quota_counter.decrease(1)
         await uow.commit()
+        invalidate_portfolio_performances(portfolio_reference=portfolio_reference)
     return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
+from apps.chore_master_api.web_server.routers.v1.trace.job import router as job_router
 from apps.chore_master_api.web_server.routers.v1.trace.quota import (
     router as quota_router,
 )
 
 router = APIRouter(prefix="/trace", tags=["Trace"])
 router.include_router(quota_router)
+router.include_router(job_router)
@@ -0,0 +1,92 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Path
+
+from apps.chore_master_api.end_user_space.models.trace import Job
+from apps.chore_master_api.end_user_space.unit_of_works.trace import (
+    TraceSQLAlchemyUnitOfWork,
+)
+from apps.chore_master_api.modules.background_job_runner import BackgroundJobRunner
+from apps.chore_master_api.web_server.dependencies.auth import (
+    get_current_user,
+    require_freemium_role,
+)
+from apps.chore_master_api.web_server.dependencies.background_job import (
+    get_background_job_runner,
+)
+from apps.chore_master_api.web_server.dependencies.unit_of_work import get_trace_uow
+from apps.chore_master_api.web_server.schemas.dto import CurrentUser
+from apps.chore_master_api.web_server.schemas.response import ReadJobResponse
+from modules.web_server.exceptions import BadRequestError, NotFoundError
+from modules.web_server.schemas.response import ResponseSchema, StatusEnum
+
+router = APIRouter()
+
+
+async def _find_job(
+    uow: TraceSQLAlchemyUnitOfWork, job_reference: str, user_reference: str
+) -> Job:
+    jobs = await uow.job_repository.find_many(
+        filter={
+            "reference": job_reference,
+            "user_reference": user_reference,
+        },
+        limit=1,
+    )
+    if len(jobs) == 0:
+        raise NotFoundError(f"job `{job_reference}` is not found")
+    return jobs[0]
+
+
+@router.get("/users/me/jobs", dependencies=[Depends(require_freemium_role)])
+async def get_users_me_jobs(
+    uow: TraceSQLAlchemyUnitOfWork = Depends(get_trace_uow),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    async with uow:
+        entities = await uow.job_repository.find_many(
+            filter={
+                "user_reference": current_user.reference,
+            }
+        )
+        response_data = [entity.model_dump() for entity in entities]
+    return ResponseSchema[list[ReadJobResponse]](
+        status=StatusEnum.SUCCESS, data=response_data
+    )
+
+
+@router.get(
+    "/users/me/jobs/{job_reference}", dependencies=[Depends(require_freemium_role)]
+)
+async def get_users_me_jobs_job_reference(
+    job_reference: Annotated[str, Path()],
+    uow: TraceSQLAlchemyUnitOfWork = Depends(get_trace_uow),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    async with uow:
+        entity = await _find_job(uow, job_reference, current_user.reference)
+        response_data = entity.model_dump()
+    return ResponseSchema[ReadJobResponse](
+        status=StatusEnum.SUCCESS, data=response_data
+    )
+
+
+@router.patch(
+    "/users/me/jobs/{job_reference}/cancel",
+    dependencies=[Depends(require_freemium_role)],
+)
+async def patch_users_me_jobs_job_reference_cancel(
+    job_reference: Annotated[str, Path()],
+    uow: TraceSQLAlchemyUnitOfWork = Depends(get_trace_uow),
+    current_user: CurrentUser = Depends(get_current_user),
+    background_job_runner: BackgroundJobRunner = Depends(get_background_job_runner),
+):
+    async with uow:
+        entity = await _find_job(uow, job_reference, current_user.reference)
+        if entity.status not in [
+            Job.StatusEnum.PENDING.value,
+            Job.StatusEnum.RUNNING.value,
+        ]:
+            raise BadRequestError(f"job `{job_reference}` is already {entity.status}")
+    await background_job_runner.cancel(job_reference)
+    return ResponseSchema[None](status=StatusEnum.SUCCESS, data=None)
@@ -1,10 +1,12 @@
 import httpx
-from bs4 import BeautifulSoup
 from fastapi import APIRouter
 
 from modules.scraper.etherscan_scraper import EtherscanScraper
+from modules.utils.import_utils import ImportUtils
 from modules.web_server.schemas.response import ResponseSchema, StatusEnum
 
+bs4 = ImportUtils.lazy_import("bs4")
+
 router = APIRouter(prefix="/widget", tags=["Widget"])
 
 
@@ -185,7 +187,7 @@ async def get_transaction_inspector_transactions_tx_hash(tx_hash: str):
         )
         html = await etherscan_scraper.get_tx_advanced_html(tx_hash)
 
-    soup = BeautifulSoup(html, "html.parser")
+    soup = bs4.BeautifulSoup(html, "html.parser")
 
     table_row_divs = soup.select(
         "#ContentPlaceHolder1_maintable > div.card:nth-child(1) > div.row"
@@ -258,7 +260,7 @@ async def get_tx_logs(tx_hash: str):
         )
         html = await etherscan_scraper.get_tx_advanced_html(tx_hash)
 
-    soup = BeautifulSoup(html, "html.parser")
+    soup = bs4.BeautifulSoup(html, "html.parser")
 
     table_row_divs = soup.select(
         "#ContentPlaceHolder1_maintable > div.card:nth-child(1) > div.row"
@@ -7,6 +7,14 @@ class ChoreMasterAPIWebServerConfigSchema(WebServerConfigSchema):
     UVICORN_AUTO_RELOAD: bool
     DATABASE_ORIGIN: str
     DATABASE_SCHEMA_NAME: Optional[str] = None
+    BACKGROUND_JOB_MAX_CONCURRENCY: int = 4
+    PRICE_SNAPSHOT_INTERVAL_SECONDS: int = 3600
+    RISK_SNAPSHOT_INTERVAL_SECONDS: int = 300
+    MONGODB_URI: Optional[str] = None
+    MONGODB_MIN_POOL_SIZE: int = 1
+    MONGODB_MAX_POOL_SIZE: int = 8
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None
+    OKX_RISK_STREAM_ENABLED: bool = False
 
     API_ORIGIN: str
     FRONTEND_ORIGIN: str
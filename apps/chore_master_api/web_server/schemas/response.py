@@ -1,5 +1,22 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
 
 
 class BaseQueryEntityResponse(BaseModel):
+    # allow building responses from entities without dumping them first
+    model_config = ConfigDict(from_attributes=True)
+
     reference: str
+
+
+class ReadJobResponse(BaseQueryEntityResponse):
+    name: str
+    status: str
+    progress: float
+    message: Optional[str] = None
+    result: Optional[dict] = None
+    is_cancel_requested: bool
+    started_time: Optional[datetime] = None
+    finished_time: Optional[datetime] = None
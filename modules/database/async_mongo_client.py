@@ -1,4 +1,5 @@
 import contextlib
+import threading
 from datetime import timedelta
 from decimal import Decimal
 from typing import AsyncGenerator, NewType, Optional
@@ -11,6 +12,7 @@ from motor.motor_asyncio import (
     AsyncIOMotorClientSession,
     AsyncIOMotorDatabase,
 )
+from pymongo import monitoring
 from pymongo.write_concern import WriteConcern
 
 AsyncMongoDB = NewType("AsyncMongoDB", AsyncIOMotorDatabase)
@@ -51,13 +53,81 @@ class TimedeltaCodec(TypeCodec):
         }
 
 
+class ConnectionPoolStats(monitoring.ConnectionPoolListener):
+    """
+    Connection counts summed over the pools of every server, events are published
+    from the driver's background threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connection_count = 0
+        self.checked_out_connection_count = 0
+        self.check_out_failure_count = 0
+        self.pool_cleared_count = 0
+
+    def _add(self, name: str, delta: int):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent):
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent):
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent):
+        self._add("pool_cleared_count", 1)
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent):
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent):
+        self._add("connection_count", 1)
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent):
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent):
+        self._add("connection_count", -1)
+
+    def connection_check_out_started(
+        self, event: monitoring.ConnectionCheckOutStartedEvent
+    ):
+        pass
+
+    def connection_check_out_failed(
+        self, event: monitoring.ConnectionCheckOutFailedEvent
+    ):
+        self._add("check_out_failure_count", 1)
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent):
+        self._add("checked_out_connection_count", 1)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent):
+        self._add("checked_out_connection_count", -1)
+
+
 class AsyncMongoClient:
+    """
+    Holds a connection pool per server and monitors the topology in the
+    background, so a single instance should be shared for the process lifetime.
+    """
+
     def __init__(
         self,
         host: Optional[str] = None,
         min_pool_size: Optional[int] = None,
         max_pool_size: Optional[int] = None,
+        max_idle_time_ms: Optional[int] = None,
+        server_selection_timeout_ms: Optional[int] = None,
     ):
+        self.pool_stats = ConnectionPoolStats()
+        options = {}
+        if max_idle_time_ms is not None:
+            options["maxIdleTimeMS"] = max_idle_time_ms
+        if server_selection_timeout_ms is not None:
+            options["serverSelectionTimeoutMS"] = server_selection_timeout_ms
         self._client = AsyncIOMotorClient(
             host,
             readPreference="secondaryPreferred",
@@ -65,6 +135,8 @@ class AsyncMongoClient:
             uuidRepresentation="standard",
             maxPoolSize=max_pool_size,
             minPoolSize=min_pool_size,
+            event_listeners=[self.pool_stats],
+            **options,
         )
         type_registry = TypeRegistry(type_codecs=[DecimalCodec(), TimedeltaCodec()])
         self.codec_options = CodecOptions(
@@ -77,6 +149,13 @@ class AsyncMongoClient:
     async def admin_command(self, *args, **kwargs) -> dict:
         return await self._client.admin.command(*args, **kwargs)
 
+    async def warm_up(self):
+        """
+        Finish server discovery and open the first connection up front, the rest
+        of `min_pool_size` is filled in the background.
+        """
+        await self.admin_command("ping")
+
     def get_database(self, database_name: str) -> AsyncMongoDB:
         write_concern = WriteConcern(w=1, j=True, wtimeout=10000)
         return self._client.get_database(
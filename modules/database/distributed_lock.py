@@ -0,0 +1,186 @@
+import asyncio
+import fcntl
+import hashlib
+import os
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from modules.base.exceptions import BaseError
+from modules.database.relational_database import RelationalDatabase
+from modules.utils.file_system_utils import FileSystemUtils
+
+
+class LockNotAcquiredError(BaseError):
+    pass
+
+
+class DistributedLockLease:
+    def __init__(self, key: str):
+        self.key = key
+        # set once the backend can no longer guarantee the lock is held, long
+        # running holders should check it between steps
+        self.is_lost = False
+
+
+class BaseDistributedLock(ABC):
+    """
+    Lock shared by every worker and instance using the same backend.
+
+    `acquire` waits up to `timeout_seconds` for the lock (0 fails immediately) and
+    keeps renewing the lease in the background until the block exits.
+    """
+
+    def __init__(
+        self,
+        renew_interval_seconds: float = 10.0,
+        poll_interval_seconds: float = 0.5,
+    ):
+        self._renew_interval_seconds = renew_interval_seconds
+        self._poll_interval_seconds = poll_interval_seconds
+
+    @asynccontextmanager
+    async def acquire(
+        self, key: str, timeout_seconds: float = 0.0
+    ) -> AsyncIterator[DistributedLockLease]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+        while True:
+            handle = await self._try_acquire(key)
+            if handle is not None:
+                break
+            remaining_seconds = deadline - loop.time()
+            if remaining_seconds <= 0:
+                raise LockNotAcquiredError(f"Lock `{key}` is held by another holder")
+            await asyncio.sleep(min(self._poll_interval_seconds, remaining_seconds))
+
+        lease = DistributedLockLease(key)
+        renew_task = asyncio.create_task(self._keep_renewing(lease, handle))
+        try:
+            yield lease
+        finally:
+            renew_task.cancel()
+            try:
+                await renew_task
+            except asyncio.CancelledError:
+                pass
+            await self._release(handle)
+
+    async def _keep_renewing(self, lease: DistributedLockLease, handle: Any):
+        while True:
+            await asyncio.sleep(self._renew_interval_seconds)
+            try:
+                await self._renew(handle)
+            except Exception as e:
+                lease.is_lost = True
+                print(f"Lost lock `{lease.key}`: {e}", flush=True)
+                return
+
+    @abstractmethod
+    async def _try_acquire(self, key: str) -> Optional[Any]:
+        """
+        Return a handle of the acquired lock, or `None` when it is held elsewhere.
+        """
+
+    @abstractmethod
+    async def _renew(self, handle: Any):
+        pass
+
+    @abstractmethod
+    async def _release(self, handle: Any):
+        pass
+
+
+class PostgresAdvisoryLock(BaseDistributedLock):
+    """
+    Session level advisory lock held on a dedicated connection. The lock is
+    released by the server as soon as the connection goes away, renewing keeps
+    the connection alive and detects when it is gone.
+    """
+
+    def __init__(self, database: RelationalDatabase, **kwargs):
+        super().__init__(**kwargs)
+        self._database = database
+
+    async def _try_acquire(self, key: str) -> Optional[tuple[AsyncConnection, int]]:
+        lock_id = self.get_lock_id(key)
+        conn = await self._database.async_engine.connect()
+        try:
+            # avoid holding an idle transaction open for the whole lease
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            is_acquired = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": lock_id}
+            )
+        except BaseException:
+            await conn.close()
+            raise
+        if not is_acquired:
+            await conn.close()
+            return None
+        return conn, lock_id
+
+    async def _renew(self, handle: tuple[AsyncConnection, int]):
+        conn, _lock_id = handle
+        await conn.execute(text("SELECT 1"))
+
+    async def _release(self, handle: tuple[AsyncConnection, int]):
+        conn, lock_id = handle
+        try:
+            await conn.execute(
+                text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": lock_id}
+            )
+        finally:
+            await conn.close()
+
+    @staticmethod
+    def get_lock_id(key: str) -> int:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+
+
+class FileLock(BaseDistributedLock):
+    """
+    `flock` based lock for local development, shared by the processes of a single
+    host. The kernel drops the lock when the holder exits, so there is no lease to
+    expire and renewing is a no-op.
+    """
+
+    def __init__(self, lock_dir: str, **kwargs):
+        super().__init__(**kwargs)
+        self._lock_dir = lock_dir
+
+    async def _try_acquire(self, key: str) -> Optional[int]:
+        FileSystemUtils.ensure_directory(self._lock_dir)
+        file_name = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        fd = os.open(
+            os.path.join(self._lock_dir, f"{file_name}.lock"), os.O_RDWR | os.O_CREAT
+        )
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    async def _renew(self, handle: int):
+        pass
+
+    async def _release(self, handle: int):
+        try:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        finally:
+            os.close(handle)
+
+
+def create_distributed_lock(
+    database: RelationalDatabase, lock_dir: str, **kwargs
+) -> BaseDistributedLock:
+    if database.origin.startswith("postgresql"):
+        return PostgresAdvisoryLock(database, **kwargs)
+    return FileLock(lock_dir, **kwargs)
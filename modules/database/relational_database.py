@@ -1,21 +1,59 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import io
 import json
 import os
-from datetime import datetime
+import tempfile
+import time
+import zipfile
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime, timezone
 from decimal import Decimal
-from typing import BinaryIO, Optional
+from enum import Enum
+from typing import (
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    TypeVar,
+)
 
-import pandas as pd
+import shortuuid
 from alembic import command
 from alembic.config import Config
 from alembic.runtime.environment import EnvironmentContext
 from alembic.script import ScriptDirectory
 from alembic.script.base import Script
-from sqlalchemy import Column, NullPool, Table, event, inspect
-from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
+from sqlalchemy import Column, NullPool, Select, Table, bindparam, event, inspect
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncResult,
+    AsyncSession,
+    create_async_engine,
+)
 from sqlalchemy.orm import registry, sessionmaker
 from sqlalchemy.schema import CreateSchema, DropSchema, MetaData
 
 from modules.database.sqlalchemy import types
+from modules.utils.import_utils import ImportUtils
+
+pd = ImportUtils.lazy_import("pandas")
+pa = ImportUtils.lazy_import("pyarrow")
+pq = ImportUtils.lazy_import("pyarrow.parquet")
+
+T = TypeVar("T")
+ColumnCaster = Callable[["pd.Series"], "pd.Series"]
+EntryWriter = Callable[[BinaryIO, AsyncResult], AsyncIterator[int]]
+# called with `(table_name, row_count, is_finished)`, finished once per table
+ProgressCallback = Callable[[str, int, bool], None]
+
+SPOOLED_FILE_MAX_MEMORY_SIZE = 16 * 1024 * 1024
+SPOOLED_FILE_COPY_SIZE = 1024 * 1024
 
 
 class RelationalDatabase:
@@ -88,6 +126,13 @@ class RelationalDatabase:
     def conn_args(self) -> dict:
         return self._conn_args
 
+    @property
+    def async_engine(self) -> AsyncEngine:
+        return self._async_engine
+
+    async def dispose(self):
+        await self._async_engine.dispose()
+
     # @property
     # def schema_name(self) -> str:
     #     # return self._schema_name
@@ -143,7 +188,36 @@ class RelationalDatabase:
     #         await conn.execute(CreateSchema(self.schema_name))
 
 
+class SchemaMigrationJobStatusEnum(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class SchemaMigrationJob:
+    def __init__(self, command_name: str):
+        self.reference = shortuuid.ShortUUID().random(length=8)
+        self.command_name = command_name
+        self.status = SchemaMigrationJobStatusEnum.PENDING
+        self.error_message: Optional[str] = None
+        self.created_time = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+        self.finished_time: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "reference": self.reference,
+            "command_name": self.command_name,
+            "status": self.status.value,
+            "error_message": self.error_message,
+            "created_time": self.created_time,
+            "finished_time": self.finished_time,
+        }
+
+
 class SchemaMigration:
+    MAX_FINISHED_JOB_COUNT = 100
+
     @staticmethod
     def get_script_dict(script: Script) -> dict:
         return {
@@ -158,11 +232,26 @@ class SchemaMigration:
         }
 
     def __init__(
-        self, database: RelationalDatabase, version_dir: str, alembic_dir: str
+        self,
+        database: RelationalDatabase,
+        version_dir: str,
+        alembic_dir: str,
+        executor: Optional[Executor] = None,
     ):
         self._db = database
         self._version_dir = version_dir
         self._alembic_dir = alembic_dir
+        # alembic commands share the script directory and the version table,
+        # so they are run one at a time on a dedicated thread
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="schema_migration"
+            )
+        self._executor = executor
+        self._script_directory: Optional[ScriptDirectory] = None
+        self._all_revisions: Optional[list[dict]] = None
+        self._reference_to_job_map: dict[str, SchemaMigrationJob] = {}
+        self._job_tasks: set[asyncio.Task] = set()
 
     def create_alembic_config(self, metadata: MetaData) -> Config:
         # https://alembic.sqlalchemy.org/en/latest/api/config.html
@@ -184,20 +273,51 @@ class SchemaMigration:
     def get_version_location(self) -> str:
         return self._version_dir
 
+    def get_script_directory(self, alembic_cfg: Config) -> ScriptDirectory:
+        if self._script_directory is None:
+            self._script_directory = ScriptDirectory.from_config(alembic_cfg)
+        return self._script_directory
+
+    def invalidate_script_cache(self):
+        self._script_directory = None
+        self._all_revisions = None
+
     def generate_revision(self, metadata: MetaData) -> list[Script]:
         alembic_cfg = self.create_alembic_config(metadata)
-        script = command.revision(alembic_cfg, autogenerate=True)
+        try:
+            script = command.revision(alembic_cfg, autogenerate=True)
+        finally:
+            self.invalidate_script_cache()
         if isinstance(script, Script):
             return [script]
         return script
 
+    def delete_revision(self, metadata: MetaData, revision: str) -> bool:
+        script_path = next(
+            (
+                rev["path"]
+                for rev in self.all_revisions(metadata)
+                if rev["revision"] == revision
+            ),
+            None,
+        )
+        if script_path is None:
+            return False
+        try:
+            os.remove(script_path)
+        finally:
+            self.invalidate_script_cache()
+        return True
+
     def all_revisions(self, metadata: MetaData) -> list[dict]:
-        alembic_cfg = self.create_alembic_config(metadata)
-        script = ScriptDirectory.from_config(alembic_cfg)
-        return [
-            self.get_script_dict(script)
-            for script in script.walk_revisions(base="base", head="heads")
-        ]
+        if self._all_revisions is None:
+            alembic_cfg = self.create_alembic_config(metadata)
+            script = self.get_script_directory(alembic_cfg)
+            self._all_revisions = [
+                self.get_script_dict(script)
+                for script in script.walk_revisions(base="base", head="heads")
+            ]
+        return list(self._all_revisions)
 
     def applied_revision(self, metadata: MetaData) -> Optional[dict]:
         current_revision = None
@@ -208,7 +328,7 @@ class SchemaMigration:
             return []
 
         alembic_cfg = self.create_alembic_config(metadata)
-        script = ScriptDirectory.from_config(alembic_cfg)
+        script = self.get_script_directory(alembic_cfg)
 
         with EnvironmentContext(
             alembic_cfg, script, fn=_get_current_revision, dont_mutate=True
@@ -229,216 +349,774 @@ class SchemaMigration:
         alembic_cfg = self.create_alembic_config(metadata)
         command.downgrade(alembic_cfg, revision)
 
+    async def run_in_executor(self, func: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def submit_job(
+        self, command_name: str, func: Callable, *args, **kwargs
+    ) -> SchemaMigrationJob:
+        job = SchemaMigrationJob(command_name=command_name)
+        self._reference_to_job_map[job.reference] = job
+        task = asyncio.create_task(self._run_job(job, func, *args, **kwargs))
+        self._job_tasks.add(task)
+        task.add_done_callback(self._job_tasks.discard)
+        return job
+
+    def get_job(self, reference: str) -> Optional[SchemaMigrationJob]:
+        return self._reference_to_job_map.get(reference)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    async def _run_job(self, job: SchemaMigrationJob, func: Callable, *args, **kwargs):
+        def _run():
+            job.status = SchemaMigrationJobStatusEnum.RUNNING
+            return func(*args, **kwargs)
+
+        try:
+            await self.run_in_executor(_run)
+            job.status = SchemaMigrationJobStatusEnum.SUCCEEDED
+        except Exception as e:
+            job.status = SchemaMigrationJobStatusEnum.FAILED
+            job.error_message = str(e)
+        finally:
+            job.finished_time = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+            self._prune_finished_jobs()
+
+    def _prune_finished_jobs(self):
+        finished_references = [
+            reference
+            for reference, job in self._reference_to_job_map.items()
+            if job.finished_time is not None
+        ]
+        for reference in finished_references[: -self.MAX_FINISHED_JOB_COUNT]:
+            del self._reference_to_job_map[reference]
+
+
+class DataFileFormatEnum(Enum):
+    CSV = "csv"
+    PARQUET = "parquet"
+
+
+class _TableExport(NamedTuple):
+    table_name: str
+    entry_name: str
+    compress_type: int
+    statement: Select
+    write_entry: EntryWriter
+
 
 class DataMigration:
     def __init__(self, database: RelationalDatabase, registry: registry):
         self._db = database
         self._registry = registry
 
-    async def import_files(self, file_tuples: list[tuple[str, BinaryIO]]):
-        schema_name = self._registry.metadata.schema
-        async_session = self._db.get_async_session()
-        async with async_session() as session:
-            for file_name, file in file_tuples:
-                table_name, _ = os.path.splitext(file_name)
-                full_table_name = (
-                    table_name if schema_name is None else f"{schema_name}.{table_name}"
-                )
-                table = self._registry.metadata.tables[full_table_name]
-                # pk_columns = [col.name for col in table.primary_key.columns]
-                column_name_to_type_map = {
-                    column.name: column.type for column in table.columns
-                }
-                df = pd.read_csv(file, dtype=str, keep_default_na=False)
-                insert_statements = []
-                update_statements = []
-                delete_statements = []
-                for i, row in enumerate(df.itertuples(index=False)):
-                    # if getattr(row, "reference", "") == "":
-                    #     raise BadRequestError(
-                    #         f"Value is required at table `{table_name}`, column `reference`, row `{i}`"
-                    #     )
-                    op = getattr(row, "OP", "")
-                    op_reference = getattr(row, "OP_REFERENCE", "")
-                    row_dict = row._asdict()
-                    row_dict.pop("OP")
-                    row_dict.pop("OP_REFERENCE", None)
-                    entity_dict = cast_row_dict_to_entity_dict(
-                        row_dict, column_name_to_type_map
+    async def import_files(
+        self,
+        file_tuples: list[tuple[str, BinaryIO]],
+        chunk_size: int = 1000,
+        max_workers: int = 1,
+        on_progress: Optional[ProgressCallback] = None,
+    ):
+        table_to_file_tuples: dict[
+            Table, list[tuple[DataFileFormatEnum, BinaryIO]]
+        ] = {}
+        for file_name, file in file_tuples:
+            table_name, file_extension = os.path.splitext(file_name)
+            table = self._get_table(table_name)
+            file_format = self._get_file_format(file_extension)
+            table_to_file_tuples.setdefault(table, []).append((file_format, file))
+
+        # tables of the same tier never reference each other, so they can be
+        # imported concurrently, each on its own connection
+        semaphore = asyncio.Semaphore(max_workers)
+        for tables in self._get_table_tiers(list(table_to_file_tuples.keys())):
+            await _gather_or_cancel(
+                [
+                    self._import_table_files(
+                        semaphore=semaphore,
+                        table=table,
+                        file_tuples=table_to_file_tuples[table],
+                        chunk_size=chunk_size,
+                        on_progress=on_progress,
                     )
-                    if op == "INSERT":
-                        insert_statements.append(table.insert().values(entity_dict))
-                    elif op == "UPDATE":
-                        if op_reference == "":
-                            raise ValueError(
-                                f"Value is required at table `{table_name}`, column `OP_REFERENCE`, row `{i}`"
-                            )
-                        # conditions = []
-                        # for pk_column in pk_columns:
-                        #     pk_value = entity_dict.pop(pk_column)
-                        #     conditions.append(table.c[pk_column] == pk_value)
-                        # condition = and_(*conditions)
-                        condition = table.c["reference"] == op_reference
-                        update_statements.append(
-                            table.update().where(condition).values(entity_dict)
-                        )
-                    elif op == "DELETE":
-                        if op_reference == "":
-                            raise ValueError(
-                                f"Value is required at table `{table_name}`, column `OP_REFERENCE`, row `{i}`"
-                            )
-                        # conditions = []
-                        # for pk_column in pk_columns:
-                        #     pk_value = entity_dict.pop(pk_column)
-                        #     conditions.append(table.c[pk_column] == pk_value)
-                        # condition = and_(*conditions)
-                        condition = table.c["reference"] == op_reference
-                        delete_statements.append(table.delete().where(condition))
+                    for table in tables
+                ]
+            )
+
+    async def _import_table_files(
+        self,
+        semaphore: asyncio.Semaphore,
+        table: Table,
+        file_tuples: list[tuple[DataFileFormatEnum, BinaryIO]],
+        chunk_size: int,
+        on_progress: Optional[ProgressCallback],
+    ):
+        async_session = self._db.get_async_session()
+        async with semaphore, async_session() as session:
+            row_count = 0
+            for file_format, file in file_tuples:
                 """
                 Debug with following expression:
                 `str(statement.compile(compile_kwargs={"literal_binds": True}))`
                 """
                 try:
-                    for statement in insert_statements:
-                        await session.execute(statement)
-                    for statement in update_statements:
-                        await session.execute(statement)
-                    for statement in delete_statements:
-                        await session.execute(statement)
+                    if file_format == DataFileFormatEnum.PARQUET:
+                        chunks = self._iter_parquet_chunks(table, file, chunk_size)
+                    else:
+                        chunks = self._iter_csv_chunks(table, file, chunk_size)
+                    row_offset = 0
+                    while True:
+                        # parse off the event loop so other workers keep running
+                        chunk = await asyncio.to_thread(next, chunks, None)
+                        if chunk is None:
+                            break
+                        chunk_df, cast_chunk_df = chunk
+                        await self._import_chunk(
+                            session=session,
+                            table=table,
+                            chunk_df=chunk_df,
+                            cast_chunk_df=cast_chunk_df,
+                            row_offset=row_offset,
+                        )
+                        row_offset += len(chunk_df)
+                        row_count += len(chunk_df)
+                        if on_progress is not None:
+                            on_progress(table.name, row_count, False)
                     await session.commit()
                 except Exception as e:
                     await session.rollback()
                     raise ValueError(f"Failed to import data: {e}")
+            if on_progress is not None:
+                on_progress(table.name, row_count, True)
 
-    async def export_files(
+    def _iter_csv_chunks(
+        self, table: Table, file: BinaryIO, chunk_size: int
+    ) -> Iterator[tuple[pd.DataFrame, Callable[[pd.DataFrame], pd.DataFrame]]]:
+        column_casters = compile_row_to_entity_column_casters(
+            {column.name: column.type for column in table.columns}
+        )
+
+        def _cast_chunk_df(row_df: pd.DataFrame) -> pd.DataFrame:
+            return cast_row_df_to_entity_df(row_df, column_casters)
+
+        chunk_dfs = pd.read_csv(
+            file, dtype=str, keep_default_na=False, chunksize=chunk_size
+        )
+        for chunk_df in chunk_dfs:
+            yield chunk_df, _cast_chunk_df
+
+    def _iter_parquet_chunks(
+        self, table: Table, file: BinaryIO, chunk_size: int
+    ) -> Iterator[tuple[pd.DataFrame, Callable[[pd.DataFrame], pd.DataFrame]]]:
+        column_casters = compile_arrow_to_entity_column_casters(
+            {column.name: column.type for column in table.columns}
+        )
+
+        def _cast_chunk_df(arrow_df: pd.DataFrame) -> pd.DataFrame:
+            return cast_row_df_to_entity_df(arrow_df, column_casters)
+
+        parquet_file = pq.ParquetFile(file)
+        for record_batch in parquet_file.iter_batches(batch_size=chunk_size):
+            # keep native python values, pandas would coerce nullable ints to floats
+            chunk_df = pd.DataFrame(record_batch.to_pydict(), dtype=object)
+            for op_column_name in ["OP", "OP_REFERENCE"]:
+                if op_column_name in chunk_df.columns:
+                    chunk_df[op_column_name] = chunk_df[op_column_name].fillna("")
+            yield chunk_df, _cast_chunk_df
+
+    async def _import_chunk(
         self,
-        table_name_to_selected_column_names: dict[str, list[str]],
-        output_directory_path: str,
+        session: AsyncSession,
+        table: Table,
+        chunk_df: pd.DataFrame,
+        cast_chunk_df: Callable[[pd.DataFrame], pd.DataFrame],
+        row_offset: int,
     ):
-        schema_name = self._registry.metadata.schema
-        async_session = self._db.get_async_session()
-        async with async_session() as session:
-            for (
-                table_name,
-                selected_column_names,
-            ) in table_name_to_selected_column_names.items():
-                if len(selected_column_names) == 0:
-                    continue
-                full_table_name = (
-                    table_name if schema_name is None else f"{schema_name}.{table_name}"
-                )
-                table = self._registry.metadata.tables[full_table_name]
-                columns = [table.c[col_name] for col_name in selected_column_names]
-                column_name_to_type_map = {
-                    column.name: column.type for column in columns
-                }
-                statement = table.select().with_only_columns(*columns)
-                result = await session.execute(statement)
-                entity_dicts = result.mappings().all()
-                if len(entity_dicts) == 0:
-                    df = pd.DataFrame(columns=selected_column_names)
-                else:
-                    row_dicts = [
-                        cast_entity_dict_to_row_dict(
-                            entity_dict, column_name_to_type_map
-                        )
-                        for entity_dict in entity_dicts
-                    ]
-                    df = pd.DataFrame(
-                        row_dicts, dtype=str, columns=selected_column_names
+        if "OP" not in chunk_df.columns:
+            raise ValueError(f"Column `OP` is required at table `{table.name}`")
+        ops = chunk_df.pop("OP")
+        if "OP_REFERENCE" in chunk_df.columns:
+            op_references = chunk_df.pop("OP_REFERENCE")
+        else:
+            op_references = pd.Series("", index=chunk_df.index)
+
+        is_update = ops == "UPDATE"
+        is_delete = ops == "DELETE"
+        is_missing_op_reference = (is_update | is_delete) & (op_references == "")
+        if is_missing_op_reference.any():
+            i = row_offset + int(is_missing_op_reference.to_numpy().argmax())
+            raise ValueError(
+                f"Value is required at table `{table.name}`, column `OP_REFERENCE`, row `{i}`"
+            )
+
+        is_upsert = (ops == "INSERT") | is_update
+        entity_df = cast_chunk_df(chunk_df[is_upsert])
+        entity_ops = ops[is_upsert]
+        insert_entity_dicts = entity_df[entity_ops == "INSERT"].to_dict("records")
+        update_entity_dicts = (
+            entity_df[entity_ops == "UPDATE"]
+            .assign(OP_REFERENCE=op_references[is_update])
+            .to_dict("records")
+        )
+        delete_entity_dicts = [
+            {"OP_REFERENCE": op_reference} for op_reference in op_references[is_delete]
+        ]
+
+        # executemany: one round trip per batch instead of one per row
+        if len(insert_entity_dicts) > 0:
+            await session.execute(table.insert(), insert_entity_dicts)
+        if len(update_entity_dicts) > 0:
+            statement = table.update().where(
+                table.c["reference"] == bindparam("OP_REFERENCE")
+            )
+            await session.execute(statement, update_entity_dicts)
+        if len(delete_entity_dicts) > 0:
+            statement = table.delete().where(
+                table.c["reference"] == bindparam("OP_REFERENCE")
+            )
+            await session.execute(statement, delete_entity_dicts)
+
+    def export_files(
+        self,
+        table_name_to_selected_column_names: dict[str, list[str]],
+        file_format: DataFileFormatEnum = DataFileFormatEnum.CSV,
+        yield_per: int = 1000,
+        max_workers: int = 1,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> AsyncIterator[bytes]:
+        table_exports = []
+        for (
+            table_name,
+            selected_column_names,
+        ) in table_name_to_selected_column_names.items():
+            if len(selected_column_names) == 0:
+                continue
+            table = self._get_table(table_name)
+            columns = []
+            for col_name in selected_column_names:
+                if col_name not in table.c:
+                    raise ValueError(
+                        f"Column `{col_name}` is not found in table `{table_name}`"
                     )
-                table_file_path = os.path.join(
-                    output_directory_path, f"{table_name}.csv"
+                columns.append(table.c[col_name])
+            column_name_to_type_map = {column.name: column.type for column in columns}
+            if file_format == DataFileFormatEnum.PARQUET:
+                write_entry = self._write_parquet_entry(column_name_to_type_map)
+                # parquet pages are compressed already, deflating them again is wasted CPU
+                compress_type = zipfile.ZIP_STORED
+            else:
+                write_entry = self._write_csv_entry(column_name_to_type_map)
+                compress_type = zipfile.ZIP_DEFLATED
+            statement = (
+                table.select()
+                .with_only_columns(*columns)
+                .execution_options(yield_per=yield_per)
+            )
+            table_exports.append(
+                _TableExport(
+                    table_name=table_name,
+                    entry_name=f"{table_name}.{file_format.value}",
+                    compress_type=compress_type,
+                    statement=statement,
+                    write_entry=write_entry,
                 )
-                df.to_csv(table_file_path, index=False)
+            )
+        # validation errors are raised above, before any byte is streamed
+        if max_workers > 1:
+            return self._iter_parallel_zip_chunks(
+                table_exports, max_workers, on_progress
+            )
+        return self._iter_zip_chunks(table_exports, on_progress)
+
+    async def _iter_zip_chunks(
+        self,
+        table_exports: list[_TableExport],
+        on_progress: Optional[ProgressCallback],
+    ) -> AsyncIterator[bytes]:
+        zip_buffer = _ZipStreamBuffer()
+        async_session = self._db.get_async_session()
+        async with async_session() as session:
+            with zipfile.ZipFile(zip_buffer, mode="w") as zip_file:
+                for table_export in table_exports:
+                    result = await session.stream(table_export.statement)
+                    row_count = 0
+                    with zip_file.open(
+                        self._get_zip_info(table_export), mode="w", force_zip64=True
+                    ) as entry_file:
+                        async for row_count in table_export.write_entry(
+                            entry_file, result
+                        ):
+                            if on_progress is not None:
+                                on_progress(table_export.table_name, row_count, False)
+                            if zip_buffer.has_data():
+                                yield zip_buffer.pop()
+                    if on_progress is not None:
+                        on_progress(table_export.table_name, row_count, True)
+                    if zip_buffer.has_data():
+                        yield zip_buffer.pop()
+            if zip_buffer.has_data():
+                yield zip_buffer.pop()
+
+    async def _iter_parallel_zip_chunks(
+        self,
+        table_exports: list[_TableExport],
+        max_workers: int,
+        on_progress: Optional[ProgressCallback],
+    ) -> AsyncIterator[bytes]:
+        """
+        Tables are dumped concurrently into spooled temporary files, each on its own
+        connection, and appended to the archive in completion order.
+        """
+        semaphore = asyncio.Semaphore(max_workers)
+        tasks = [
+            asyncio.create_task(
+                self._export_table_to_spooled_file(semaphore, table_export, on_progress)
+            )
+            for table_export in table_exports
+        ]
+        zip_buffer = _ZipStreamBuffer()
+        try:
+            with zipfile.ZipFile(zip_buffer, mode="w") as zip_file:
+                for task in asyncio.as_completed(tasks):
+                    table_export, spooled_file = await task
+                    with spooled_file, zip_file.open(
+                        self._get_zip_info(table_export), mode="w", force_zip64=True
+                    ) as entry_file:
+                        while True:
+                            data = spooled_file.read(SPOOLED_FILE_COPY_SIZE)
+                            if len(data) == 0:
+                                break
+                            await asyncio.to_thread(entry_file.write, data)
+                            if zip_buffer.has_data():
+                                yield zip_buffer.pop()
+                    if zip_buffer.has_data():
+                        yield zip_buffer.pop()
+            if zip_buffer.has_data():
+                yield zip_buffer.pop()
+        finally:
+            # the client may disconnect halfway, do not leave workers behind
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, tuple):
+                    result[1].close()
+
+    async def _export_table_to_spooled_file(
+        self,
+        semaphore: asyncio.Semaphore,
+        table_export: _TableExport,
+        on_progress: Optional[ProgressCallback],
+    ) -> tuple[_TableExport, tempfile.SpooledTemporaryFile]:
+        spooled_file = tempfile.SpooledTemporaryFile(
+            max_size=SPOOLED_FILE_MAX_MEMORY_SIZE
+        )
+        try:
+            async_session = self._db.get_async_session()
+            async with semaphore, async_session() as session:
+                result = await session.stream(table_export.statement)
+                row_count = 0
+                async for row_count in table_export.write_entry(spooled_file, result):
+                    if on_progress is not None:
+                        on_progress(table_export.table_name, row_count, False)
+        except BaseException:
+            spooled_file.close()
+            raise
+        if on_progress is not None:
+            on_progress(table_export.table_name, row_count, True)
+        spooled_file.seek(0)
+        return table_export, spooled_file
+
+    def _write_csv_entry(self, column_name_to_type_map: dict) -> EntryWriter:
+        column_names = list(column_name_to_type_map.keys())
+        column_casters = compile_entity_to_row_column_casters(column_name_to_type_map)
+
+        def _encode(text_file: io.TextIOWrapper, rows: list) -> int:
+            entity_df = pd.DataFrame(rows, columns=column_names, dtype=object)
+            df = cast_entity_df_to_row_df(entity_df, column_casters)
+            df.to_csv(text_file, index=False, header=False)
+            text_file.flush()
+            return len(df)
+
+        async def _write(
+            binary_file: BinaryIO, result: AsyncResult
+        ) -> AsyncIterator[int]:
+            text_file = io.TextIOWrapper(binary_file, encoding="utf-8", newline="")
+            try:
+                pd.DataFrame(columns=column_names).to_csv(text_file, index=False)
+                row_count = 0
+                async for rows in result.partitions():
+                    row_count += await asyncio.to_thread(_encode, text_file, rows)
+                    yield row_count
+                text_file.flush()
+            finally:
+                # leave closing the underlying file to the caller
+                text_file.detach()
+
+        return _write
+
+    def _write_parquet_entry(self, column_name_to_type_map: dict) -> EntryWriter:
+        column_names = list(column_name_to_type_map.keys())
+        column_casters = compile_entity_to_arrow_column_casters(column_name_to_type_map)
+        arrow_schema = get_arrow_schema(column_name_to_type_map)
+
+        def _encode(parquet_writer: pq.ParquetWriter, rows: list) -> int:
+            entity_df = pd.DataFrame(rows, columns=column_names, dtype=object)
+            arrow_df = cast_entity_df_to_row_df(entity_df, column_casters)
+            record_batch = pa.RecordBatch.from_arrays(
+                [
+                    pa.array(arrow_df[field.name], type=field.type)
+                    for field in arrow_schema
+                ],
+                schema=arrow_schema,
+            )
+            parquet_writer.write_batch(record_batch)
+            return record_batch.num_rows
+
+        async def _write(
+            binary_file: BinaryIO, result: AsyncResult
+        ) -> AsyncIterator[int]:
+            with pq.ParquetWriter(
+                binary_file, arrow_schema, compression="zstd"
+            ) as parquet_writer:
+                row_count = 0
+                # one row group per partition
+                async for rows in result.partitions():
+                    row_count += await asyncio.to_thread(_encode, parquet_writer, rows)
+                    yield row_count
+
+        return _write
+
+    def _get_zip_info(self, table_export: _TableExport) -> zipfile.ZipInfo:
+        zip_info = zipfile.ZipInfo(
+            table_export.entry_name, time.localtime(time.time())[:6]
+        )
+        zip_info.compress_type = table_export.compress_type
+        return zip_info
+
+    def _get_table_tiers(self, tables: list[Table]) -> list[list[Table]]:
+        table_to_tier: dict[Table, int] = {}
+        for table in self._registry.metadata.sorted_tables:
+            table_to_tier[table] = max(
+                [
+                    table_to_tier[foreign_key.column.table] + 1
+                    for foreign_key in table.foreign_keys
+                    if foreign_key.column.table in table_to_tier
+                ],
+                default=0,
+            )
+        tiers: dict[int, list[Table]] = {}
+        for table in tables:
+            tiers.setdefault(table_to_tier.get(table, 0), []).append(table)
+        return [tiers[tier] for tier in sorted(tiers.keys())]
+
+    def _get_table(self, table_name: str) -> Table:
+        schema_name = self._registry.metadata.schema
+        full_table_name = (
+            table_name if schema_name is None else f"{schema_name}.{table_name}"
+        )
+        table = self._registry.metadata.tables.get(full_table_name)
+        if table is None:
+            raise ValueError(f"Table `{table_name}` is not found")
+        return table
+
+    def _get_file_format(self, file_extension: str) -> DataFileFormatEnum:
+        try:
+            return DataFileFormatEnum(file_extension.lstrip(".").lower())
+        except ValueError:
+            raise ValueError(f"Unsupported file extension: `{file_extension}`")
+
+
+async def _gather_or_cancel(coroutines: list):
+    tasks = [asyncio.create_task(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """
+    Unseekable sink for `zipfile.ZipFile`, so the archive can be flushed to the
+    client chunk by chunk instead of being materialized on disk.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        if len(b) > 0:
+            self._chunks.append(bytes(b))
+        return len(b)
+
+    def has_data(self) -> bool:
+        return len(self._chunks) > 0
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+BOOLEAN_STRING_TO_VALUE_MAP = {
+    **{
+        true_string: True
+        for true_string in [
+            "true",
+            "1",
+            "t",
+            "y",
+            "yes",
+            "on",
+            "enable",
+            "enabled",
+            "active",
+        ]
+    },
+    **{
+        false_string: False
+        for false_string in [
+            "false",
+            "0",
+            "f",
+            "n",
+            "no",
+            "off",
+            "disable",
+            "disabled",
+            "inactive",
+        ]
+    },
+}
+
+
+def _cast_boolean_strings(column_name: str) -> ColumnCaster:
+    def _cast(raw_values: pd.Series) -> pd.Series:
+        values = raw_values.str.lower().map(BOOLEAN_STRING_TO_VALUE_MAP)
+        is_invalid = values.isna()
+        if is_invalid.any():
+            raw_value = raw_values[is_invalid].iloc[0]
+            raise ValueError(
+                f"Invalid value for boolean column `{column_name}`: {raw_value}"
+            )
+        return values.astype(object)
+
+    return _cast
+
+
+def _cast_integer_strings(column_name: str) -> ColumnCaster:
+    def _cast(raw_values: pd.Series) -> pd.Series:
+        values = pd.to_numeric(raw_values)
+        if len(values) > 0 and not pd.api.types.is_integer_dtype(values):
+            raise ValueError(f"Invalid value for integer column `{column_name}`")
+        return values
+
+    return _cast
+
+
+def _cast_float_strings(raw_values: pd.Series) -> pd.Series:
+    return pd.to_numeric(raw_values).astype(float)
+
 
+def _cast_datetime_strings(raw_values: pd.Series) -> pd.Series:
+    values = pd.to_datetime(
+        raw_values.str.replace("Z", "", regex=False),
+        errors="coerce",
+        format="ISO8601",
+    )
+    return values.astype(object).where(values.notna(), None)
 
-def cast_row_dict_to_entity_dict(row_dict: dict, column_name_to_type_map: dict) -> dict:
-    entity_dict = {}
-    for column_name, raw_value in row_dict.items():
-        column_type = column_name_to_type_map[column_name]
+
+def _cast_json_strings(raw_values: pd.Series) -> pd.Series:
+    return raw_values.map(json.loads)
+
+
+def _cast_decimal_strings(raw_values: pd.Series) -> pd.Series:
+    return raw_values.map(Decimal)
+
+
+def _keep_values(values: pd.Series) -> pd.Series:
+    return values
+
+
+def compile_row_to_entity_column_casters(
+    column_name_to_type_map: dict,
+) -> dict[str, ColumnCaster]:
+    column_casters = {}
+    for column_name, column_type in column_name_to_type_map.items():
         if isinstance(column_type, types.Boolean):
-            if raw_value.lower() in [
-                "true",
-                "1",
-                "t",
-                "y",
-                "yes",
-                "on",
-                "enable",
-                "enabled",
-                "active",
-                "enabled",
-            ]:
-                entity_dict[column_name] = True
-            elif raw_value.lower() in [
-                "false",
-                "0",
-                "f",
-                "n",
-                "no",
-                "off",
-                "disable",
-                "disabled",
-                "inactive",
-                "disabled",
-            ]:
-                entity_dict[column_name] = False
-            else:
-                raise ValueError(
-                    f"Invalid value for boolean column `{column_name}`: {raw_value}"
-                )
+            column_casters[column_name] = _cast_boolean_strings(column_name)
         elif isinstance(column_type, types.Integer):
-            entity_dict[column_name] = int(raw_value)
+            column_casters[column_name] = _cast_integer_strings(column_name)
         elif isinstance(column_type, types.Float):
-            entity_dict[column_name] = float(raw_value)
+            column_casters[column_name] = _cast_float_strings
         elif isinstance(column_type, types.DateTime):
-            try:
-                iso_string = raw_value.replace("Z", "")
-                entity_dict[column_name] = datetime.fromisoformat(iso_string)
-            except ValueError as e:
-                entity_dict[column_name] = None
-        elif isinstance(column_type, types.String):
-            entity_dict[column_name] = str(raw_value)
-        elif isinstance(column_type, types.Text):
-            entity_dict[column_name] = str(raw_value)
+            column_casters[column_name] = _cast_datetime_strings
+        elif isinstance(column_type, (types.String, types.Text)):
+            column_casters[column_name] = _keep_values
         elif isinstance(column_type, types.JSON):
-            entity_dict[column_name] = json.loads(raw_value)
+            column_casters[column_name] = _cast_json_strings
         elif isinstance(column_type, types.DECIMAL):
-            entity_dict[column_name] = Decimal(raw_value)
+            column_casters[column_name] = _cast_decimal_strings
         else:
             raise TypeError(f"Unsupported column type: {column_type}")
-    return entity_dict
+    return column_casters
+
+
+def _cast_booleans(values: pd.Series) -> pd.Series:
+    return values.map({True: "true", False: "false"})
 
 
-def cast_entity_dict_to_row_dict(
-    entity_dict: dict, column_name_to_type_map: dict
-) -> dict:
-    row_dict = {}
-    for column_name, raw_value in entity_dict.items():
-        if raw_value is None:
-            row_dict[column_name] = None
+def _cast_numbers(values: pd.Series) -> pd.Series:
+    return values.astype(str)
+
+
+def _cast_datetimes(values: pd.Series) -> pd.Series:
+    datetimes = pd.to_datetime(values)
+    # follow `datetime.isoformat()`, which omits zero microseconds
+    fractions = datetimes.dt.strftime(".%f").where(datetimes.dt.microsecond != 0, "")
+    return datetimes.dt.strftime("%Y-%m-%dT%H:%M:%S") + fractions + "Z"
+
+
+def _cast_jsons(values: pd.Series) -> pd.Series:
+    return values.map(json.dumps)
+
+
+def _cast_decimals(values: pd.Series) -> pd.Series:
+    str_values = values.map("{:f}".format)  # to remove scientific notation
+    has_point = str_values.str.contains(".", regex=False)
+    return str_values.where(~has_point, str_values.str.rstrip("0").str.rstrip("."))
+
+
+def compile_entity_to_row_column_casters(
+    column_name_to_type_map: dict,
+) -> dict[str, ColumnCaster]:
+    column_casters = {}
+    for column_name, column_type in column_name_to_type_map.items():
+        if isinstance(column_type, types.Boolean):
+            column_casters[column_name] = _cast_booleans
+        elif isinstance(column_type, (types.Integer, types.Float)):
+            column_casters[column_name] = _cast_numbers
+        elif isinstance(column_type, types.DateTime):
+            column_casters[column_name] = _cast_datetimes
+        elif isinstance(column_type, (types.String, types.Text)):
+            column_casters[column_name] = _keep_values
+        elif isinstance(column_type, types.JSON):
+            column_casters[column_name] = _cast_jsons
+        elif isinstance(column_type, types.DECIMAL):
+            column_casters[column_name] = _cast_decimals
         else:
-            column_type = column_name_to_type_map[column_name]
-            if isinstance(column_type, types.Boolean):
-                row_dict[column_name] = "true" if raw_value is True else "false"
-            elif isinstance(column_type, types.Integer):
-                row_dict[column_name] = str(raw_value)
-            elif isinstance(column_type, types.Float):
-                row_dict[column_name] = str(raw_value)
-            elif isinstance(column_type, types.DateTime):
-                row_dict[column_name] = f"{raw_value.isoformat()}Z"
-            elif isinstance(column_type, types.String):
-                row_dict[column_name] = raw_value
-            elif isinstance(column_type, types.Text):
-                row_dict[column_name] = raw_value
-            elif isinstance(column_type, types.JSON):
-                row_dict[column_name] = json.dumps(raw_value)
-            elif isinstance(column_type, types.DECIMAL):
-                str_value = f"{raw_value:f}"  # to remove scientific notation
-                if "." in str_value:
-                    str_value = str_value.rstrip("0").rstrip(".")
-                row_dict[column_name] = str_value
-            else:
-                raise TypeError(f"Unsupported column type: {column_type}")
-    return row_dict
+            raise TypeError(f"Unsupported column type: {column_type}")
+    return column_casters
+
+
+def cast_row_df_to_entity_df(
+    row_df: pd.DataFrame, column_casters: dict[str, ColumnCaster]
+) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            column_name: column_casters[column_name](row_df[column_name])
+            for column_name in row_df.columns
+        },
+        index=row_df.index,
+    )
+
+
+def cast_entity_df_to_row_df(
+    entity_df: pd.DataFrame, column_casters: dict[str, ColumnCaster]
+) -> pd.DataFrame:
+    row_df = pd.DataFrame(
+        index=entity_df.index, columns=entity_df.columns, dtype=object
+    )
+    for column_name in entity_df.columns:
+        values = entity_df[column_name]
+        is_not_null = values.notna()
+        if is_not_null.any():
+            row_df.loc[is_not_null, column_name] = column_casters[column_name](
+                values[is_not_null]
+            )
+    return row_df
+
+
+def get_arrow_type(column_type) -> pa.DataType:
+    if isinstance(column_type, types.Boolean):
+        return pa.bool_()
+    elif isinstance(column_type, types.Integer):
+        return pa.int64()
+    elif isinstance(column_type, types.Float):
+        return pa.float64()
+    elif isinstance(column_type, types.DateTime):
+        return pa.timestamp("us")
+    elif isinstance(column_type, (types.String, types.Text)):
+        return pa.string()
+    elif isinstance(column_type, types.JSON):
+        # arrow has no portable JSON type, so it is stored as serialized text
+        return pa.string()
+    elif isinstance(column_type, types.DECIMAL):
+        if column_type.precision is None or column_type.scale is None:
+            return pa.string()
+        elif column_type.precision <= 38:
+            return pa.decimal128(column_type.precision, column_type.scale)
+        return pa.decimal256(column_type.precision, column_type.scale)
+    else:
+        raise TypeError(f"Unsupported column type: {column_type}")
+
+
+def get_arrow_schema(column_name_to_type_map: dict) -> pa.Schema:
+    return pa.schema(
+        [
+            pa.field(column_name, get_arrow_type(column_type))
+            for column_name, column_type in column_name_to_type_map.items()
+        ]
+    )
+
+
+def compile_arrow_to_entity_column_casters(
+    column_name_to_type_map: dict,
+) -> dict[str, ColumnCaster]:
+    column_casters = {}
+    for column_name, column_type in column_name_to_type_map.items():
+        arrow_type = get_arrow_type(column_type)
+        if isinstance(column_type, types.JSON):
+            column_casters[column_name] = _cast_nullable(_cast_json_strings)
+        elif isinstance(column_type, types.DECIMAL) and arrow_type == pa.string():
+            column_casters[column_name] = _cast_nullable(_cast_decimal_strings)
+        else:
+            column_casters[column_name] = _keep_values
+    return column_casters
+
+
+def compile_entity_to_arrow_column_casters(
+    column_name_to_type_map: dict,
+) -> dict[str, ColumnCaster]:
+    column_casters = {}
+    for column_name, column_type in column_name_to_type_map.items():
+        arrow_type = get_arrow_type(column_type)
+        if isinstance(column_type, types.JSON):
+            column_casters[column_name] = _cast_jsons
+        elif isinstance(column_type, types.DECIMAL) and arrow_type == pa.string():
+            column_casters[column_name] = _cast_decimals
+        else:
+            column_casters[column_name] = _keep_values
+    return column_casters
+
+
+def _cast_nullable(column_caster: ColumnCaster) -> ColumnCaster:
+    def _cast(values: pd.Series) -> pd.Series:
+        casted_values = pd.Series(None, index=values.index, dtype=object)
+        is_not_null = values.notna()
+        if is_not_null.any():
+            casted_values[is_not_null] = column_caster(values[is_not_null])
+        return casted_values
+
+    return _cast
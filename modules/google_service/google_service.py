@@ -2,10 +2,12 @@ from contextlib import contextmanager
 from typing import Optional, Tuple
 
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import Resource, build
 from pydantic import BaseModel
 
 from modules.google_service.models.logical_sheet import LogicalColumn, LogicalSheet
+from modules.utils.import_utils import ImportUtils
+
+discovery = ImportUtils.lazy_import("googleapiclient.discovery")
 
 
 class DriveFolderCollection(BaseModel):
@@ -28,11 +30,11 @@ class GoogleService:
     def __init__(self, credentials: Credentials):
         self._credentials = credentials
         # https://developers.google.com/drive/api/guides/about-files
-        self._drive_service: Resource = build(
+        self._drive_service: discovery.Resource = discovery.build(
             serviceName="drive", version="v3", credentials=credentials
         )
         # https://developers.google.com/sheets/api/reference/rest/v4/spreadsheets
-        self._sheets_service: Resource = build(
+        self._sheets_service: discovery.Resource = discovery.build(
             serviceName="sheets", version="v4", credentials=credentials
         )
 
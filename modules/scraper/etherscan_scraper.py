@@ -3,9 +3,11 @@ from datetime import datetime, timezone
 from typing import Optional, TypedDict
 
 import httpx
-from bs4 import BeautifulSoup
 
 from modules.utils.cache_utils import FileSystemCache
+from modules.utils.import_utils import ImportUtils
+
+bs4 = ImportUtils.lazy_import("bs4")
 
 
 class EtherscanScraper:
@@ -94,7 +96,7 @@ class EtherscanScraper:
                 await asyncio.sleep(0.7)  # cool down
             htmls.append(response_html)
             if page_count is None:
-                soup = BeautifulSoup(response_html, "html.parser")
+                soup = bs4.BeautifulSoup(response_html, "html.parser")
                 page_element = soup.select_one(
                     "#ContentPlaceHolder1_pageRecords > nav > ul > li:nth-child(3) > span"
                 )
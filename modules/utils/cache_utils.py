@@ -1,8 +1,13 @@
+import asyncio
 import os
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Hashable, Optional, TypeVar
 
 from modules.utils.file_system_utils import FileSystemUtils
 
+T = TypeVar("T")
+
 
 class FileSystemCache:
     def __init__(self, base_dir: str):
@@ -20,3 +25,65 @@ class FileSystemCache:
         FileSystemUtils.ensure_directory(os.path.dirname(file_path))
         with open(file_path, "w") as f:
             f.write(value)
+
+
+class SingleFlightCache(Generic[T]):
+    """
+    Concurrent callers of the same key share one in-flight call, and its result is
+    kept for `ttl_seconds` afterwards. Failures are not cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 0.0, max_size: int = 1024):
+        self._ttl_seconds = ttl_seconds
+        self._max_size = max_size
+        self._key_to_task_map: dict[Hashable, asyncio.Task] = {}
+        self._key_to_entry_map: OrderedDict[Hashable, tuple[float, T]] = OrderedDict()
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        entry = self._key_to_entry_map.get(key)
+        if entry is not None:
+            expired_time, value = entry
+            if time.monotonic() < expired_time:
+                return value
+            del self._key_to_entry_map[key]
+
+        loop = asyncio.get_running_loop()
+        task = self._key_to_task_map.get(key)
+        # tasks can only be shared within their own event loop
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._fetch(key, fetch))
+            self._key_to_task_map[key] = task
+        # a cancelled caller must not cancel the call shared with the others
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: Hashable):
+        self._key_to_entry_map.pop(key, None)
+        # a call in flight may have read the outdated value, so later callers
+        # start a new one and its result is not kept
+        self._key_to_task_map.pop(key, None)
+
+    def invalidate_many(self, predicate: Callable[[Hashable], bool]):
+        keys = [
+            key
+            for key in (*self._key_to_entry_map, *self._key_to_task_map)
+            if predicate(key)
+        ]
+        for key in keys:
+            self.invalidate(key)
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        try:
+            value = await fetch()
+            is_current = self._key_to_task_map.get(key) is asyncio.current_task()
+            if self._ttl_seconds > 0 and is_current:
+                self._key_to_entry_map[key] = (
+                    time.monotonic() + self._ttl_seconds,
+                    value,
+                )
+                self._key_to_entry_map.move_to_end(key)
+                while len(self._key_to_entry_map) > self._max_size:
+                    self._key_to_entry_map.popitem(last=False)
+            return value
+        finally:
+            if self._key_to_task_map.get(key) is asyncio.current_task():
+                del self._key_to_task_map[key]
@@ -0,0 +1,83 @@
+import importlib
+import os
+import subprocess
+import sys
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """
+    Stand-in for a heavy module which is only imported once one of its attributes
+    is accessed.
+    """
+
+    def __getattr__(self, name: str):
+        module = importlib.import_module(self.__name__)
+        value = getattr(module, name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self) -> list[str]:
+        return dir(importlib.import_module(self.__name__))
+
+
+class ImportUtils:
+    @staticmethod
+    def lazy_import(module_name: str) -> ModuleType:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            return module
+        return LazyModule(module_name)
+
+    @staticmethod
+    def is_imported(module_name: str) -> bool:
+        return module_name in sys.modules
+
+    @staticmethod
+    def profile_import_time(module_name: str) -> list[dict]:
+        """
+        Import the module in a fresh interpreter with `-X importtime` and return the
+        breakdown ordered by cumulative time.
+        """
+        completed_process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+            cwd=os.getcwd(),
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+        )
+        if completed_process.returncode != 0:
+            raise ValueError(
+                f"Failed to import `{module_name}`: {completed_process.stderr[-1000:]}"
+            )
+        records = []
+        for line in completed_process.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            self_us, cumulative_us, imported_name = line[len("import time:") :].split(
+                "|"
+            )
+            if not self_us.strip().isdigit():
+                # header line
+                continue
+            records.append(
+                {
+                    "module_name": imported_name.strip(),
+                    "depth": (len(imported_name) - len(imported_name.lstrip()) - 1)
+                    // 2,
+                    "self_seconds": int(self_us) / 1e6,
+                    "cumulative_seconds": int(cumulative_us) / 1e6,
+                }
+            )
+        records.sort(key=lambda record: record["cumulative_seconds"], reverse=True)
+        return records
+
+    @staticmethod
+    def format_import_time_report(records: list[dict], limit: int = 30) -> str:
+        lines = [f"{'cumulative':>10} {'self':>10}  module"]
+        for record in records[:limit]:
+            lines.append(
+                f"{record['cumulative_seconds']:>9.3f}s {record['self_seconds']:>9.3f}s  "
+                f"{'  ' * record['depth']}{record['module_name']}"
+            )
+        return "\n".join(lines)
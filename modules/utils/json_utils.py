@@ -4,7 +4,14 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Optional
 
-import pandas as pd
+from modules.utils.import_utils import ImportUtils
+
+pd = ImportUtils.lazy_import("pandas")
+
+
+def _is_series(obj) -> bool:
+    # a series cannot exist before pandas is imported, so do not import it here
+    return ImportUtils.is_imported("pandas") and isinstance(obj, pd.Series)
 
 
 class JSONUtils:
@@ -16,7 +23,7 @@ class JSONUtils:
                 return obj.replace(tzinfo=None).isoformat()
             elif isinstance(obj, timedelta):
                 return str(obj)
-            elif isinstance(obj, pd.Series):
+            elif _is_series(obj):
                 return obj.to_dict()
             return super().default(obj)
 
@@ -31,7 +38,7 @@ class JSONUtils:
             new_key = f"{parent_key}{sep}{k}" if parent_key else k
             if isinstance(v, dict):
                 items.extend(JSONUtils.flatten(v, new_key, sep=sep).items())
-            elif isinstance(v, pd.Series):
+            elif _is_series(v):
                 items.append((new_key, v.to_dict()))
             else:
                 items.append((new_key, v))
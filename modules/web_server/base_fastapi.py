@@ -1,3 +1,6 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI, Request, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
@@ -11,6 +14,10 @@ from modules.web_server.exceptions import (
     UnauthenticatedError,
     UnauthorizedError,
 )
+from modules.web_server.instrumentation import (
+    Instrumentation,
+    InstrumentationMiddleware,
+)
 from modules.web_server.routers import system
 from modules.web_server.schemas.response import ErrorSchema, ResponseSchema, StatusEnum
 
@@ -20,8 +27,13 @@ class BaseFastAPI(FastAPI):
         self,
         base_config: BaseConfigSchema,
         *args,
+        instrumentation: Optional[Instrumentation] = None,
         **kwargs,
     ):
+        if instrumentation is not None:
+            kwargs["lifespan"] = self.wrap_instrumented_lifespan(
+                instrumentation, kwargs.get("lifespan")
+            )
         super().__init__(
             *args,
             version=(
@@ -29,9 +41,30 @@ class BaseFastAPI(FastAPI):
             ),
             **kwargs,
         )
+        self.state.instrumentation = instrumentation
+        if instrumentation is not None:
+            self.add_middleware(
+                InstrumentationMiddleware, instrumentation=instrumentation
+            )
         self.include_router(system.router)
         self.add_error_handlers()
 
+    @staticmethod
+    def wrap_instrumented_lifespan(instrumentation: Instrumentation, lifespan=None):
+        @asynccontextmanager
+        async def instrumented_lifespan(app: FastAPI):
+            await instrumentation.start()
+            try:
+                if lifespan is None:
+                    yield
+                else:
+                    async with lifespan(app):
+                        yield
+            finally:
+                await instrumentation.stop()
+
+        return instrumented_lifespan
+
     def add_error_handlers(self):
         @self.exception_handler(RequestValidationError)
         async def request_validation_error_handler(
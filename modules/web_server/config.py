@@ -8,6 +8,17 @@ def get_web_server_config() -> WebServerConfigSchema:
     base_config = get_base_config()
 
     PORT = int(get_env("PORT", "10000"))
+    WORKER_COUNT = int(get_env("WEB_CONCURRENCY", "1"))
+    WORKER_MAX_REQUESTS = int(get_env("WORKER_MAX_REQUESTS", "0"))
+    GRACEFUL_SHUTDOWN_TIMEOUT_SECONDS = int(
+        get_env("GRACEFUL_SHUTDOWN_TIMEOUT_SECONDS", "30")
+    )
+    IMPORT_TIME_REPORT_ENABLED = (
+        get_env("IMPORT_TIME_REPORT_ENABLED", "false").lower() == "true"
+    )
+    INSTRUMENTATION_ENABLED = (
+        get_env("INSTRUMENTATION_ENABLED", "false").lower() == "true"
+    )
 
     if base_config.ENV == EnvEnum.LOCAL:
         pass
@@ -18,4 +29,9 @@ def get_web_server_config() -> WebServerConfigSchema:
 
     return WebServerConfigSchema(
         PORT=PORT,
+        WORKER_COUNT=WORKER_COUNT,
+        WORKER_MAX_REQUESTS=WORKER_MAX_REQUESTS,
+        GRACEFUL_SHUTDOWN_TIMEOUT_SECONDS=GRACEFUL_SHUTDOWN_TIMEOUT_SECONDS,
+        IMPORT_TIME_REPORT_ENABLED=IMPORT_TIME_REPORT_ENABLED,
+        INSTRUMENTATION_ENABLED=INSTRUMENTATION_ENABLED,
     )
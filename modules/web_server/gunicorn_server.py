@@ -0,0 +1,46 @@
+from typing import Optional
+
+from gunicorn.app.base import BaseApplication
+from gunicorn.util import import_app
+
+
+class GunicornServer(BaseApplication):
+    """
+    Pre-fork process manager running uvicorn workers.
+
+    The app is imported inside each worker (no preloading), so engines, locks and
+    caches created by the lifespan are never shared across processes. `SIGHUP`
+    gracefully replaces the workers, `SIGTERM` drains them within
+    `graceful_timeout`.
+    """
+
+    def __init__(
+        self,
+        app_import_path: str,
+        port: int,
+        worker_count: int,
+        graceful_timeout: int,
+        max_requests: int = 0,
+        options: Optional[dict] = None,
+    ):
+        self._app_import_path = app_import_path
+        self._options = {
+            "bind": f"0.0.0.0:{port}",
+            "workers": worker_count,
+            "worker_class": "uvicorn.workers.UvicornWorker",
+            "graceful_timeout": graceful_timeout,
+            "max_requests": max_requests,
+            # spread worker recycling so the workers do not restart at once
+            "max_requests_jitter": max_requests // 10,
+            "preload_app": False,
+            "accesslog": "-",
+            **(options or {}),
+        }
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self._options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return import_app(self._app_import_path)
@@ -0,0 +1,312 @@
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Callable, Optional
+
+import httpx
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from modules.database.relational_database import RelationalDatabase
+
+if TYPE_CHECKING:
+    # motor is heavy to import and only needed when mongo is configured
+    from modules.database.async_mongo_client import AsyncMongoClient
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._label_values_to_series_map: dict[tuple[str, ...], dict] = {}
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._label_values_to_series_map.get(label_values)
+            if series is None:
+                series = {
+                    "bucket_counts": [0] * len(self.buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+                self._label_values_to_series_map[label_values] = series
+            for i, bucket in enumerate(self.buckets):
+                if value <= bucket:
+                    series["bucket_counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for label_values, series in self._label_values_to_series_map.items():
+                labels = [
+                    f'{label_name}="{_escape_label_value(label_value)}"'
+                    for label_name, label_value in zip(self.label_names, label_values)
+                ]
+                for bucket, bucket_count in zip(self.buckets, series["bucket_counts"]):
+                    bucket_labels = ",".join([*labels, f'le="{bucket}"'])
+                    lines.append(
+                        f"{self.name}_bucket{{{bucket_labels}}} {bucket_count}"
+                    )
+                inf_labels = ",".join([*labels, 'le="+Inf"'])
+                lines.append(f"{self.name}_bucket{{{inf_labels}}} {series['count']}")
+                suffix = f"{{{','.join(labels)}}}" if len(labels) > 0 else ""
+                lines.append(f"{self.name}_sum{suffix} {series['sum']}")
+                lines.append(f"{self.name}_count{suffix} {series['count']}")
+        return lines
+
+
+class Gauge:
+    """
+    Value read from `collect` at render time, for state owned by someone else.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        collect: Callable[[], float],
+        metric_type: str = "gauge",
+    ):
+        self.name = name
+        self.description = description
+        self.collect = collect
+        self.metric_type = metric_type
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.metric_type}",
+            f"{self.name} {self.collect()}",
+        ]
+
+
+class _RequestStats:
+    def __init__(self):
+        self.db_statement_count = 0
+        self.db_seconds = 0.0
+
+
+_request_stats_var: ContextVar[Optional[_RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+class Instrumentation:
+    """
+    Opt-in, in-process metrics rendered in the Prometheus text format.
+    """
+
+    def __init__(self, event_loop_lag_interval_seconds: float = 0.5):
+        self._event_loop_lag_interval_seconds = event_loop_lag_interval_seconds
+        self._event_loop_lag_task: Optional[asyncio.Task] = None
+        self._is_httpx_instrumented = False
+        self.http_request_duration = Histogram(
+            "http_request_duration_seconds",
+            "Latency of handled requests",
+            ("method", "route", "status"),
+        )
+        self.http_request_db_statements = Histogram(
+            "http_request_db_statements",
+            "SQL statements executed per request",
+            ("method", "route"),
+            buckets=COUNT_BUCKETS,
+        )
+        self.http_request_db_duration = Histogram(
+            "http_request_db_duration_seconds",
+            "Time spent in SQL statements per request",
+            ("method", "route"),
+        )
+        self.db_statement_duration = Histogram(
+            "db_statement_duration_seconds", "Latency of SQL statements"
+        )
+        self.http_client_request_duration = Histogram(
+            "http_client_request_duration_seconds",
+            "Latency of outbound HTTP requests",
+            ("method", "host", "status"),
+        )
+        self.event_loop_lag = Histogram(
+            "event_loop_lag_seconds", "Delay of scheduled event loop callbacks"
+        )
+        self.gauges: list[Gauge] = []
+
+    def instrument_database(self, database: RelationalDatabase):
+        sync_engine = database.async_engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, params, context, many):
+            conn.info.setdefault("instrumentation_started_times", []).append(
+                time.perf_counter()
+            )
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, params, context, many):
+            started_time = conn.info["instrumentation_started_times"].pop()
+            seconds = time.perf_counter() - started_time
+            self.db_statement_duration.observe(seconds)
+            request_stats = _request_stats_var.get()
+            if request_stats is not None:
+                request_stats.db_statement_count += 1
+                request_stats.db_seconds += seconds
+
+    def instrument_mongo_client(self, mongo_client: "AsyncMongoClient"):
+        pool_stats = mongo_client.pool_stats
+        self.gauges.extend(
+            [
+                Gauge(
+                    "mongodb_pool_connections",
+                    "Open MongoDB connections",
+                    lambda: pool_stats.connection_count,
+                ),
+                Gauge(
+                    "mongodb_pool_checked_out_connections",
+                    "MongoDB connections in use",
+                    lambda: pool_stats.checked_out_connection_count,
+                ),
+                Gauge(
+                    "mongodb_pool_check_out_failures_total",
+                    "Failed MongoDB connection check outs",
+                    lambda: pool_stats.check_out_failure_count,
+                    metric_type="counter",
+                ),
+                Gauge(
+                    "mongodb_pool_cleared_total",
+                    "Times a MongoDB pool was cleared after a server error",
+                    lambda: pool_stats.pool_cleared_count,
+                    metric_type="counter",
+                ),
+            ]
+        )
+
+    def instrument_httpx(self):
+        if self._is_httpx_instrumented:
+            return
+        self._is_httpx_instrumented = True
+        original_send = httpx.AsyncClient.send
+        http_client_request_duration = self.http_client_request_duration
+
+        async def send(client: httpx.AsyncClient, request: httpx.Request, **kwargs):
+            started_time = time.perf_counter()
+            status = "error"
+            try:
+                response = await original_send(client, request, **kwargs)
+                status = str(response.status_code)
+                return response
+            finally:
+                http_client_request_duration.observe(
+                    time.perf_counter() - started_time,
+                    request.method,
+                    request.url.host,
+                    status,
+                )
+
+        httpx.AsyncClient.send = send
+
+    async def start(self):
+        self.instrument_httpx()
+        self._event_loop_lag_task = asyncio.create_task(self._measure_event_loop_lag())
+
+    async def stop(self):
+        if self._event_loop_lag_task is not None:
+            self._event_loop_lag_task.cancel()
+            try:
+                await self._event_loop_lag_task
+            except asyncio.CancelledError:
+                pass
+            self._event_loop_lag_task = None
+
+    def render(self) -> str:
+        lines = []
+        for histogram in [
+            self.http_request_duration,
+            self.http_request_db_statements,
+            self.http_request_db_duration,
+            self.db_statement_duration,
+            self.http_client_request_duration,
+            self.event_loop_lag,
+        ]:
+            lines.extend(histogram.render())
+        for gauge in self.gauges:
+            lines.extend(gauge.render())
+        return "\n".join(lines) + "\n"
+
+    async def _measure_event_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled_time = loop.time() + self._event_loop_lag_interval_seconds
+            await asyncio.sleep(self._event_loop_lag_interval_seconds)
+            self.event_loop_lag.observe(max(loop.time() - scheduled_time, 0.0))
+
+
+class InstrumentationMiddleware:
+    def __init__(self, app: ASGIApp, instrumentation: Instrumentation):
+        self.app = app
+        self.instrumentation = instrumentation
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def _send(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        request_stats = _RequestStats()
+        token = _request_stats_var.set(request_stats)
+        started_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            seconds = time.perf_counter() - started_time
+            _request_stats_var.reset(token)
+            route = scope.get("route")
+            # label by the route template to keep the cardinality bounded
+            route_path = getattr(route, "path", "<unmatched>")
+            method = scope["method"]
+            self.instrumentation.http_request_duration.observe(
+                seconds, method, route_path, status
+            )
+            self.instrumentation.http_request_db_statements.observe(
+                request_stats.db_statement_count, method, route_path
+            )
+            self.instrumentation.http_request_db_duration.observe(
+                request_stats.db_seconds, method, route_path
+            )
+
+
+def _escape_label_value(label_value: str) -> str:
+    return label_value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,19 @@
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Encode the content with pydantic-core in a single pass.
+
+    FastAPI runs returned models through `jsonable_encoder` before rendering, so
+    endpoints return this response directly to skip it. Models keep their own
+    serializers (e.g. `SerializableDecimal`), datetimes are rendered as ISO 8601.
+    Trusted data can be wrapped with `ResponseSchema.model_construct` to skip
+    validation altogether.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return pydantic_core.to_json(content)
@@ -1,4 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from starlette.exceptions import HTTPException
 
 from modules.base.config import get_base_config
 from modules.web_server.schemas.response import (
@@ -35,3 +37,13 @@ def get_inspect():
             commit_revision=base_config.COMMIT_REVISION,
         ),
     )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(request: Request):
+    instrumentation = request.app.state.instrumentation
+    if instrumentation is None:
+        raise HTTPException(status_code=404, detail="Instrumentation is not enabled")
+    return PlainTextResponse(
+        instrumentation.render(), media_type="text/plain; version=0.0.4"
+    )
@@ -3,3 +3,8 @@ from pydantic import BaseModel
 
 class WebServerConfigSchema(BaseModel):
     PORT: int
+    WORKER_COUNT: int = 1
+    WORKER_MAX_REQUESTS: int = 0
+    GRACEFUL_SHUTDOWN_TIMEOUT_SECONDS: int = 30
+    IMPORT_TIME_REPORT_ENABLED: bool = False
+    INSTRUMENTATION_ENABLED: bool = False